@@ -0,0 +1,73 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+class LRUCache:
+    ''' Кэш с вытеснением давно не использованных элементов при превышении лимита по объёму '''
+
+    def __init__(self, max_bytes: int, size_of: Callable[[Any], int]):
+        self.__max_bytes = max_bytes
+        self.__size_of = size_of
+        self.__items: OrderedDict[Hashable, Any] = OrderedDict()
+        self.__bytes = 0
+        self.__hits = 0
+        self.__misses = 0
+
+    def get(self, key: Hashable) -> Any|None:
+        ''' Метод получения элемента по ключу, отмечает элемент как недавно использованный '''
+        if key not in self.__items:
+            self.__misses += 1
+            return None
+        self.__hits += 1
+        self.__items.move_to_end(key)
+        return self.__items[key]
+
+    def put(self, key: Hashable, value: Any):
+        ''' Метод добавления элемента, при превышении лимита вытесняет самые давние элементы '''
+        if key in self.__items:
+            self.__bytes -= self.__size_of(self.__items.pop(key))
+        self.__items[key] = value
+        self.__bytes += self.__size_of(value)
+        while len(self.__items) > 1 and self.__bytes > self.__max_bytes:
+            _, evicted = self.__items.popitem(last=False)
+            self.__bytes -= self.__size_of(evicted)
+
+    def remove(self, key: Hashable):
+        ''' Метод удаления элемента (например, устаревшего), отсутствующий ключ не ошибка '''
+        if key in self.__items:
+            self.__bytes -= self.__size_of(self.__items.pop(key))
+
+    def clear(self):
+        ''' Метод очистки кэша '''
+        self.__items.clear()
+        self.__bytes = 0
+
+    def keys(self) -> list[Hashable]:
+        ''' Метод получения ключей элементов, от давно использованных к недавним '''
+        return list(self.__items)
+
+    def get_bytes(self) -> int:
+        ''' Метод получения объёма памяти, занятого элементами кэша '''
+        return self.__bytes
+
+    def get_hits(self) -> int:
+        ''' Метод получения числа попаданий в кэш '''
+        return self.__hits
+
+    def get_misses(self) -> int:
+        ''' Метод получения числа промахов кэша '''
+        return self.__misses
+
+    def reset_stats(self):
+        ''' Метод сброса счётчиков попаданий и промахов '''
+        self.__hits = 0
+        self.__misses = 0
+
+    def get_max_bytes(self) -> int:
+        ''' Метод получения лимита кэша по объёму '''
+        return self.__max_bytes
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__items
+
+    def __len__(self) -> int:
+        return len(self.__items)
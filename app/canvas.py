@@ -0,0 +1,296 @@
+import time
+from collections import deque
+from PyQt5.QtWidgets import QAbstractScrollArea, QWidget
+from PyQt5.QtGui import QColor, QPainter, QPaintEvent, QPalette, QPen, QRegion, QResizeEvent, QTransform
+from PyQt5.QtCore import QElapsedTimer, QLineF, QPoint, QPointF, QRect, QRectF, QSize, QTimer
+from .my_image import MyImage, Resampling
+from .tiles import TileRenderer
+
+class ImageCanvas(QAbstractScrollArea):
+    ''' Область отображения изображения: рисует видимую часть прямо из исходного изображения и готовых плиток '''
+
+    # Пауза после последнего изменения масштаба, после которой начинается сглаженная отрисовка
+    IDLE_DELAY_MS = 150
+    # Шаг прокрутки стрелками полос прокрутки (в пикселях экрана)
+    SCROLL_STEP = 50
+    # Минимальный размер пикселя изображения на экране, начиная с которого в пиксельном режиме рисуется сетка
+    GRID_MIN_CELL = 8
+    GRID_COLOR = QColor(128, 128, 128, 128)
+    # Бюджет времени кадра (мс): если кадры во время перемещения и зума дольше, заполнение упрощается
+    FRAME_BUDGET_MS = 16
+    # Интервал таймера, по опозданию которого во время взаимодействия замеряются простои цикла событий
+    # между кадрами (например, пока фоновый поток держит GIL) - они входят во время кадра
+    LATENCY_PROBE_MS = 5
+    # Число последних кадров, по среднему времени которых принимается решение
+    FRAME_HISTORY = 3
+    # Ступени упрощения: на каждой заполнение рисуется из уровня пирамиды, вдвое более мелкого, чем на предыдущей
+    # (и без сглаживания) - пикселей читается вчетверо меньше
+    MAX_QUALITY_DROP = 2
+
+    def __init__(self, parent: QWidget|None = None, tile_size: int = TileRenderer.DEFAULT_TILE_SIZE,
+                 tile_cache_bytes: int = TileRenderer.DEFAULT_CACHE_BYTES):
+        super().__init__(parent)
+        self.viewport().setBackgroundRole(QPalette.Dark)
+        self.viewport().setAutoFillBackground(True)
+        self.horizontalScrollBar().setSingleStep(self.SCROLL_STEP)
+        self.verticalScrollBar().setSingleStep(self.SCROLL_STEP)
+
+        self.__image: MyImage|None = None
+        self.__scale = 1.0
+        self.__renderer = TileRenderer(tile_size, tile_cache_bytes, self)
+        self.__renderer.tile_ready.connect(self.__on_tile_ready)
+        self.__renderer.level_ready.connect(self.__on_level_ready)
+
+        # Двухфазная отрисовка: пока масштаб меняется, рисуем быстро без сглаживания,
+        # а сглаженные плитки запрашиваем только после паузы
+        self.__refine = True
+        self.__idle_timer = QTimer(self)
+        self.__idle_timer.setSingleShot(True)
+        self.__idle_timer.setInterval(self.IDLE_DELAY_MS)
+        self.__idle_timer.timeout.connect(self.__on_idle)
+
+        # Пиксельный режим: при увеличении пиксели рисуются без сглаживания прямо из исходника, плитки не нужны
+        self.__pixel_mode = False
+        self.__pixel_grid = True
+
+        # Способы передискретизации: пока плитки не готовы (перемещение, зум) и для самих плиток (покой)
+        self.__panning_resampling = Resampling.NEAREST
+        self.__idle_resampling = Resampling.BILINEAR
+
+        # Адаптивное качество: время последних кадров взаимодействия и текущая ступень упрощения,
+        # полное качество возвращается, когда пользователь остановился
+        self.__frame_budget_ms: float|None = self.FRAME_BUDGET_MS
+        self.__frame_times = deque(maxlen=self.FRAME_HISTORY)
+        self.__quality_drop = 0
+        self.__latency_probe = QTimer(self)
+        self.__latency_probe.setInterval(self.LATENCY_PROBE_MS)
+        self.__latency_probe.timeout.connect(self.__on_latency_probe)
+        self.__probe_clock = QElapsedTimer()
+        # Наибольшее опоздание таймера с предыдущего кадра (мс)
+        self.__stall_ms = 0.0
+
+    def set_image(self, image: MyImage|None, scale: float):
+        ''' Метод установки изображения и масштаба отображения '''
+        anchor = None
+        if image is self.__image and image is not None and scale != self.__scale:
+            # При смене масштаба точка изображения в центре области просмотра остаётся на месте
+            anchor = self.map_to_image(QPointF(self.viewport().rect().center()))
+            self.__renderer.cancel_pending()
+            self.__refine = False
+            self.__start_interaction()
+        elif image is not self.__image:
+            self.__refine = True
+
+        self.__image = image
+        self.__scale = scale
+        self.__renderer.set_image(image)
+        self.__update_scroll_bars()
+        if anchor is not None:
+            center = QPointF(self.viewport().rect().center())
+            self.horizontalScrollBar().setValue(round(anchor.x() * scale - center.x()))
+            self.verticalScrollBar().setValue(round(anchor.y() * scale - center.y()))
+        self.viewport().update()
+
+    def set_pixel_mode(self, enabled: bool, grid: bool = True):
+        ''' Метод включения пиксельного режима (ближайший сосед при масштабе больше 1) и сетки пикселей '''
+        self.__pixel_mode = enabled
+        self.__pixel_grid = grid
+        self.viewport().update()
+
+    def set_resampling(self, panning: Resampling, idle: Resampling):
+        ''' Метод выбора передискретизации при перемещении (кроме NEAREST - сглаживание Qt) и для плиток в покое '''
+        if idle is not self.__idle_resampling:
+            self.__renderer.cancel_pending()
+        self.__panning_resampling = panning
+        self.__idle_resampling = idle
+        self.viewport().update()
+
+    def set_frame_budget(self, budget_ms: float|None):
+        ''' Метод установки бюджета времени кадра (None - всегда полное качество) '''
+        self.__frame_budget_ms = budget_ms
+        self.__frame_times.clear()
+        if not budget_ms:
+            self.__quality_drop = 0
+            self.__latency_probe.stop()
+
+    def get_quality_drop(self) -> int:
+        ''' Метод получения текущей ступени упрощения отрисовки (0 - полное качество) '''
+        return self.__quality_drop
+
+    def is_pixel_mode(self) -> bool:
+        ''' Метод проверки, включён ли пиксельный режим '''
+        return self.__pixel_mode
+
+    def is_refining(self) -> bool:
+        ''' Метод проверки, запрашиваются ли сглаженные плитки (False - идёт быстрая фаза) '''
+        return self.__refine
+
+    def get_renderer(self) -> TileRenderer:
+        ''' Метод получения отрисовщика плиток '''
+        return self.__renderer
+
+    def image_rect(self) -> QRect:
+        ''' Метод получения прямоугольника отмасштабированного изображения в координатах области просмотра '''
+        size = self.__scaled_size()
+        viewport = self.viewport().size()
+        left = max(0, (viewport.width() - size.width()) // 2) - self.horizontalScrollBar().value()
+        top = max(0, (viewport.height() - size.height()) // 2) - self.verticalScrollBar().value()
+        return QRect(QPoint(left, top), size)
+
+    def map_to_image(self, point: QPointF) -> QPointF:
+        ''' Метод перевода точки области просмотра в координаты исходного изображения '''
+        origin = self.image_rect().topLeft()
+        return QPointF((point.x() - origin.x()) / self.__scale, (point.y() - origin.y()) / self.__scale)
+
+    def map_from_image(self, point: QPointF) -> QPointF:
+        ''' Метод перевода точки исходного изображения в координаты области просмотра '''
+        origin = self.image_rect().topLeft()
+        return QPointF(point.x() * self.__scale + origin.x(), point.y() * self.__scale + origin.y())
+
+    def paintEvent(self, event: QPaintEvent):
+        if self.__image is None:
+            return
+
+        start = time.perf_counter()
+        painter = QPainter(self.viewport())
+        pixel_mode = self.__pixel_mode and self.__scale > 1
+        if pixel_mode and not self.__image.is_region_mode():
+            # Увеличенные пиксели рисуются напрямую из видимой части исходника - память не зависит от масштаба
+            self.__draw_transformed(painter, event.rect(), smooth=False)
+        else:
+            # Изображение, читаемое по областям, в пиксельном режиме рисуется плитками без сглаживания
+            resampling = Resampling.NEAREST if pixel_mode else self.__idle_resampling
+            missing = self.__draw_tiles(painter, event.rect(), self.__refine, resampling)
+            if not missing.isEmpty():
+                # Места без готовых плиток сразу заполняем, рисуя уровень пирамиды через преобразование
+                # (на всё, кроме ближайшего соседа, здесь хватает времени только на сглаживание Qt)
+                painter.setClipRegion(missing)
+                smooth = not pixel_mode and self.__panning_resampling is not Resampling.NEAREST and \
+                    self.__quality_drop == 0
+                coarse = 0 if pixel_mode else self.__quality_drop
+                self.__draw_transformed(painter, missing.boundingRect() & event.rect(), smooth, coarse)
+                painter.setClipping(False)
+
+        if pixel_mode and self.__pixel_grid and self.__scale >= self.GRID_MIN_CELL:
+            self.__draw_pixel_grid(painter, event.rect())
+        painter.end()
+        self.__record_frame((time.perf_counter() - start) * 1000)
+
+    def resizeEvent(self, event: QResizeEvent):
+        super().resizeEvent(event)
+        self.__update_scroll_bars()
+
+    def scrollContentsBy(self, dx: int, dy: int):
+        # Сдвигаем уже нарисованное, перерисовывается только открывшаяся полоса
+        # (с прямоугольником дочерние виджеты, например кнопки поверх изображения, не сдвигаются)
+        self.viewport().scroll(dx, dy, self.viewport().rect())
+        # Перемещение - тоже взаимодействие: полное качество вернётся после паузы
+        self.__start_interaction()
+
+    def __draw_tiles(self, painter: QPainter, rect: QRect, request: bool, resampling: Resampling) -> QRegion:
+        ''' Отрисовка готовых плиток в области rect (координаты области просмотра), возвращает область ещё не готовых плиток '''
+        origin = self.image_rect().topLeft()
+        missing = QRegion()
+        for col, row in self.__renderer.visible_tiles(rect.translated(-origin), self.__scale):
+            tile_rect = self.__renderer.tile_rect(self.__scale, col, row).translated(origin)
+            tile = self.__renderer.cached_tile(self.__scale, col, row, resampling)
+            if tile is not None:
+                painter.drawImage(tile_rect.topLeft(), tile)
+                continue
+            missing |= QRegion(tile_rect)
+            if request:
+                self.__renderer.request_tile(self.__scale, col, row, resampling)
+        return missing
+
+    def __draw_transformed(self, painter: QPainter, rect: QRect, smooth: bool, coarse: int = 0):
+        ''' Отрисовка области rect напрямую из уровня пирамиды с преобразованием масштаба (coarse - на сколько уровней мельче нужного) '''
+        wanted = self.__image.level_for_scale(self.__scale / 2 ** coarse)
+        # Построение уровня на большом изображении занимает сотни миллисекунд - в потоке интерфейса
+        # рисуем из уже готового, а нужный строится в фоне и заменит его при следующей отрисовке
+        index, level = self.__image.get_built_level(wanted)
+        if index != wanted:
+            self.__renderer.request_level(wanted)
+        origin = self.image_rect().topLeft()
+
+        transform = self.__image.get_image_transform(level) * \
+            QTransform.fromTranslate(origin.x(), origin.y()).scale(self.__scale, self.__scale)
+        source = transform.inverted()[0].mapRect(QRectF(rect)).toAlignedRect() & level.rect()
+        if source.isEmpty():
+            return
+        painter.setTransform(transform)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, smooth)
+        painter.drawImage(source.topLeft(), level, source)
+        painter.resetTransform()
+
+    def __draw_pixel_grid(self, painter: QPainter, rect: QRect):
+        ''' Отрисовка сетки по границам пикселей изображения в области rect '''
+        origin = self.image_rect().topLeft()
+        transform = QTransform.fromTranslate(origin.x(), origin.y()).scale(self.__scale, self.__scale)
+        source = transform.inverted()[0].mapRect(QRectF(rect)).toAlignedRect().adjusted(0, 0, 1, 1)
+        source &= QRect(0, 0, self.__image.get_width() + 1, self.__image.get_height() + 1)
+        if source.isEmpty():
+            return
+
+        painter.setTransform(transform)
+        pen = QPen(self.GRID_COLOR)
+        pen.setCosmetic(True)
+        painter.setPen(pen)
+        top, bottom = source.top(), source.top() + source.height() - 1
+        left, right = source.left(), source.left() + source.width() - 1
+        painter.drawLines([QLineF(x, top, x, bottom) for x in range(left, right + 1)] +
+                          [QLineF(left, y, right, y) for y in range(top, bottom + 1)])
+        painter.resetTransform()
+
+    def __update_scroll_bars(self):
+        ''' Настройка полос прокрутки: значение - сдвиг области просмотра внутри отмасштабированного изображения '''
+        size = self.__scaled_size()
+        viewport = self.viewport().size()
+        for bar, content, page in ((self.horizontalScrollBar(), size.width(), viewport.width()),
+                                   (self.verticalScrollBar(), size.height(), viewport.height())):
+            bar.setPageStep(page)
+            bar.setRange(0, max(0, content - page))
+
+    def __start_interaction(self):
+        ''' Начало или продолжение взаимодействия: полное качество вернётся после паузы, до неё замеряются простои '''
+        self.__idle_timer.start()
+        if self.__frame_budget_ms and not self.__latency_probe.isActive():
+            self.__stall_ms = 0.0
+            self.__probe_clock.start()
+            self.__latency_probe.start()
+
+    def __record_frame(self, elapsed_ms: float):
+        ''' Учёт времени кадра: если последние кадры взаимодействия не уложились в бюджет, отрисовка упрощается '''
+        if not self.__frame_budget_ms or not self.__idle_timer.isActive():
+            return
+        # Простой цикла событий между кадрами задерживает показ так же, как долгая отрисовка
+        self.__frame_times.append(max(elapsed_ms, self.__stall_ms))
+        self.__stall_ms = 0.0
+        if len(self.__frame_times) == self.__frame_times.maxlen and self.__quality_drop < self.MAX_QUALITY_DROP and \
+                sum(self.__frame_times) / len(self.__frame_times) > self.__frame_budget_ms:
+            # Следующая ступень оценивается по новым кадрам, уже отрисованным с упрощением
+            self.__quality_drop += 1
+            self.__frame_times.clear()
+
+    def __on_idle(self):
+        self.__refine = True
+        self.__quality_drop = 0
+        self.__frame_times.clear()
+        self.__latency_probe.stop()
+        self.viewport().update()
+
+    def __on_latency_probe(self):
+        self.__stall_ms = max(self.__stall_ms, self.__probe_clock.restart() - self.LATENCY_PROBE_MS)
+
+    def __on_level_ready(self, level: int):
+        if self.__image is not None:
+            self.viewport().update()
+
+    def __on_tile_ready(self, scale: float, col: int, row: int):
+        if self.__image is not None and round(self.__scale, TileRenderer.SCALE_KEY_DIGITS) == scale:
+            rect = self.__renderer.tile_rect(scale, col, row)
+            self.viewport().update(rect.translated(self.image_rect().topLeft()))
+
+    def __scaled_size(self) -> QSize:
+        if self.__image is None:
+            return QSize(0, 0)
+        return self.__image.get_scaled_size(self.__scale)
@@ -0,0 +1,268 @@
+import os
+import stat
+import time
+from typing import NamedTuple
+from bisect import bisect_left
+from PyQt5.QtGui import QImageReader
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QThreadPool, QTimer, pyqtSignal
+from .workers import Job
+
+# Расширения файлов, которые открывает просмотрщик (те же, что в фильтре окна открытия)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+class ImageEntry(NamedTuple):
+    ''' Сведения о файле изображения: размер в байтах, время изменения (нс), ширина и высота (-1 - заголовок не прочитан) '''
+    path: str
+    size: int
+    mtime_ns: int
+    width: int
+    height: int
+
+def is_image_file(file_name: str) -> bool:
+    ''' Функция проверки расширения файла изображения (без учёта регистра) '''
+    return os.path.splitext(file_name)[1].lower() in IMAGE_EXTENSIONS
+
+def sort_key(file_path: str) -> str:
+    ''' Ключ сортировки файлов папки: имя без учёта регистра '''
+    return os.path.basename(file_path).casefold()
+
+def read_entry(file_path: str) -> ImageEntry|None:
+    ''' Функция чтения сведений о файле: размер и время - из stat, ширина и высота - из заголовка (None - не файл) '''
+    try:
+        info = os.stat(file_path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(info.st_mode):
+        return None
+    # Читается только заголовок, пиксели не декодируются
+    size = QImageReader(file_path).size()
+    return ImageEntry(file_path, info.st_size, info.st_mtime_ns, size.width(), size.height())
+
+def scan_directory(directory: str) -> list[ImageEntry]:
+    ''' Функция полного чтения сведений об изображениях папки (пустой список - если папка недоступна) '''
+    entries = (read_entry(file_path) for file_path in _image_paths(directory))
+    return [entry for entry in entries if entry is not None]
+
+def scan_changes(directory: str, known: dict[str, tuple[int, int]], recheck: set[str]) -> tuple[list[ImageEntry], list[str]]:
+    ''' Функция поиска изменений папки за один проход scandir: known - (размер, время изменения) известных файлов;
+    возвращает (новые, изменившиеся и перечитанные из recheck файлы, удалённые файлы) '''
+    stats = _image_stats(directory)
+    # Файл, заменённый под тем же именем (запись во временный файл и os.replace), узнаётся по размеру и времени
+    changed = {file_path for file_path, stat_key in stats.items() if known.get(file_path) != stat_key}
+    entries = (read_entry(file_path) for file_path in changed | (recheck & stats.keys()))
+    return [entry for entry in entries if entry is not None], [file_path for file_path in known if file_path not in stats]
+
+def _image_stats(directory: str) -> dict[str, tuple[int, int]]:
+    ''' (Размер, время изменения в нс) файлов изображений папки '''
+    stats = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not is_image_file(entry.name) or not entry.is_file():
+                    continue
+                try:
+                    info = entry.stat()
+                except OSError:
+                    # Файл удалён во время прохода
+                    continue
+                stats[entry.path] = (info.st_size, info.st_mtime_ns)
+    except OSError:
+        return {}
+    return stats
+
+def _image_paths(directory: str) -> list[str]:
+    ''' Пути изображений папки только по именам, без обращения к самим файлам '''
+    try:
+        with os.scandir(directory) as entries:
+            return [entry.path for entry in entries if is_image_file(entry.name)]
+    except OSError:
+        return []
+
+class DirectoryIndex(QObject):
+    ''' Индекс изображений папки: строится один раз в фоне, затем обновляется только по изменениям папки '''
+
+    # Пауза после изменения папки, за которую изменения копятся и обрабатываются одним проходом
+    UPDATE_DELAY_MS = 200
+    # Файл, изменённый позже этого срока назад, может ещё записываться - его сведения перечитываются
+    SETTLE_MS = 2000
+
+    # Индекс построен заново (после set_directory)
+    ready = pyqtSignal()
+    # Изменения после построения: добавленные, удалённые и изменившиеся файлы
+    changed = pyqtSignal(list, list, list)
+
+    def __init__(self, parent: QObject|None = None):
+        super().__init__(parent)
+        self.__directory: str|None = None
+        self.__entries: dict[str, ImageEntry] = {}
+        self.__files: list[str] = []
+        self.__keys: list[str] = []
+        self.__ready = False
+        self.__update_delay = self.UPDATE_DELAY_MS
+        # Файлы, которые могут ещё записываться: проверяются при каждом обновлении, пока не перестанут меняться
+        self.__unsettled: set[str] = set()
+
+        # Фоновое чтение по одной задаче за раз: изменения, пришедшие во время прохода, обрабатываются следующим
+        self.__pool = QThreadPool(self)
+        self.__pool.setMaxThreadCount(1)
+        self.__generation = 0
+        self.__scanning = False
+        self.__dirty = False
+
+        self.__watcher = QFileSystemWatcher(self)
+        self.__watcher.directoryChanged.connect(self.__on_directory_changed)
+        self.__watcher.fileChanged.connect(self.__on_file_changed)
+        self.__update_timer = QTimer(self)
+        self.__update_timer.setSingleShot(True)
+        self.__update_timer.timeout.connect(self.__start_update)
+
+    def set_directory(self, directory: str|None):
+        ''' Метод смены папки: индекс очищается и строится в фоне, по готовности испускается ready '''
+        if self.__watcher.directories():
+            self.__watcher.removePaths(self.__watcher.directories())
+        self.set_watched_files([])
+        self.__update_timer.stop()
+        self.__generation += 1
+        self.__directory = directory
+        self.__entries = {}
+        self.__files = []
+        self.__keys = []
+        self.__unsettled = set()
+        self.__ready = False
+        self.__dirty = False
+        if directory is None:
+            return
+
+        # Наблюдение начинается до построения: изменения во время построения не теряются
+        self.__watcher.addPath(directory)
+        self.__scanning = True
+        job = Job(scan_directory, directory, tag=self.__generation)
+        job.signals.finished.connect(self.__on_scanned)
+        job.signals.failed.connect(self.__on_scan_failed)
+        self.__pool.start(job)
+
+    def set_watched_files(self, file_paths: list[str]):
+        ''' Метод наблюдения за содержимым отдельных файлов: запись в файл на месте папку не меняет, но тоже попадает в changed '''
+        if self.__watcher.files():
+            self.__watcher.removePaths(self.__watcher.files())
+        if file_paths:
+            self.__watcher.addPaths(file_paths)
+
+    def get_directory(self) -> str|None:
+        ''' Метод получения папки индекса '''
+        return self.__directory
+
+    def is_ready(self) -> bool:
+        ''' Метод проверки, построен ли индекс '''
+        return self.__ready
+
+    def get_files(self) -> list[str]:
+        ''' Метод получения путей изображений, отсортированных по имени (копия списка) '''
+        return list(self.__files)
+
+    def get_entry(self, file_path: str) -> ImageEntry|None:
+        ''' Метод получения сведений о файле '''
+        return self.__entries.get(file_path)
+
+    def index_of(self, file_path: str) -> int:
+        ''' Метод получения номера файла в отсортированном списке (-1 - файла нет) '''
+        i = bisect_left(self.__keys, sort_key(file_path))
+        while i < len(self.__files) and self.__keys[i] == sort_key(file_path):
+            if self.__files[i] == file_path:
+                return i
+            i += 1
+        return -1
+
+    def get_update_delay(self) -> int:
+        ''' Метод получения паузы после изменения папки перед обновлением индекса (мс) '''
+        return self.__update_delay
+
+    def set_update_delay(self, msecs: int):
+        ''' Метод установки паузы после изменения папки: меньше - новые файлы появляются быстрее, но проходов больше '''
+        self.__update_delay = msecs
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        ''' Метод ожидания завершения фонового прохода '''
+        return self.__pool.waitForDone(msecs)
+
+    def __len__(self) -> int:
+        return len(self.__files)
+
+    def __on_directory_changed(self, directory: str):
+        # Изменения во время прохода обрабатываются после него, частые изменения объединяются
+        if self.__scanning:
+            self.__dirty = True
+        else:
+            self.__update_timer.start(self.__update_delay)
+
+    def __on_file_changed(self, file_path: str):
+        # Замена файла снимает наблюдение за ним - возобновляем для нового файла под тем же именем
+        if file_path not in self.__watcher.files() and os.path.exists(file_path):
+            self.__watcher.addPath(file_path)
+        self.__on_directory_changed(os.path.dirname(file_path))
+
+    def __start_update(self):
+        if self.__directory is None or self.__scanning:
+            return
+        self.__scanning = True
+        self.__dirty = False
+        known = {file_path: (entry.size, entry.mtime_ns) for file_path, entry in self.__entries.items()}
+        job = Job(scan_changes, self.__directory, known, set(self.__unsettled), tag=self.__generation)
+        job.signals.finished.connect(self.__on_changes_scanned)
+        job.signals.failed.connect(self.__on_scan_failed)
+        self.__pool.start(job)
+
+    def __on_scanned(self, generation: int, entries: list[ImageEntry]):
+        if generation != self.__generation:
+            return
+        self.__entries = {entry.path: entry for entry in entries}
+        self.__files = sorted(self.__entries, key=sort_key)
+        self.__keys = [sort_key(file_path) for file_path in self.__files]
+        self.__unsettled = {entry.path for entry in entries if not self.__is_settled(entry)}
+        self.__ready = True
+        self.__finish_scan()
+        self.ready.emit()
+
+    def __on_changes_scanned(self, generation: int, result: tuple):
+        if generation != self.__generation:
+            return
+        entries, removed = result
+        added, updated = [], []
+        for entry in entries:
+            old = self.__entries.get(entry.path)
+            self.__entries[entry.path] = entry
+            if old is None:
+                i = bisect_left(self.__keys, sort_key(entry.path))
+                self.__files.insert(i, entry.path)
+                self.__keys.insert(i, sort_key(entry.path))
+                added.append(entry.path)
+            elif old != entry:
+                updated.append(entry.path)
+            if self.__is_settled(entry):
+                self.__unsettled.discard(entry.path)
+            else:
+                self.__unsettled.add(entry.path)
+        for file_path in removed:
+            i = self.index_of(file_path)
+            del self.__files[i], self.__keys[i], self.__entries[file_path]
+            self.__unsettled.discard(file_path)
+
+        self.__finish_scan()
+        if added or removed or updated:
+            self.changed.emit(added, removed, updated)
+
+    def __on_scan_failed(self, generation: int, error: Exception):
+        if generation == self.__generation:
+            self.__finish_scan()
+
+    def __finish_scan(self):
+        ''' Окончание прохода: если за время прохода папка менялась или есть недописанные файлы - следующий проход '''
+        self.__scanning = False
+        if self.__dirty:
+            self.__update_timer.start(self.__update_delay)
+        elif self.__unsettled:
+            self.__update_timer.start(self.SETTLE_MS)
+
+    def __is_settled(self, entry: ImageEntry) -> bool:
+        ''' Файл с прочитанным заголовком, не менявшийся дольше SETTLE_MS '''
+        return entry.width >= 0 and time.time_ns() - entry.mtime_ns > self.SETTLE_MS * 1_000_000
@@ -0,0 +1,145 @@
+import ctypes
+import mmap
+import struct
+from PyQt5 import sip
+from PyQt5.QtGui import QImage
+
+class MappedImage:
+    ''' Несжатое изображение, пиксели которого читаются прямо из отображённого в память файла '''
+
+    def __init__(self, mapping: mmap.mmap, offset: int, width: int, height: int, stride: int,
+                 image_format: QImage.Format, flipped: bool):
+        self.__mapping = mapping
+        # Указатель на данные держит экспорт буфера, поэтому отображение не закроется раньше изображения
+        self.__buffer = ctypes.c_char.from_buffer(mapping, offset)
+        # QImage не владеет памятью и не копирует её: страницы файла подгружаются при обращении к ним
+        self.__image = QImage(sip.voidptr(ctypes.addressof(self.__buffer)), width, height, stride, image_format)
+        # Обёртка изображения держит отображение: get_image() можно использовать и после удаления этого объекта
+        self.__image.mapped_source = self
+        self.__flipped = flipped
+
+    def get_image(self) -> QImage:
+        ''' Метод получения изображения поверх файла (его копии QImage действительны, пока жив этот объект) '''
+        return self.__image
+
+    def is_flipped(self) -> bool:
+        ''' Метод проверки, хранятся ли строки снизу вверх (первая строка в файле - нижняя) '''
+        return self.__flipped
+
+def map_image(file_path: str) -> MappedImage|None:
+    ''' Функция отображения несжатого BMP или TIFF в память, None - если формат не подходит для прямого чтения '''
+    try:
+        with open(file_path, 'rb') as file:
+            # ACCESS_COPY даёт записываемый для ctypes буфер, сам файл при этом не меняется
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        if mapping[:2] == b'BM':
+            layout = _bmp_layout(mapping)
+        elif mapping[:4] in (b'II*\0', b'MM\0*'):
+            layout = _tiff_layout(mapping)
+        else:
+            layout = None
+    except struct.error:
+        # Файл обрезан посреди заголовка
+        layout = None
+
+    if layout is None:
+        mapping.close()
+        return None
+    offset, width, height, stride, image_format, flipped = layout
+    if width <= 0 or height <= 0 or offset + stride * height > len(mapping):
+        mapping.close()
+        return None
+    return MappedImage(mapping, offset, width, height, stride, image_format, flipped)
+
+def _bmp_layout(data: mmap.mmap) -> tuple|None:
+    ''' Разбор заголовка BMP: (смещение пикселей, ширина, высота, шаг строки, формат, снизу вверх) '''
+    offset, = struct.unpack_from('<I', data, 10)
+    header_size, width, height, planes, bits, compression = struct.unpack_from('<IiiHHI', data, 14)
+    if header_size < 40 or planes != 1:
+        return None
+
+    if bits == 24 and compression == 0:
+        image_format = QImage.Format_BGR888
+    elif bits == 32 and compression == 0:
+        image_format = QImage.Format_RGB32
+    elif bits == 32 and compression == 3:
+        # Маски каналов идут сразу за 40-байтным заголовком (в заголовках V4/V5 - на тех же местах)
+        red, green, blue = struct.unpack_from('<III', data, 54)
+        alpha = struct.unpack_from('<I', data, 66)[0] if header_size >= 56 else 0
+        if (red, green, blue) != (0x00ff0000, 0x0000ff00, 0x000000ff) or alpha not in (0, 0xff000000):
+            return None
+        image_format = QImage.Format_ARGB32 if alpha else QImage.Format_RGB32
+    else:
+        # Палитра, 16 бит и RLE требуют преобразования пикселей
+        return None
+
+    # Строки выравниваются на 4 байта; положительная высота - строки хранятся снизу вверх
+    stride = (width * bits + 31) // 32 * 4
+    return offset, width, abs(height), stride, image_format, height > 0
+
+# Теги TIFF, нужные для проверки и разбора несжатого изображения
+TIFF_WIDTH = 256
+TIFF_HEIGHT = 257
+TIFF_BITS_PER_SAMPLE = 258
+TIFF_COMPRESSION = 259
+TIFF_PHOTOMETRIC = 262
+TIFF_STRIP_OFFSETS = 273
+TIFF_ORIENTATION = 274
+TIFF_SAMPLES_PER_PIXEL = 277
+TIFF_STRIP_BYTE_COUNTS = 279
+TIFF_PLANAR_CONFIG = 284
+TIFF_TILE_WIDTH = 322
+TIFF_EXTRA_SAMPLES = 338
+
+# Размеры типов значений TIFF и их коды struct: BYTE, SHORT, LONG
+TIFF_TYPES = {1: 'B', 3: 'H', 4: 'I'}
+
+def _tiff_layout(data: mmap.mmap) -> tuple|None:
+    ''' Разбор первого IFD несжатого TIFF со строками подряд: (смещение, ширина, высота, шаг строки, формат, снизу вверх) '''
+    order = '<' if data[:2] == b'II' else '>'
+    ifd, = struct.unpack_from(order + 'I', data, 4)
+    count, = struct.unpack_from(order + 'H', data, ifd)
+    tags = {}
+    for i in range(count):
+        tag, kind, values, value_offset = struct.unpack_from(order + 'HHI4s', data, ifd + 2 + i * 12)
+        if kind not in TIFF_TYPES:
+            continue
+        code = order + TIFF_TYPES[kind] * values
+        if struct.calcsize(code) <= 4:
+            tags[tag] = struct.unpack_from(code, value_offset)
+        else:
+            tags[tag] = struct.unpack_from(code, data, struct.unpack(order + 'I', value_offset)[0])
+
+    first = lambda tag, default=None: tags.get(tag, (default,))[0]
+    if (first(TIFF_COMPRESSION, 1) != 1 or first(TIFF_PLANAR_CONFIG, 1) != 1 or first(TIFF_ORIENTATION, 1) != 1
+            or TIFF_TILE_WIDTH in tags or TIFF_STRIP_OFFSETS not in tags or TIFF_STRIP_BYTE_COUNTS not in tags):
+        return None
+    samples = first(TIFF_SAMPLES_PER_PIXEL, 1)
+    if any(bits != 8 for bits in tags.get(TIFF_BITS_PER_SAMPLE, (1,))):
+        return None
+
+    photometric = first(TIFF_PHOTOMETRIC)
+    if photometric == 1 and samples == 1:
+        image_format = QImage.Format_Grayscale8
+    elif photometric == 2 and samples == 3:
+        image_format = QImage.Format_RGB888
+    elif photometric == 2 and samples == 4:
+        # 1 - альфа уже умножена на цвет, иначе - обычная прозрачность
+        associated = first(TIFF_EXTRA_SAMPLES, 0) == 1
+        image_format = QImage.Format_RGBA8888_Premultiplied if associated else QImage.Format_RGBA8888
+    else:
+        return None
+
+    # Полосы строк должны лежать в файле подряд, тогда всё изображение - один непрерывный буфер
+    offsets, byte_counts = tags[TIFF_STRIP_OFFSETS], tags[TIFF_STRIP_BYTE_COUNTS]
+    if len(offsets) != len(byte_counts) or any(offsets[i] + byte_counts[i] != offsets[i + 1]
+                                               for i in range(len(offsets) - 1)):
+        return None
+    width, height = first(TIFF_WIDTH), first(TIFF_HEIGHT)
+    if width is None or height is None:
+        return None
+    return offsets[0], width, height, width * samples, image_format, False
@@ -1,6 +1,22 @@
 import os
-from PyQt5.QtGui import QImage, QPixmap
-from PyQt5.QtCore import Qt
+import sys
+import math
+import time
+import ctypes
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from PyQt5 import sip
+from PyQt5.QtGui import QImage, QImageIOHandler, QImageReader, QPixmap, QPainter, QTransform
+from PyQt5.QtCore import Qt, QPoint, QRect, QRectF, QSize
+from .mmap_source import MappedImage, map_image
+from .resample import Resampling, resample, resampled_format
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class ImageOpeningError(Exception):
     pass
@@ -8,31 +24,553 @@ class ImageOpeningError(Exception):
 class ImageSavingError(Exception):
     pass
 
+class ImageScalingError(Exception):
+    pass
+
+class ImageArrayError(Exception):
+    pass
+
+# Порядок каналов в памяти для форматов, которые отдаются массивом numpy без копирования
+# (32-битные форматы Qt хранят пиксель как число 0xAARRGGBB, поэтому порядок байт зависит от платформы)
+ARRAY_CHANNELS = {
+    QImage.Format_Grayscale8: 'L',
+    QImage.Format_RGB888: 'RGB',
+    QImage.Format_BGR888: 'BGR',
+    QImage.Format_RGBX8888: 'RGBX',
+    QImage.Format_RGBA8888: 'RGBA',
+    QImage.Format_RGBA8888_Premultiplied: 'RGBA',
+    QImage.Format_RGB32: 'BGRX' if sys.byteorder == 'little' else 'XRGB',
+    QImage.Format_ARGB32: 'BGRA' if sys.byteorder == 'little' else 'ARGB',
+    QImage.Format_ARGB32_Premultiplied: 'BGRA' if sys.byteorder == 'little' else 'ARGB',
+}
+
+class _PixelBuffer:
+    ''' Описание памяти пикселей для numpy; держит ссылку на владельца, пока жив хотя бы один массив '''
+
+    def __init__(self, owner: object, address: int, shape: tuple, strides: tuple, writable: bool):
+        self.owner = owner
+        self.__array_interface__ = {
+            'version': 3,
+            'typestr': '|u1',
+            'data': (address, not writable),
+            'shape': shape,
+            'strides': strides,
+        }
+
 class MyImage:
-    def __init__(self, file_path:str):
-        self.__qimage = QImage(file_path)
-        if self.__qimage.isNull():
+    # Ограничение памяти под уровни пирамиды уменьшенных копий (в байтах)
+    DEFAULT_PYRAMID_BUDGET = 256 * 1024 * 1024
+    # Ограничение размера одной отмасштабированной копии (в байтах); больше - только по областям через get_scaled_region
+    DEFAULT_MAX_SCALED_BYTES = 512 * 1024 * 1024
+    # Изображения больше этого объёма (в байтах) целиком не декодируются, а читаются по областям
+    DEFAULT_MAX_DECODED_BYTES = 1024 * 1024 * 1024
+    # Число потоков для get_scaled и размер результата (в пикселях), начиная с которого они используются
+    DEFAULT_SCALE_WORKERS = 1
+    PARALLEL_MIN_PIXELS = 1024 * 1024
+    # Полосами в нескольких потоках масштабируется только numpy: масштабирование средствами Qt держит GIL,
+    # и потоки лишь мешали бы друг другу
+    PARALLEL_RESAMPLING = (Resampling.AREA, Resampling.LANCZOS)
+    # Уровень пирамиды строится полосами примерно по столько пикселей результата: масштабирование Qt держит GIL,
+    # и между полосами поток интерфейса успевает обработать события
+    LEVEL_STRIP_PIXELS = 256 * 1024
+    # Размер обзорной копии, заменяющей полностью декодированные пиксели при чтении по областям
+    OVERVIEW_SIZE = QSize(4096, 4096)
+
+    # Счётчик для уникальных идентификаторов изображений (id() объекта может повториться после удаления)
+    __ids = itertools.count(1)
+
+    def __init__(self, file_path:str, pyramid_budget: int = DEFAULT_PYRAMID_BUDGET,
+                 max_scaled_bytes: int = DEFAULT_MAX_SCALED_BYTES, max_decoded_bytes: int = DEFAULT_MAX_DECODED_BYTES,
+                 map_file: bool = True):
+        # Из файла сразу читается только заголовок, пиксели декодируются при первом обращении к ним
+        reader = QImageReader(file_path)
+        size = reader.size()
+        qimage = None
+        if not size.isValid():
+            # Формат не сообщает размер без декодирования - декодируем сразу
+            qimage = reader.read()
+            if qimage.isNull():
+                raise ImageOpeningError("Не удалось открыть изображение")
+            size = qimage.size()
+        self.__setup(file_path, reader, qimage, size, pyramid_budget, max_scaled_bytes)
+        self.__map_file = map_file
+
+        # Слишком большое изображение читается по областям, если формат умеет декодировать часть файла
+        self.__region_mode = (qimage is None and size.width() * size.height() * 4 > max_decoded_bytes
+                              and reader.supportsOption(QImageIOHandler.ClipRect))
+
+    @classmethod
+    def open_preview(cls, file_path: str, max_size: QSize, pyramid_budget: int = DEFAULT_PYRAMID_BUDGET,
+                     max_scaled_bytes: int = DEFAULT_MAX_SCALED_BYTES) -> 'MyImage|None':
+        ''' Метод быстрого открытия уменьшенной копии, вписанной в max_size (None, если изображение и так не больше) '''
+        reader = QImageReader(file_path)
+        size = reader.size()
+        if not size.isValid():
+            raise ImageOpeningError("Не удалось открыть изображение")
+        if size.width() <= max_size.width() and size.height() <= max_size.height():
+            return None
+
+        # Декодер сам уменьшает изображение при чтении (JPEG - в 2, 4, 8 раз дешевле полного декодирования)
+        reader.setScaledSize(size.scaled(max_size, Qt.KeepAspectRatio))
+        qimage = reader.read()
+        if qimage.isNull():
             raise ImageOpeningError("Не удалось открыть изображение")
-        
+
+        image = cls.__new__(cls)
+        image.__setup(file_path, reader, qimage, size, pyramid_budget, max_scaled_bytes)
+        return image
+
+    def __setup(self, file_path: str, reader: QImageReader, qimage: QImage|None, size: QSize,
+                pyramid_budget: int, max_scaled_bytes: int):
+        ''' Общая инициализация: qimage - декодированные пиксели (None - декодировать при обращении), size - полный размер '''
+        self.__path = file_path
+        self.__qimage = qimage
+        self.__size = size
+        self.__preview = qimage is not None and qimage.size() != size
+        self.__region_mode = False
+        self.__clip_decoding = reader.supportsOption(QImageIOHandler.ClipRect)
+        # Несжатый файл, отображённый в память: пиксели не копируются, строки BMP могут идти снизу вверх
+        self.__mapped: MappedImage|None = None
+        self.__flipped = False
+        # Файл, который могут перезаписать или обрезать на месте, не отображается: обращение к странице
+        # за новым концом файла завершает процесс (SIGBUS)
+        self.__map_file = True
+        # Массив numpy, поверх которого создано изображение (from_array), должен жить не меньше изображения
+        self.__array = None
         self.__name = os.path.splitext(os.path.basename(file_path))[0]
+        self.__id = next(MyImage.__ids)
+
+        # Сведения из заголовка файла, доступные без декодирования пикселей
+        self.__format = bytes(reader.format()).decode()
+        self.__metadata = {key: reader.text(key) for key in reader.textKeys()}
+
+        # Уровни пирамиды: уровень k уменьшен в 2^k раз, уровень 0 - само изображение.
+        # Уровни строятся по требованию и вытесняются по давности использования
+        self.__pyramid_budget = pyramid_budget
+        self.__levels: OrderedDict[int, QImage] = OrderedDict()
+        # Плитки отрисовываются в фоновых потоках, поэтому доступ к уровням и декодирование синхронизированы
+        self.__levels_lock = threading.RLock()
+
+        self.__max_scaled_bytes = max_scaled_bytes
+        self.__scale_workers = self.DEFAULT_SCALE_WORKERS
+
+    @classmethod
+    def from_array(cls, array: 'np.ndarray', name: str = 'array', pyramid_budget: int = DEFAULT_PYRAMID_BUDGET,
+                   max_scaled_bytes: int = DEFAULT_MAX_SCALED_BYTES) -> 'MyImage':
+        ''' Метод создания изображения поверх массива numpy uint8 формы (h, w), (h, w, 3) или (h, w, 4) без копирования '''
+        if np is None:
+            raise ImageArrayError("Для работы с массивами нужен пакет numpy")
+        if array.dtype != np.uint8 or array.ndim not in (2, 3) or (array.ndim == 3 and array.shape[2] not in (3, 4)):
+            raise ImageArrayError("Поддерживаются массивы uint8 формы (h, w), (h, w, 3) и (h, w, 4)")
+        height, width = array.shape[:2]
+        channels = 1 if array.ndim == 2 else array.shape[2]
+        if array.strides[1] != channels or array.strides[-1] != 1 or array.strides[0] < width * channels:
+            raise ImageArrayError("Пиксели в строках массива должны идти подряд (см. numpy.ascontiguousarray)")
+
+        image_format = {1: QImage.Format_Grayscale8, 3: QImage.Format_RGB888, 4: QImage.Format_RGBA8888}[channels]
+        qimage = QImage(sip.voidptr(array.ctypes.data), width, height, array.strides[0], image_format)
+        # Обёртка изображения держит массив, пока жива она сама
+        qimage.source_array = array
+        image = cls.__new__(cls)
+        image.__setup(name, QImageReader(), qimage, qimage.size(), pyramid_budget, max_scaled_bytes)
+        image.__array = array
+        return image
+
+    def to_array(self, writable: bool = False) -> 'np.ndarray':
+        ''' Метод получения пикселей как массива numpy (h, w[, каналы]) без копирования, порядок каналов - get_array_channels '''
+        if np is None:
+            raise ImageArrayError("Для работы с массивами нужен пакет numpy")
+        if self.__preview or self.__region_mode:
+            raise ImageArrayError(f"Пиксели изображения '{self.__name}' не загружены полностью")
+        if writable and self.__array is not None and not self.__array.flags.writeable:
+            raise ImageArrayError(f"Массив изображения '{self.__name}' доступен только для чтения")
+
+        pixels = self.__array_pixels()
+        channels = len(ARRAY_CHANNELS[pixels.format()])
+        # bits() у единственного владельца данных не копирует их, constBits() не копирует никогда
+        address = int(pixels.bits() if writable else pixels.constBits())
+        shape = (pixels.height(), pixels.width()) + ((channels,) if channels > 1 else ())
+        strides = (pixels.bytesPerLine(), channels) + ((1,) if channels > 1 else ())
+        if self.__flipped:
+            # Строки хранятся снизу вверх: начинаем с последней и идём с отрицательным шагом
+            address += pixels.bytesPerLine() * (pixels.height() - 1)
+            strides = (-strides[0],) + strides[1:]
+        return np.asarray(_PixelBuffer(self, address, shape, strides, writable))
+
+    def get_array_channels(self) -> str:
+        ''' Метод получения порядка каналов в массиве to_array ('RGB', 'BGRA', 'L' - оттенки серого, X - без значения) '''
+        return ARRAY_CHANNELS[self.__array_pixels().format()]
+
+    def mark_modified(self):
+        ''' Метод, сообщающий об изменении пикселей (например, через to_array(writable=True)): сбрасывает уровни и плитки '''
+        with self.__levels_lock:
+            self.__levels.clear()
+            # Новый идентификатор - новые ключи в кэшах, старые плитки вытеснятся сами
+            self.__id = next(MyImage.__ids)
+
+    def __array_pixels(self) -> QImage:
+        ''' Пиксели в формате, который можно отдать массивом; прочие форматы один раз приводятся к ARGB32 '''
+        pixels = self.__pixels()
+        if pixels.format() not in ARRAY_CHANNELS:
+            with self.__levels_lock:
+                if self.__qimage.format() not in ARRAY_CHANNELS:
+                    self.__qimage = self.__qimage.convertToFormat(QImage.Format_ARGB32)
+                pixels = self.__qimage
+        return pixels
+
+    def load(self):
+        ''' Метод декодирования пикселей, если они ещё не декодированы (например, заранее в фоновом потоке) '''
+        self.__pixels()
+
+    def is_loaded(self) -> bool:
+        ''' Метод проверки, декодированы ли пиксели изображения '''
+        return self.__qimage is not None
+
+    def __pixels(self) -> QImage:
+        ''' Декодированные пиксели изображения, при первом обращении читаются из файла '''
+        if self.__qimage is None:
+            with self.__levels_lock:
+                if self.__qimage is None:
+                    self.__mapped = map_image(self.__path) if self.__map_file and not self.__region_mode else None
+                    if self.__mapped is not None:
+                        self.__flipped = self.__mapped.is_flipped()
+                        self.__qimage = self.__mapped.get_image()
+                        return self.__qimage
+
+                    reader = QImageReader(self.__path)
+                    if self.__region_mode:
+                        # Вместо полного изображения - обзорная копия, детали читаются по областям
+                        overview = self.__size.scaled(self.OVERVIEW_SIZE, Qt.KeepAspectRatio)
+                        if overview.width() < self.__size.width():
+                            reader.setScaledSize(overview)
+                    qimage = reader.read()
+                    if qimage.isNull():
+                        raise ImageOpeningError(f"Не удалось декодировать изображение '{self.__name}'")
+                    self.__qimage = qimage
+        return self.__qimage
 
     def save(self, file_path: str):
         ''' Функция сохранения изображения по указанному пути '''
-        if not self.__qimage.save(file_path):
+        if self.is_preview():
+            raise ImageSavingError(f"Изображение '{self.__name}' ещё не загружено полностью")
+        if self.__region_mode:
+            raise ImageSavingError(f"Изображение '{self.__name}' слишком велико для сохранения")
+        pixels = self.__pixels()
+        if self.__flipped:
+            pixels = pixels.mirrored(False, True)
+        if not pixels.save(file_path):
             raise ImageSavingError(f"Не удалось сохранить изображение '{self.__name}'")
     
+    def save_scaled(self, file_path: str, scale: float, resampling: Resampling = Resampling.BILINEAR):
+        ''' Функция сохранения отмасштабированной копии изображения по указанному пути '''
+        if self.is_preview():
+            raise ImageSavingError(f"Изображение '{self.__name}' ещё не загружено полностью")
+        if not self.get_scaled(scale, resampling).save(file_path):
+            raise ImageSavingError(f"Не удалось сохранить изображение '{self.__name}'")
+
     def get_width(self) -> int:
         ''' Метод получения ширины изображения '''
-        return self.__qimage.width()
+        return self.__size.width()
     
     def get_height(self) -> int:
         ''' Метод получения высоты изображения '''
-        return self.__qimage.height()
+        return self.__size.height()
     
-    def get_scaled(self, scale: float) -> QImage:
+    def get_scaled(self, scale: float, resampling: Resampling = Resampling.BILINEAR) -> QImage:
         ''' Метод, создающий отмасштабированную компию изображения '''
-        return self.__qimage.scaled(self.__qimage.size() * scale, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        if not self.can_scale(scale):
+            raise ImageScalingError(f"Изображение '{self.__name}' в масштабе {scale:.2f}x не помещается в отведённую память")
+        if self.__needs_regions(scale):
+            return self.read_region(QRect(QPoint(0, 0), self.__size), self.get_scaled_size(scale))
+        size = self.get_scaled_size(scale)
+        # Уровень строится до разделения на полосы, иначе потоки будут ждать друг друга на блокировке пирамиды
+        level = self.get_level(self.__level_for_resampling(scale, resampling))
+        # Уровень пирамиды точно нужного размера отдаётся без пересчёта, делить на полосы нечего;
+        # потоков больше, чем ядер, не бывает - на одном ядре полосы только добавляют работу
+        workers = min(self.__scale_workers, os.cpu_count() or 1)
+        if (workers > 1 and np is not None and resampling in self.PARALLEL_RESAMPLING
+                and size.width() * size.height() >= self.PARALLEL_MIN_PIXELS and level.size() != size):
+            return self.__get_scaled_parallel(scale, resampling, level, workers)
+        scaled = resample(level, size, resampling)
+        if self.__flipped:
+            return scaled.mirrored(False, True)
+        if scaled.cacheKey() == level.cacheKey() and self.__is_borrowed():
+            # Масштаб без изменения размера Qt отдаёт как ту же память; чужая память (массив, файл) может
+            # освободиться раньше результата, поэтому результат получает свою копию
+            return scaled.copy()
+        return scaled
+
+    def __is_borrowed(self) -> bool:
+        ''' Проверка, лежат ли пиксели в чужой памяти (массив numpy или отображённый файл), а не в памяти Qt '''
+        return self.__array is not None or self.__mapped is not None
+
+    def __get_scaled_parallel(self, scale: float, resampling: Resampling, level: QImage, workers: int) -> QImage:
+        ''' Масштабирование горизонтальными полосами в workers потоках, полосы рисуются прямо в общий результат '''
+        size = self.get_scaled_size(scale)
+        result = QImage(size, QImage.Format_ARGB32_Premultiplied)
+        result.fill(Qt.transparent)
+
+        # Каждая полоса - отдельный QImage поверх своих строк результата: потоки пишут в разные участки памяти,
+        # а запас по краям исходной области (как у плиток) убирает швы между полосами
+        address = int(result.bits())
+        strips = min(workers, size.height())
+        jobs = []
+        for i in range(strips):
+            top, bottom = size.height() * i // strips, size.height() * (i + 1) // strips
+            strip = QImage(sip.voidptr(address + top * result.bytesPerLine()), size.width(), bottom - top,
+                           result.bytesPerLine(), result.format())
+            jobs.append((QRect(0, top, size.width(), bottom - top), strip))
+
+        with ThreadPoolExecutor(workers) as pool:
+            # list() дожидается всех полос и пробрасывает ошибку любой из них
+            list(pool.map(lambda job: self.__render_region(job[0], scale, resampling, job[1]), jobs))
+
+        # Формат результата - как у масштабирования в одном потоке
+        image_format = resampled_format(level, size, resampling)
+        return result if result.format() == image_format else result.convertToFormat(image_format)
+
+    def get_scale_workers(self) -> int:
+        ''' Метод получения числа потоков для масштабирования изображения целиком '''
+        return self.__scale_workers
+
+    def set_scale_workers(self, workers: int):
+        ''' Метод установки числа потоков для масштабирования изображения целиком (1 - в текущем потоке, больше числа ядер не используется) '''
+        self.__scale_workers = max(1, workers)
+
+    def get_scaled_bytes(self, scale: float) -> int:
+        ''' Метод оценки объёма памяти под отмасштабированную копию изображения '''
+        size = self.get_scaled_size(scale)
+        return size.width() * size.height() * 4
+
+    def can_scale(self, scale: float) -> bool:
+        ''' Метод проверки, можно ли создать отмасштабированную копию целиком в пределах бюджета памяти '''
+        return self.get_scaled_bytes(scale) <= self.__max_scaled_bytes
+
+    def get_max_scaled_bytes(self) -> int:
+        ''' Метод получения бюджета памяти под одну отмасштабированную копию '''
+        return self.__max_scaled_bytes
+
+    def set_max_scaled_bytes(self, max_bytes: int):
+        ''' Метод установки бюджета памяти под одну отмасштабированную копию '''
+        self.__max_scaled_bytes = max_bytes
+
+    def get_scaled_size(self, scale: float) -> QSize:
+        ''' Метод получения размера изображения при заданном масштабе '''
+        return self.__size * scale
+
+    def get_scaled_region(self, rect: QRect, scale: float, resampling: Resampling = Resampling.BILINEAR) -> QImage:
+        ''' Метод, создающий отмасштабированную копию только области rect (в координатах отмасштабированного изображения) '''
+        if rect.width() * rect.height() * 4 > self.__max_scaled_bytes:
+            raise ImageScalingError(f"Область {rect.width()}x{rect.height()} не помещается в отведённую память")
+        result = QImage(rect.size(), QImage.Format_ARGB32_Premultiplied)
+        result.fill(Qt.transparent)
+        self.__render_region(rect, scale, resampling, result)
+        return result
+
+    def __render_region(self, rect: QRect, scale: float, resampling: Resampling, result: QImage):
+        ''' Отрисовка области rect отмасштабированного изображения в result (размером с rect) '''
+        if self.__needs_regions(scale):
+            # Деталей обзорной копии не хватает - читаем покрывающую rect область прямо из файла
+            source = QRectF(rect.x() / scale, rect.y() / scale, rect.width() / scale, rect.height() / scale)
+            source = source.toAlignedRect().adjusted(-1, -1, 1, 1) & QRect(QPoint(0, 0), self.__size)
+            if source.isEmpty():
+                return
+            target = QRectF(source.x() * scale - rect.x(), source.y() * scale - rect.y(),
+                            source.width() * scale, source.height() * scale)
+            # Уменьшает сам декодер, увеличение - при отрисовке
+            part = self.read_region(source, QSize(math.ceil(target.width()), math.ceil(target.height()))
+                                    if scale < 1 else None)
+        else:
+            # Берём ближайший уровень пирамиды, не меньший требуемого масштаба (для усреднения - исходные пиксели)
+            level = self.get_level(self.__level_for_resampling(scale, resampling))
+            scale_x = scale * self.__size.width() / level.width()
+            scale_y = scale * self.__size.height() / level.height()
+
+            # Область уровня, покрывающая rect, с запасом в пиксель для сглаживания на краях
+            source = QRectF(rect.x() / scale_x, rect.y() / scale_y, rect.width() / scale_x, rect.height() / scale_y)
+            source = source.toAlignedRect().adjusted(-1, -1, 1, 1) & level.rect()
+            if source.isEmpty():
+                return
+
+            part = self.__copy_level(level, source)
+            target = QRectF(source.x() * scale_x - rect.x(), source.y() * scale_y - rect.y(),
+                            source.width() * scale_x, source.height() * scale_y)
+            if scale_x < 1 or scale_y < 1 or resampling is Resampling.LANCZOS:
+                # При уменьшении QPainter сглаживает хуже, чем QImage.scaled, а фильтра Ланцоша у него нет,
+                # поэтому масштабируем фрагмент заранее
+                part = resample(part, QSize(math.ceil(target.width()), math.ceil(target.height())), resampling)
+
+        painter = QPainter(result)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, resampling is not Resampling.NEAREST)
+        painter.drawImage(target, part)
+        painter.end()
+
+    def __level_for_resampling(self, scale: float, resampling: Resampling) -> int:
+        ''' Уровень пирамиды, из которого масштабируется изображение: усреднение по площади берёт исходные пиксели '''
+        return 0 if resampling is Resampling.AREA else self.level_for_scale(scale)
     
+    def read_region(self, source: QRect, target_size: QSize|None = None) -> QImage:
+        ''' Метод чтения области source полного изображения, уменьшенной до target_size (None - без масштабирования) '''
+        if target_size is None:
+            target_size = source.size()
+        if self.__clip_decoding and (self.__region_mode or not self.is_loaded()):
+            # Декодер читает только нужную часть файла, полное изображение в память не попадает
+            reader = QImageReader(self.__path)
+            reader.setClipRect(source)
+            if target_size != source.size():
+                reader.setScaledSize(target_size)
+            region = reader.read()
+            if region.isNull():
+                raise ImageOpeningError(f"Не удалось прочитать область изображения '{self.__name}'")
+            return region
+
+        # Формат не поддерживает частичное декодирование - берём область из декодированных пикселей
+        pixels = self.__pixels()
+        factor_x = pixels.width() / self.__size.width()
+        factor_y = pixels.height() / self.__size.height()
+        part = self.__copy_level(pixels, QRectF(source.x() * factor_x, source.y() * factor_y,
+                                                source.width() * factor_x, source.height() * factor_y).toAlignedRect())
+        return part.scaled(target_size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
+    def __copy_level(self, level: QImage, source: QRect) -> QImage:
+        ''' Копия области source уровня пирамиды в обычной ориентации (сверху вниз) '''
+        if not self.__flipped:
+            return level.copy(source)
+        flipped = QRect(source.x(), level.height() - source.y() - source.height(), source.width(), source.height())
+        return level.copy(flipped).mirrored(False, True)
+
+    def get_level_transform(self, level: int) -> QTransform:
+        ''' Метод получения преобразования из координат уровня пирамиды в координаты полного изображения '''
+        return self.get_image_transform(self.get_level(level))
+
+    def get_image_transform(self, image: QImage) -> QTransform:
+        ''' Метод получения преобразования из координат уже полученного уровня image в координаты полного изображения '''
+        transform = QTransform.fromScale(self.__size.width() / image.width(), self.__size.height() / image.height())
+        if self.__flipped:
+            # Уровни хранятся в ориентации файла: строки снизу вверх
+            transform.translate(0, image.height()).scale(1, -1)
+        return transform
+
+    def __needs_regions(self, scale: float) -> bool:
+        ''' Проверка, нужно ли для масштаба читать области из файла (деталей обзорной копии не хватает) '''
+        return self.__region_mode and scale * self.__size.width() > self.__pixels().width()
+
+    def level_for_scale(self, scale: float) -> int:
+        ''' Метод выбора уровня пирамиды для масштаба: самый уменьшенный уровень, не меньший требуемого размера '''
+        # Масштаб относительно декодированных пикселей (у предпросмотра их меньше, чем в полном изображении)
+        pixels = self.__pixels()
+        scale = scale * self.__size.width() / pixels.width()
+        if scale >= 1:
+            return 0
+        max_level = int(math.log2(min(pixels.width(), pixels.height())))
+        return min(int(math.floor(math.log2(1 / scale))), max_level)
+
+    def get_level(self, level: int) -> QImage:
+        ''' Метод получения уровня пирамиды (уменьшенной в 2^level раз копии, в ориентации хранения - см. get_level_transform) '''
+        if level <= 0:
+            return self.__pixels()
+        with self.__levels_lock:
+            if level in self.__levels:
+                self.__levels.move_to_end(level)
+                return self.__levels[level]
+            # Строим от ближайшего уже построенного более крупного уровня, последовательно уменьшая вдвое
+            base = max((k for k in self.__levels if k < level), default=0)
+            image = self.__levels[base] if base else self.__pixels()
+            image_id = self.__id
+
+        # Построение идёт без блокировки: пока оно длится, get_built_level отдаёт уже готовые уровни
+        for k in range(base + 1, level + 1):
+            image = self.__halve(image)
+            with self.__levels_lock:
+                if image_id != self.__id:
+                    # Пиксели изменились (mark_modified) - построенное устарело и не сохраняется
+                    break
+                # Тот же уровень мог успеть построить другой поток - тогда остаётся его копия
+                image = self.__levels.setdefault(k, image)
+                self.__evict_levels()
+        return image
+
+    def __halve(self, image: QImage) -> QImage:
+        ''' Уменьшение уровня вдвое полосами строк (каждая строка результата - из двух строк исходника) '''
+        width, height = max(1, image.width() // 2), max(1, image.height() // 2)
+        rows = max(1, self.LEVEL_STRIP_PIXELS // width)
+        if rows >= height:
+            return image.scaled(width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
+        result = None
+        address = int(image.constBits())
+        for top in range(0, height, rows):
+            bottom = min(height, top + rows)
+            # Нечётная последняя строка исходника достаётся последней полосе
+            first, last = 2 * top, 2 * bottom if bottom < height else image.height()
+            source = QImage(sip.voidptr(address + first * image.bytesPerLine()), image.width(), last - first,
+                            image.bytesPerLine(), image.format())
+            source.setColorTable(image.colorTable())
+            part = source.scaled(width, bottom - top, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            if result is None:
+                result = QImage(width, height, part.format())
+                result.setColorTable(part.colorTable())
+            # Ширина и формат у полос и результата одинаковые - строки копируются подряд
+            ctypes.memmove(int(result.bits()) + top * result.bytesPerLine(), int(part.constBits()), part.sizeInBytes())
+            # Отдаём GIL потоку интерфейса: масштабирование полосы держало его всё время
+            time.sleep(0)
+        return result
+
+    def get_built_level(self, level: int) -> tuple[int, QImage]:
+        ''' Метод получения ближайшего к level уже построенного уровня, не крупнее нужного, без построения и ожидания: (номер, уровень) '''
+        # Пока другой поток строит уровень, блокировка занята - тогда берём исходные пиксели, а не ждём
+        if level > 0 and self.__levels_lock.acquire(blocking=False):
+            try:
+                built = max((k for k in self.__levels if k <= level), default=0)
+                if built:
+                    self.__levels.move_to_end(built)
+                    return built, self.__levels[built]
+            finally:
+                self.__levels_lock.release()
+        return 0, self.__pixels()
+
+    def get_pyramid_bytes(self) -> int:
+        ''' Метод получения объёма памяти, занятого уровнями пирамиды '''
+        with self.__levels_lock:
+            return sum(level.sizeInBytes() for level in self.__levels.values())
+
+    def get_max_memory_bytes(self) -> int:
+        ''' Метод получения наибольшего объёма памяти изображения: пиксели и все уровни пирамиды, которые оно может удерживать '''
+        pixels = self.__pixels()
+        # Каждый уровень вчетверо меньше предыдущего: все вместе - не больше трети пикселей (4 байта на пиксель - с запасом
+        # на смену формата при уменьшении); бюджет пирамиды превышается, только когда остаётся один уровень (не больше первого)
+        levels = pixels.width() * pixels.height() * 4 // 3
+        return pixels.sizeInBytes() + min(levels, max(self.__pyramid_budget, pixels.width() * pixels.height()))
+
+    def __evict_levels(self):
+        ''' Вытеснение давно не использованных уровней при превышении бюджета (последний построенный остаётся) '''
+        while len(self.__levels) > 1 and self.get_pyramid_bytes() > self.__pyramid_budget:
+            self.__levels.popitem(last=False)
+
+    def is_preview(self) -> bool:
+        ''' Метод проверки, является ли изображение уменьшенным предпросмотром '''
+        return self.__preview
+
+    def is_mapped(self) -> bool:
+        ''' Метод проверки, читаются ли пиксели прямо из отображённого в память файла (без копирования) '''
+        return self.__mapped is not None
+
+    def is_region_mode(self) -> bool:
+        ''' Метод проверки, читается ли изображение по областям (целиком не помещается в отведённую память) '''
+        return self.__region_mode
+
+    def get_id(self) -> int:
+        ''' Метод получения уникального идентификатора изображения (для ключей кэшей, меняется в mark_modified) '''
+        return self.__id
+
+    def get_format(self) -> str:
+        ''' Метод получения формата файла изображения (png, jpeg, ...) '''
+        return self.__format
+
+    def get_metadata(self) -> dict[str, str]:
+        ''' Метод получения текстовых метаданных из заголовка файла '''
+        return dict(self.__metadata)
+
     def get_name(self) -> str:
         ''' Метод получеия имени изображения '''
         return self.__name
@@ -0,0 +1,190 @@
+import sys
+from enum import Enum
+from PyQt5 import sip
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import Qt, QSize
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class Resampling(Enum):
+    ''' Способ передискретизации при масштабировании, от быстрого к качественному '''
+    NEAREST = 'nearest'     # Qt.FastTransformation: быстро, без сглаживания
+    BILINEAR = 'bilinear'   # Qt.SmoothTransformation: медленнее, со сглаживанием
+    AREA = 'area'           # Усреднение по площади исходных пикселей (numpy): лучшее качество при сильном уменьшении
+    LANCZOS = 'lanczos'     # Фильтр Ланцоша с тремя лепестками (numpy): самый чёткий, самый медленный
+
+    def transformation(self) -> Qt.TransformationMode:
+        ''' Метод получения ближайшего режима преобразования Qt '''
+        return Qt.FastTransformation if self is Resampling.NEAREST else Qt.SmoothTransformation
+
+class InteractionState(Enum):
+    ''' Состояние просмотра, для которого выбирается способ передискретизации '''
+    PANNING = 'panning'     # Идёт перемещение или масштабирование, плитки ещё не готовы
+    IDLE = 'idle'           # Пользователь остановился, видимая часть отрисовывается плитками
+    EXPORT = 'export'       # Сохранение отмасштабированной копии, время не важно
+
+# Способы по умолчанию для каждого состояния
+DEFAULT_RESAMPLING_POLICY = {
+    InteractionState.PANNING: Resampling.NEAREST,
+    InteractionState.IDLE: Resampling.BILINEAR,
+    InteractionState.EXPORT: Resampling.LANCZOS,
+}
+
+# Форматы, каналы которых можно усреднять как есть: без прозрачности или с уже умноженной на цвет альфой
+AVERAGED_FORMATS = {
+    QImage.Format_Grayscale8: 1,
+    QImage.Format_RGB888: 3,
+    QImage.Format_BGR888: 3,
+    QImage.Format_RGB32: 4,
+    QImage.Format_RGBX8888: 4,
+    QImage.Format_ARGB32_Premultiplied: 4,
+    QImage.Format_RGBA8888_Premultiplied: 4,
+}
+
+# Номер канала прозрачности в памяти: фильтр Ланцоша может дать цвет ярче альфы, его нужно ограничить
+ALPHA_CHANNELS = {
+    QImage.Format_ARGB32_Premultiplied: 3 if sys.byteorder == 'little' else 0,
+    QImage.Format_RGBA8888_Premultiplied: 3,
+}
+
+# Наибольший коэффициент блока: сумма factor^2 значений по 255 должна помещаться в uint32
+MAX_FACTOR = 4096
+
+# Число лепестков фильтра Ланцоша
+LANCZOS_LOBES = 3
+
+def resample(image: QImage, size: QSize, resampling: Resampling) -> QImage:
+    ''' Функция масштабирования изображения до size выбранным способом (без numpy - средствами Qt) '''
+    if resampling is Resampling.AREA and (image.width() > size.width() or image.height() > size.height()):
+        return area_downsample(image, size)
+    if resampling is Resampling.LANCZOS and np is not None and image.size() != size:
+        return lanczos_resample(image, size)
+    return image.scaled(size, Qt.IgnoreAspectRatio, resampling.transformation())
+
+def resampled_format(image: QImage, size: QSize, resampling: Resampling) -> QImage.Format:
+    ''' Функция получения формата, в котором resample вернёт результат, без самого масштабирования '''
+    if image.size() == size:
+        return image.format()
+    if resampling is Resampling.AREA and (image.width() > size.width() or image.height() > size.height()):
+        factor = min(image.width() // max(1, size.width()), image.height() // max(1, size.height()), MAX_FACTOR)
+        if np is None or factor < 2:
+            return _scaled_format(image.format(), Qt.SmoothTransformation)
+        # Блочное среднее сохраняет формат, досглаживание остатка - уже средствами Qt
+        blocks = QSize(-(-image.width() // factor), -(-image.height() // factor))
+        averaged = _averaged_format(image.format())
+        return averaged if blocks == size else _scaled_format(averaged, Qt.SmoothTransformation)
+    if resampling is Resampling.LANCZOS and np is not None:
+        return _averaged_format(image.format())
+    return _scaled_format(image.format(), resampling.transformation())
+
+def area_downsample(image: QImage, size: QSize) -> QImage:
+    ''' Функция уменьшения изображения усреднением по площади: целый коэффициент - блочным средним, остаток - сглаживанием Qt '''
+    factor = min(image.width() // max(1, size.width()), image.height() // max(1, size.height()))
+    if np is None or factor < 2:
+        return image.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    return block_average(image, factor).scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
+def block_average(image: QImage, factor: int) -> QImage:
+    ''' Функция уменьшения изображения в factor раз: каждый пиксель результата - среднее блока factor x factor '''
+    image, pixels = _pixels(image)
+
+    # Суммы по блокам строк, затем столбцов; последний блок может быть неполным, поэтому делим на его площадь
+    factor = min(factor, MAX_FACTOR)
+    row_sums = _block_sums(pixels, factor, 0, np.uint16 if factor * 255 <= 0xffff else np.uint32)
+    sums = _block_sums(row_sums, factor, 1, np.uint32)
+    areas = np.outer(_block_sizes(image.height(), factor), _block_sizes(image.width(), factor))[:, :, None]
+    return _image(((sums + areas // 2) // areas).astype(np.uint8), image.format())
+
+def lanczos_resample(image: QImage, size: QSize) -> QImage:
+    ''' Функция масштабирования фильтром Ланцоша: сначала по строкам, затем по столбцам '''
+    image, pixels = _pixels(image)
+    result = _lanczos_axis(_lanczos_axis(pixels, size.height(), 0), size.width(), 1)
+    result = np.clip(np.rint(result), 0, 255).astype(np.uint8)
+    alpha = ALPHA_CHANNELS.get(image.format())
+    if alpha is not None:
+        # В формате с умноженной альфой цвет не может быть больше прозрачности
+        np.minimum(result, result[:, :, alpha:alpha + 1], out=result)
+    return _image(result, image.format())
+
+def _pixels(image: QImage) -> tuple:
+    ''' Изображение в формате, каналы которого можно смешивать, и массив его пикселей (h, w, каналы) без копирования '''
+    if image.format() not in AVERAGED_FORMATS:
+        # Прозрачность смешивается правильно только умноженной на цвет
+        image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+    channels = AVERAGED_FORMATS[image.format()]
+
+    # Пиксели читаются прямо из памяти QImage, с учётом выравнивания строк
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    return image, rows[:, :image.width() * channels].reshape(image.height(), image.width(), channels)
+
+def _averaged_format(image_format: QImage.Format) -> QImage.Format:
+    ''' Формат, в котором смешиваются каналы изображения формата image_format (см. _pixels) '''
+    return image_format if image_format in AVERAGED_FORMATS else QImage.Format_ARGB32_Premultiplied
+
+def _scaled_format(image_format: QImage.Format, mode: Qt.TransformationMode) -> QImage.Format:
+    ''' Формат результата QImage.scaled: сглаживание Qt переводит часть форматов в 32-битные '''
+    return QImage(2, 2, image_format).scaled(3, 3, Qt.IgnoreAspectRatio, mode).format()
+
+def _image(pixels: 'np.ndarray', image_format: QImage.Format) -> QImage:
+    ''' QImage из массива (h, w, каналы) uint8 '''
+    height, width, channels = pixels.shape
+    pixels = np.ascontiguousarray(pixels)
+    # QImage поверх временного массива копируется, чтобы результат владел своими данными
+    return QImage(sip.voidptr(pixels.ctypes.data), width, height, width * channels, image_format).copy()
+
+def _block_sums(pixels: 'np.ndarray', factor: int, axis: int, dtype: type) -> 'np.ndarray':
+    ''' Суммы подряд идущих блоков по factor элементов вдоль оси axis, последний блок может быть неполным '''
+    length = pixels.shape[axis]
+    full = length // factor * factor
+    take = lambda start, stop, step=1: pixels[(slice(None),) * axis + (slice(start, stop, step),)]
+
+    # Складываем factor прореженных срезов: каждый проход векторизован, временных копий размером с изображение нет
+    sums = take(0, full, factor).astype(dtype)
+    for i in range(1, factor):
+        np.add(sums, take(i, full, factor), out=sums, casting='unsafe')
+    if full < length:
+        rest = take(full, length).sum(axis=axis, keepdims=True, dtype=dtype)
+        sums = np.concatenate((sums, rest), axis=axis)
+    return sums
+
+def _block_sizes(length: int, factor: int) -> 'np.ndarray':
+    ''' Размеры блоков при делении length на блоки по factor '''
+    sizes = np.full(-(-length // factor), factor, dtype=np.uint32)
+    sizes[-1] = length - factor * (len(sizes) - 1)
+    return sizes
+
+def _lanczos_axis(pixels: 'np.ndarray', length: int, axis: int) -> 'np.ndarray':
+    ''' Масштабирование массива вдоль оси axis до length элементов фильтром Ланцоша '''
+    source = pixels.shape[axis]
+    scale = length / source
+    # При уменьшении фильтр растягивается, чтобы усреднять все попадающие под пиксель результата исходные пиксели
+    stretch = min(scale, 1.0)
+    support = LANCZOS_LOBES / stretch
+
+    # Для каждого пикселя результата - номера исходных пикселей под фильтром и их нормированные веса
+    centers = (np.arange(length) + 0.5) / scale - 0.5
+    first = np.floor(centers - support).astype(np.int64) + 1
+    indices = first[:, None] + np.arange(int(np.ceil(2 * support)))[None, :]
+    distances = (indices - centers[:, None]) * stretch
+    weights = np.sinc(distances) * np.sinc(distances / LANCZOS_LOBES)
+    weights[np.abs(distances) >= LANCZOS_LOBES] = 0
+    weights /= weights.sum(axis=1, keepdims=True)
+    # За краем изображения повторяется крайний пиксель
+    indices = np.clip(indices, 0, source - 1)
+
+    # Обрабатываемая ось переносится вперёд и делается непрерывной: выборка по ней - копирование целых строк
+    moved = np.ascontiguousarray(np.moveaxis(pixels, axis, 0))
+    weights = weights.astype(np.float32).reshape((length, indices.shape[1]) + (1,) * (moved.ndim - 1))
+
+    # Цикл только по отводам фильтра, каждый отвод - несколько векторных операций над всеми пикселями
+    result = np.zeros((length,) + moved.shape[1:], dtype=np.float32)
+    term = np.empty_like(result)
+    for tap in range(indices.shape[1]):
+        np.multiply(weights[:, tap], moved[indices[:, tap]], out=term)
+        result += term
+    return np.moveaxis(result, 0, axis)
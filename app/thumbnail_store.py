@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import threading
+import time
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QSize
+
+class ThumbnailStore:
+    ''' Хранилище миниатюр на диске в одном файле SQLite: миниатюра действительна, пока у файла те же путь, время изменения и размер '''
+
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+    # Миниатюры без прозрачности хранятся в JPEG, с прозрачностью - в PNG
+    JPEG_QUALITY = 85
+
+    def __init__(self, db_path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Соединение одно на все потоки чтения миниатюр, запросы выполняются по очереди под блокировкой
+        self.__connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.__lock = threading.Lock()
+        self.__max_bytes = max_bytes
+        self.__hits = 0
+        self.__misses = 0
+        # Время последнего использования записывается пачками, а не при каждом чтении
+        self.__touched: dict[str, int] = {}
+
+        with self.__lock:
+            self.__connection.execute('PRAGMA journal_mode=WAL')
+            self.__connection.execute('PRAGMA synchronous=NORMAL')
+            self.__connection.execute('''CREATE TABLE IF NOT EXISTS thumbnails (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                file_size INTEGER NOT NULL,
+                box_width INTEGER NOT NULL,
+                box_height INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                last_used INTEGER NOT NULL)''')
+            self.__connection.execute('CREATE INDEX IF NOT EXISTS thumbnails_last_used ON thumbnails (last_used)')
+            self.__connection.commit()
+            self.__bytes = self.__connection.execute('SELECT COALESCE(SUM(LENGTH(data)), 0) FROM thumbnails').fetchone()[0]
+
+    def get(self, file_path: str, size: QSize) -> QImage|None:
+        ''' Метод получения миниатюры файла, вписанной в size (None - нет или файл с тех пор изменился) '''
+        key = self.__key(file_path)
+        if key is None:
+            return None
+        path, mtime_ns, file_size = key
+        with self.__lock:
+            row = self.__connection.execute(
+                'SELECT data FROM thumbnails WHERE path = ? AND mtime_ns = ? AND file_size = ? '
+                'AND box_width = ? AND box_height = ?',
+                (path, mtime_ns, file_size, size.width(), size.height())).fetchone()
+            if row is None:
+                self.__misses += 1
+                return None
+            self.__hits += 1
+            self.__touched[path] = time.time_ns()
+        image = QImage.fromData(row[0])
+        return None if image.isNull() else image
+
+    def put(self, file_path: str, size: QSize, image: QImage):
+        ''' Метод сохранения миниатюры файла, при превышении лимита вытесняются давно не использованные '''
+        key = self.__key(file_path)
+        if key is None:
+            return
+        path, mtime_ns, file_size = key
+        data = self.__encode(image)
+        with self.__lock:
+            old = self.__connection.execute('SELECT LENGTH(data) FROM thumbnails WHERE path = ?', (path,)).fetchone()
+            self.__connection.execute(
+                'INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (path, mtime_ns, file_size, size.width(), size.height(), data, time.time_ns()))
+            self.__bytes += len(data) - (old[0] if old else 0)
+            self.__touched.pop(path, None)
+            if self.__bytes > self.__max_bytes:
+                self.__evict()
+            self.__connection.commit()
+
+    def flush(self):
+        ''' Метод записи на диск времени последнего использования прочитанных миниатюр '''
+        with self.__lock:
+            self.__write_touched()
+            self.__connection.commit()
+
+    def close(self):
+        ''' Метод закрытия хранилища '''
+        self.flush()
+        with self.__lock:
+            self.__connection.close()
+
+    def get_bytes(self) -> int:
+        ''' Метод получения объёма сохранённых миниатюр '''
+        return self.__bytes
+
+    def get_max_bytes(self) -> int:
+        ''' Метод получения лимита хранилища по объёму '''
+        return self.__max_bytes
+
+    def get_hits(self) -> int:
+        ''' Метод получения числа найденных миниатюр '''
+        return self.__hits
+
+    def get_misses(self) -> int:
+        ''' Метод получения числа ненайденных миниатюр '''
+        return self.__misses
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__connection.execute('SELECT COUNT(*) FROM thumbnails').fetchone()[0]
+
+    def __evict(self):
+        ''' Удаление давно не использованных миниатюр, пока объём не станет меньше лимита (вызывается под блокировкой) '''
+        self.__write_touched()
+        # Удаляем с запасом в десятую часть лимита, чтобы не вытеснять при каждом следующем сохранении
+        target = self.__max_bytes * 9 // 10
+        rows = self.__connection.execute('SELECT path, LENGTH(data) FROM thumbnails ORDER BY last_used')
+        evicted = []
+        for path, length in rows:
+            if self.__bytes <= target:
+                break
+            evicted.append((path,))
+            self.__bytes -= length
+        self.__connection.executemany('DELETE FROM thumbnails WHERE path = ?', evicted)
+
+    def __write_touched(self):
+        if self.__touched:
+            self.__connection.executemany('UPDATE thumbnails SET last_used = ? WHERE path = ?',
+                                          [(used, path) for path, used in self.__touched.items()])
+            self.__touched.clear()
+
+    @staticmethod
+    def __key(file_path: str) -> tuple|None:
+        ''' Ключ миниатюры: (абсолютный путь, время изменения в нс, размер файла), None - файл недоступен '''
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+    def __encode(self, image: QImage) -> bytes:
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        if image.hasAlphaChannel():
+            image.save(buffer, 'PNG')
+        else:
+            image.save(buffer, 'JPEG', self.JPEG_QUALITY)
+        buffer.close()
+        return bytes(data)
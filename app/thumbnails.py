@@ -0,0 +1,233 @@
+import os
+from typing import Any
+from PyQt5.QtWidgets import QAbstractItemView, QListView, QWidget
+from PyQt5.QtGui import QColor, QImage, QImageReader, QPixmap
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, QSize, QThreadPool
+from .cache import LRUCache
+from .my_image import ImageOpeningError
+from .thumbnail_store import ThumbnailStore
+from .workers import Job
+
+def read_thumbnail(file_path: str, size: QSize) -> QImage:
+    ''' Функция чтения миниатюры, вписанной в size: декодер уменьшает изображение при чтении '''
+    reader = QImageReader(file_path)
+    image_size = reader.size()
+    if image_size.isValid() and (image_size.width() > size.width() or image_size.height() > size.height()):
+        # JPEG уменьшается прямо при декодировании, остальные форматы - сразу после, без копии полного размера у нас
+        reader.setScaledSize(image_size.scaled(size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        raise ImageOpeningError("Не удалось открыть изображение")
+    if image.width() > size.width() or image.height() > size.height():
+        # Размер не был известен заранее
+        image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+def load_thumbnail(file_path: str, size: QSize, store: ThumbnailStore|None) -> QImage:
+    ''' Функция получения миниатюры: из хранилища на диске, если она там есть и файл не менялся, иначе - чтением файла '''
+    if store is not None:
+        image = store.get(file_path, size)
+        if image is not None:
+            return image
+    image = read_thumbnail(file_path, size)
+    if store is not None:
+        store.put(file_path, size, image)
+    return image
+
+class ThumbnailModel(QAbstractListModel):
+    ''' Модель списка файлов с миниатюрами: миниатюра готовится в фоне при первом запросе ячейки, до этого - заглушка '''
+
+    DEFAULT_THUMBNAIL_SIZE = QSize(128, 128)
+    DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+    PLACEHOLDER_COLOR = QColor(96, 96, 96)
+
+    def __init__(self, thumbnail_size: QSize = DEFAULT_THUMBNAIL_SIZE, cache_bytes: int = DEFAULT_CACHE_BYTES,
+                 store: ThumbnailStore|None = None, parent: QObject|None = None):
+        super().__init__(parent)
+        self.__thumbnail_size = thumbnail_size
+        # Хранилище на диске: миниатюры уже просмотренных папок не читаются заново после перезапуска
+        self.__store = store
+        self.__files: list[str] = []
+        self.__rows: dict[str, int] = {}
+        # Готовые миниатюры по пути файла, уже в виде QPixmap: при отрисовке ячейки преобразований нет
+        self.__cache = LRUCache(cache_bytes, lambda pixmap: pixmap.width() * pixmap.height() * 4)
+        self.__placeholder = QPixmap(thumbnail_size)
+        self.__placeholder.fill(self.PLACEHOLDER_COLOR)
+
+        # Фоновое чтение: собственный пул; задачи остаются у нас до завершения, чтобы их можно было снять из очереди
+        self.__pool = QThreadPool(self)
+        self.__pending: dict[str, Job] = {}
+        # Уже начатые задачи отменённых поколений (путь, поколение): держим их до завершения
+        self.__detached: dict[tuple, Job] = {}
+        self.__failed: set[str] = set()
+        self.__generation = 0
+
+    def set_files(self, files: list[str]):
+        ''' Метод смены списка файлов, готовые миниатюры остаются в кэше '''
+        self.beginResetModel()
+        self.cancel_pending()
+        self.__files = list(files)
+        self.__rows = {file_path: row for row, file_path in enumerate(self.__files)}
+        self.__failed.clear()
+        self.endResetModel()
+
+    def update_files(self, files: list[str], updated: list[str] = ()):
+        ''' Метод обновления списка вставкой и удалением строк (выделение и прокрутка сохраняются), updated - изменившиеся файлы '''
+        remaining = set(files)
+        # Удаление снизу вверх, подряд идущие строки - одним изменением
+        row = len(self.__files) - 1
+        while row >= 0:
+            if self.__files[row] in remaining:
+                row -= 1
+                continue
+            last = row
+            while row >= 0 and self.__files[row] not in remaining:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, last)
+            del self.__files[row + 1:last + 1]
+            self.endRemoveRows()
+
+        # Оставшиеся строки идут в том же порядке, что и в новом списке: недостающие вставляются на свои места
+        existing = set(self.__files)
+        row = 0
+        while row < len(files):
+            if files[row] in existing:
+                row += 1
+                continue
+            first = row
+            while row < len(files) and files[row] not in existing:
+                row += 1
+            self.beginInsertRows(QModelIndex(), first, row - 1)
+            self.__files[first:first] = files[first:row]
+            self.endInsertRows()
+
+        if self.__files != files:
+            # Порядок списков разошёлся - проще построить модель заново
+            self.set_files(files)
+            return
+        self.__rows = {file_path: row for row, file_path in enumerate(self.__files)}
+        for file_path in updated:
+            self.__cache.remove(file_path)
+            self.__failed.discard(file_path)
+            self.__update_row(file_path)
+
+    def get_files(self) -> list[str]:
+        ''' Метод получения списка файлов модели '''
+        return self.__files
+
+    def get_file(self, row: int) -> str:
+        ''' Метод получения пути файла в строке row '''
+        return self.__files[row]
+
+    def get_thumbnail_size(self) -> QSize:
+        ''' Метод получения размера, в который вписываются миниатюры '''
+        return self.__thumbnail_size
+
+    def get_cache(self) -> LRUCache:
+        ''' Метод получения кэша миниатюр '''
+        return self.__cache
+
+    def get_store(self) -> ThumbnailStore|None:
+        ''' Метод получения хранилища миниатюр на диске '''
+        return self.__store
+
+    def get_pending_count(self) -> int:
+        ''' Метод получения числа миниатюр, ожидающих чтения или читаемых сейчас '''
+        return len(self.__pending)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.__files)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid() or index.row() >= len(self.__files):
+            return None
+        file_path = self.__files[index.row()]
+        if role == Qt.DisplayRole:
+            return os.path.basename(file_path)
+        if role == Qt.ToolTipRole:
+            return file_path
+        if role == Qt.DecorationRole:
+            # Представление запрашивает иконку только у отрисовываемых ячеек - они и читаются
+            thumbnail = self.__cache.get(file_path)
+            if thumbnail is None:
+                self.request_thumbnail(file_path)
+                return self.__placeholder
+            return thumbnail
+        return None
+
+    def request_thumbnail(self, file_path: str):
+        ''' Метод постановки чтения миниатюры в фоновый поток, по готовности ячейка обновляется '''
+        if file_path in self.__cache or file_path in self.__pending or file_path in self.__failed:
+            return
+        job = Job(load_thumbnail, file_path, self.__thumbnail_size, self.__store, tag=(file_path, self.__generation))
+        job.setAutoDelete(False)
+        job.signals.finished.connect(self.__on_thumbnail_read)
+        job.signals.failed.connect(self.__on_thumbnail_failed)
+        self.__pending[file_path] = job
+        self.__pool.start(job)
+
+    def cancel_queued(self):
+        ''' Метод снятия ещё не начатых чтений: ячейки, оставшиеся на экране, запросят миниатюры снова при отрисовке '''
+        for file_path, job in list(self.__pending.items()):
+            if self.__pool.tryTake(job):
+                del self.__pending[file_path]
+
+    def cancel_pending(self):
+        ''' Метод отмены всех чтений: ещё не начатые снимаются, результаты уже начатых попадут только в кэш '''
+        for file_path, job in self.__pending.items():
+            if not self.__pool.tryTake(job):
+                self.__detached[(file_path, self.__generation)] = job
+        self.__pending.clear()
+        self.__generation += 1
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        ''' Метод ожидания завершения фоновых чтений '''
+        return self.__pool.waitForDone(msecs)
+
+    def __on_thumbnail_read(self, tag: tuple, image: QImage):
+        file_path, generation = tag
+        self.__release(file_path, generation)
+        # Миниатюра не зависит от списка файлов, поэтому сохраняется и после его смены
+        self.__cache.put(file_path, QPixmap.fromImage(image))
+        self.__update_row(file_path)
+
+    def __on_thumbnail_failed(self, tag: tuple, error: Exception):
+        # Нечитаемый файл не запрашивается повторно при каждой перерисовке, остаётся заглушка
+        file_path, generation = tag
+        self.__release(file_path, generation)
+        if generation == self.__generation:
+            self.__failed.add(file_path)
+
+    def __release(self, file_path: str, generation: int):
+        ''' Освобождение завершившейся задачи '''
+        if generation == self.__generation:
+            self.__pending.pop(file_path, None)
+        else:
+            self.__detached.pop((file_path, generation), None)
+
+    def __update_row(self, file_path: str):
+        row = self.__rows.get(file_path)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+class ThumbnailView(QListView):
+    ''' Сетка миниатюр: ячейки одного размера, поэтому раскладка не опрашивает каждый из файлов '''
+
+    # Запас ячейки вокруг миниатюры: отступы и строка подписи
+    CELL_MARGIN = QSize(16, 32)
+
+    def __init__(self, model: ThumbnailModel, parent: QWidget|None = None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.setTextElideMode(Qt.ElideMiddle)
+        self.setIconSize(model.get_thumbnail_size())
+        self.setGridSize(model.get_thumbnail_size() + self.CELL_MARGIN)
+        self.setModel(model)
+
+        # При прокрутке ушедшие с экрана ячейки больше не ждут своей очереди
+        self.verticalScrollBar().valueChanged.connect(model.cancel_queued)
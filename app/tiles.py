@@ -0,0 +1,147 @@
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import QObject, QPoint, QRect, QThreadPool, pyqtSignal
+from .cache import LRUCache
+from .my_image import MyImage, Resampling
+from .workers import Job
+
+class TileRenderer(QObject):
+    ''' Отрисовка изображения плитками фиксированного размера с кэшированием готовых плиток '''
+
+    DEFAULT_TILE_SIZE = 256
+    DEFAULT_CACHE_BYTES = 128 * 1024 * 1024
+
+    # Плитка (масштаб, столбец, строка), запрошенная через request_tile, готова и лежит в кэше
+    tile_ready = pyqtSignal(float, int, int)
+    # Уровень пирамиды, запрошенный через request_level, построен
+    level_ready = pyqtSignal(int)
+
+    # Точность, с которой масштаб входит в ключ кэша: после 1.25 * 0.8 должен получиться тот же ключ, что у 1.0
+    SCALE_KEY_DIGITS = 6
+
+    def __init__(self, tile_size: int = DEFAULT_TILE_SIZE, cache_bytes: int = DEFAULT_CACHE_BYTES,
+                 parent: QObject|None = None):
+        super().__init__(parent)
+        self.__tile_size = tile_size
+        self.__cache = LRUCache(cache_bytes, lambda tile: tile.sizeInBytes())
+        self.__image: MyImage|None = None
+
+        # Фоновая отрисовка: собственный пул, чтобы отмена не задевала чужие задачи
+        self.__pool = QThreadPool(self)
+        self.__pending: set[tuple] = set()
+        self.__pending_levels: set[tuple] = set()
+        self.__generation = 0
+
+    def set_image(self, image: MyImage|None):
+        ''' Метод смены изображения, плитки предыдущих изображений остаются в кэше до вытеснения '''
+        if image is not self.__image:
+            self.cancel_pending()
+        self.__image = image
+
+    def get_tile_size(self) -> int:
+        ''' Метод получения размера стороны плитки '''
+        return self.__tile_size
+
+    def get_cache(self) -> LRUCache:
+        ''' Метод получения кэша плиток '''
+        return self.__cache
+
+    def tile_rect(self, scale: float, col: int, row: int) -> QRect:
+        ''' Метод получения прямоугольника плитки в координатах отмасштабированного изображения '''
+        size = self.__tile_size
+        bounds = QRect(QPoint(0, 0), self.__image.get_scaled_size(scale))
+        return QRect(col * size, row * size, size, size) & bounds
+
+    def visible_tiles(self, rect: QRect, scale: float) -> list[tuple[int, int]]:
+        ''' Метод получения плиток (столбец, строка), пересекающихся с rect '''
+        rect = rect & QRect(QPoint(0, 0), self.__image.get_scaled_size(scale))
+        if rect.isEmpty():
+            return []
+        size = self.__tile_size
+        return [(col, row)
+                for row in range(rect.top() // size, rect.bottom() // size + 1)
+                for col in range(rect.left() // size, rect.right() // size + 1)]
+
+    def get_tile(self, scale: float, col: int, row: int, resampling: Resampling = Resampling.BILINEAR) -> QImage:
+        ''' Метод получения плитки: из кэша или синхронной отрисовкой соответствующей области изображения '''
+        key = self.__key(scale, col, row, resampling)
+        tile = self.__cache.get(key)
+        if tile is None:
+            tile = self.__render(self.__image, key)
+            self.__cache.put(key, tile)
+        return tile
+
+    def cached_tile(self, scale: float, col: int, row: int, resampling: Resampling = Resampling.BILINEAR) -> QImage|None:
+        ''' Метод получения плитки только из кэша, без отрисовки '''
+        return self.__cache.get(self.__key(scale, col, row, resampling))
+
+    def request_tile(self, scale: float, col: int, row: int, resampling: Resampling = Resampling.BILINEAR):
+        ''' Метод постановки отрисовки плитки в фоновый поток, по готовности испускается tile_ready '''
+        key = self.__key(scale, col, row, resampling)
+        if key in self.__cache or key in self.__pending:
+            return
+        self.__pending.add(key)
+        job = Job(self.__render, self.__image, key, tag=(key, self.__generation))
+        job.signals.finished.connect(self.__on_tile_rendered)
+        job.signals.failed.connect(self.__on_tile_failed)
+        self.__pool.start(job)
+
+    def request_level(self, level: int):
+        ''' Метод постановки построения уровня пирамиды в фоновый поток, по готовности испускается level_ready '''
+        key = (self.__image.get_id(), level)
+        if key in self.__pending_levels:
+            return
+        self.__pending_levels.add(key)
+        job = Job(self.__image.get_level, level, tag=(key, self.__generation))
+        job.signals.finished.connect(self.__on_level_built)
+        job.signals.failed.connect(self.__on_level_failed)
+        self.__pool.start(job)
+
+    def cancel_pending(self):
+        ''' Метод отмены ещё не начатых фоновых отрисовок, результаты уже начатых будут отброшены '''
+        self.__pool.clear()
+        self.__pending.clear()
+        self.__pending_levels.clear()
+        self.__generation += 1
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        ''' Метод ожидания завершения фоновых отрисовок '''
+        return self.__pool.waitForDone(msecs)
+
+    def __key(self, scale: float, col: int, row: int, resampling: Resampling) -> tuple:
+        ''' Ключ плитки в кэше: (изображение, масштаб, качество, столбец, строка) '''
+        return (self.__image.get_id(), round(scale, self.SCALE_KEY_DIGITS), resampling, col, row)
+
+    def __render(self, image: MyImage, key: tuple) -> QImage:
+        # Изображение передаётся явно: в фоновом потоке self.__image может успеть смениться
+        _, scale, resampling, col, row = key
+        size = self.__tile_size
+        rect = QRect(col * size, row * size, size, size) & QRect(QPoint(0, 0), image.get_scaled_size(scale))
+        return image.get_scaled_region(rect, scale, resampling)
+
+    def __on_tile_rendered(self, tag: tuple, tile: QImage):
+        key, generation = tag
+        if generation != self.__generation:
+            # Пользователь успел сменить масштаб или изображение - результат устарел
+            return
+        self.__pending.discard(key)
+        self.__cache.put(key, tile)
+        _, scale, _, col, row = key
+        self.tile_ready.emit(scale, col, row)
+
+    def __on_level_built(self, tag: tuple, level: QImage):
+        key, generation = tag
+        if generation != self.__generation:
+            return
+        self.__pending_levels.discard(key)
+        self.level_ready.emit(key[1])
+
+    def __on_level_failed(self, tag: tuple, error: Exception):
+        key, generation = tag
+        if generation == self.__generation:
+            self.__pending_levels.discard(key)
+
+    def __on_tile_failed(self, tag: tuple, error: Exception):
+        # Плитка будет запрошена снова при следующей перерисовке
+        key, generation = tag
+        if generation == self.__generation:
+            self.__pending.discard(key)
@@ -1,14 +1,49 @@
 import os
+import sqlite3
 from PyQt5.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout,
-                            QFileDialog, QWidget, QLabel, QScrollArea,
-                            QMessageBox, QAction, QGridLayout,  QPushButton)
-from PyQt5.QtGui import QPixmap, QIcon, QMouseEvent
-from PyQt5.QtCore import Qt, QDir
-from PyQt5.QtGui import QPalette
+                            QFileDialog, QWidget,
+                            QMessageBox, QAction, QActionGroup, QGridLayout,  QPushButton, QProgressBar, QStackedWidget)
+from PyQt5.QtGui import QCloseEvent, QIcon, QMouseEvent
+from PyQt5.QtCore import Qt, QDir, QModelIndex, QStandardPaths, QTimer, QThreadPool
 from . import resources_rc
-from .my_image import MyImage, ImageOpeningError, ImageSavingError
+from .cache import LRUCache
+from .folder import DirectoryIndex
+from .my_image import MyImage, ImageOpeningError, ImageSavingError, ImageScalingError
+from .resample import DEFAULT_RESAMPLING_POLICY, InteractionState, Resampling
+from .canvas import ImageCanvas
+from .thumbnail_store import ThumbnailStore
+from .thumbnails import ThumbnailModel, ThumbnailView
+from .watch import LatestImageWatcher
+from .workers import Job
 
 class ImageViewer(QMainWindow):
+    # Минимальный интервал между отрисовками (один кадр): частые запросы объединяются в одну
+    FRAME_MS = 16
+    # Пределы масштаба; в пиксельном режиме память не зависит от масштаба, поэтому предел выше
+    MIN_SCALE = 0.01
+    MAX_SCALE = 10
+    PIXEL_MODE_MAX_SCALE = 64
+    # Изображения больше этого объёма (в байтах) не декодируются целиком, а читаются по видимым областям
+    MAX_DECODED_BYTES = 512 * 1024 * 1024
+    # Число соседних изображений папки, заранее загружаемых в направлении перехода
+    PREFETCH_COUNT = 2
+    # Лимит кэша уже загруженных изображений папки (по объёму декодированных пикселей)
+    PREFETCH_CACHE_BYTES = 512 * 1024 * 1024
+    # Файл хранилища миниатюр в папке кэша приложения
+    THUMBNAIL_STORE_NAME = 'thumbnails.sqlite'
+    # Названия способов передискретизации и состояний просмотра в меню "Вид -> Качество"
+    RESAMPLING_NAMES = {
+        Resampling.NEAREST: 'Ближайший сосед',
+        Resampling.BILINEAR: 'Билинейное',
+        Resampling.AREA: 'Усреднение по площади',
+        Resampling.LANCZOS: 'Ланцош',
+    }
+    STATE_NAMES = {
+        InteractionState.PANNING: 'При перемещении',
+        InteractionState.IDLE: 'В покое',
+        InteractionState.EXPORT: 'При экспорте',
+    }
+
     def __init__(self):
         super().__init__()
         self.__initUI()
@@ -20,6 +55,9 @@ class ImageViewer(QMainWindow):
         self.scroll_position = None
         
     def __initUI(self):
+        # Способ передискретизации для каждого состояния просмотра
+        self.resampling_policy = dict(DEFAULT_RESAMPLING_POLICY)
+
         self.setWindowTitle('Просмотр изображений')
         self.setGeometry(100, 100, 800, 600)
 
@@ -35,6 +73,36 @@ class ImageViewer(QMainWindow):
         open_action.setStatusTip('Открыть изображение')
         open_action.triggered.connect(self.__open_image)
         file_menu.addAction(open_action)
+
+        # Пункт "Открыть папку": просмотр изображений папки сеткой миниатюр
+        open_folder_action = QAction('Открыть папку', self)
+        open_folder_action.setShortcut('Ctrl+Shift+O')
+        open_folder_action.setStatusTip('Открыть папку и показать миниатюры её изображений')
+        open_folder_action.triggered.connect(self.__open_directory)
+        file_menu.addAction(open_folder_action)
+
+        # Пункт "Следить за папкой": каждое новое изображение папки показывается сразу, как только записано
+        self.watch_action = QAction('Следить за папкой', self)
+        self.watch_action.setShortcut('Ctrl+L')
+        self.watch_action.setStatusTip('Показывать самое новое изображение папки по мере появления файлов')
+        self.watch_action.setCheckable(True)
+        self.watch_action.toggled.connect(self.__toggle_watch)
+        file_menu.addAction(self.watch_action)
+
+        # Пункты перехода к соседним изображениям папки открытого файла
+        self.prev_image_action = QAction('Предыдущее изображение', self)
+        self.prev_image_action.setShortcut(Qt.Key_PageUp)
+        self.prev_image_action.setStatusTip('Открыть предыдущее изображение в папке')
+        self.prev_image_action.triggered.connect(self.__prev_image)
+        self.prev_image_action.setEnabled(False)
+        file_menu.addAction(self.prev_image_action)
+
+        self.next_image_action = QAction('Следующее изображение', self)
+        self.next_image_action.setShortcut(Qt.Key_PageDown)
+        self.next_image_action.setStatusTip('Открыть следующее изображение в папке')
+        self.next_image_action.triggered.connect(self.__next_image)
+        self.next_image_action.setEnabled(False)
+        file_menu.addAction(self.next_image_action)
         
         # Пункт "Сохранить"
         self.save_action = QAction('Сохранить изображение', self)
@@ -44,6 +112,48 @@ class ImageViewer(QMainWindow):
         self.save_action.setEnabled(False)
         file_menu.addAction(self.save_action)
 
+        # Пункт "Экспорт": сохранение копии в текущем масштабе
+        self.export_action = QAction('Экспортировать в текущем масштабе', self)
+        self.export_action.setShortcut('Ctrl+E')
+        self.export_action.setStatusTip('Сохранить копию изображения в текущем масштабе')
+        self.export_action.triggered.connect(self.__export_image)
+        self.export_action.setEnabled(False)
+        file_menu.addAction(self.export_action)
+
+        # Раздел меню "Вид"
+        view_menu = menubar.addMenu('Вид')
+
+        # Пункт "Пиксельный режим"
+        self.pixel_mode_action = QAction('Пиксельный режим', self)
+        self.pixel_mode_action.setShortcut('Ctrl+P')
+        self.pixel_mode_action.setStatusTip('Показывать пиксели без сглаживания при увеличении (до 64x)')
+        self.pixel_mode_action.setCheckable(True)
+        self.pixel_mode_action.toggled.connect(self.__toggle_pixel_mode)
+        view_menu.addAction(self.pixel_mode_action)
+
+        # Пункт "Миниатюры": сетка изображений папки вместо текущего изображения
+        self.thumbnails_action = QAction('Миниатюры', self)
+        self.thumbnails_action.setShortcut('Ctrl+T')
+        self.thumbnails_action.setStatusTip('Показать миниатюры изображений папки')
+        self.thumbnails_action.setCheckable(True)
+        self.thumbnails_action.toggled.connect(self.__toggle_thumbnails)
+        view_menu.addAction(self.thumbnails_action)
+
+        # Подменю "Качество": способ передискретизации для каждого состояния просмотра
+        quality_menu = view_menu.addMenu('Качество')
+        self.resampling_actions: dict[tuple[InteractionState, Resampling], QAction] = {}
+        for state, state_name in self.STATE_NAMES.items():
+            state_menu = quality_menu.addMenu(state_name)
+            group = QActionGroup(self)
+            for resampling, name in self.RESAMPLING_NAMES.items():
+                action = QAction(name, self)
+                action.setCheckable(True)
+                action.setChecked(self.resampling_policy[state] is resampling)
+                action.triggered.connect(lambda checked, state=state, resampling=resampling:
+                                         self.__set_resampling(state, resampling))
+                group.addAction(action)
+                state_menu.addAction(action)
+                self.resampling_actions[(state, resampling)] = action
 
         # Центральный виджет
         central_widget = QWidget()
@@ -57,20 +167,30 @@ class ImageViewer(QMainWindow):
         toolbar_layout = QHBoxLayout()
         main_layout.addLayout(toolbar_layout)
 
-        # Область отображения изображения
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.image_label = QLabel()
-        self.image_label.setAlignment(Qt.AlignCenter)
-        self.image_label.setBackgroundRole(QPalette.Dark)
-        self.image_label.setMouseTracking(True) 
-        self.image_label.mousePressEvent = self.__mouse_press_event
-        self.image_label.mouseMoveEvent = self.__mouse_move_event
-        self.image_label.mouseReleaseEvent = self.__mouse_release_event
-        self.scroll_area.setWidget(self.image_label)
-        main_layout.addWidget(self.scroll_area)
-
-        self.overlay_widget = QWidget(self.scroll_area.viewport())
+        # Область отображения изображения: сама рисует видимую часть и управляет полосами прокрутки
+        self.canvas = ImageCanvas()
+        self.canvas.setMouseTracking(True) 
+        self.canvas.mousePressEvent = self.__mouse_press_event
+        self.canvas.mouseMoveEvent = self.__mouse_move_event
+        self.canvas.mouseReleaseEvent = self.__mouse_release_event
+        self.canvas.set_resampling(self.resampling_policy[InteractionState.PANNING],
+                                   self.resampling_policy[InteractionState.IDLE])
+        # Отрисовка, не укладывающаяся в кадр, упрощается до конца взаимодействия
+        self.canvas.set_frame_budget(self.FRAME_MS)
+
+        # Сетка миниатюр папки: миниатюры читаются в фоне только для видимых ячеек
+        self.thumbnail_store = self.__open_thumbnail_store()
+        self.thumbnail_model = ThumbnailModel(store=self.thumbnail_store, parent=self)
+        self.thumbnail_view = ThumbnailView(self.thumbnail_model)
+        self.thumbnail_view.activated.connect(self.__on_thumbnail_activated)
+
+        # Изображение и сетка миниатюр занимают одно место, показывается одно из них
+        self.view_stack = QStackedWidget()
+        self.view_stack.addWidget(self.canvas)
+        self.view_stack.addWidget(self.thumbnail_view)
+        main_layout.addWidget(self.view_stack)
+
+        self.overlay_widget = QWidget(self.canvas.viewport())
         zoom_layout = QVBoxLayout(self.overlay_widget)
         zoom_layout.setContentsMargins(5, 5, 5, 5)
         zoom_layout.setSpacing(5)
@@ -139,14 +259,96 @@ class ImageViewer(QMainWindow):
         # Добавляем навигацию в основной layout панели инструментов
         zoom_layout.addLayout(nav_layout)
 
+        # Кнопки перехода к предыдущему и следующему изображению папки
+        folder_layout = QHBoxLayout()
+        folder_layout.setContentsMargins(5, 0, 5, 0)
+        folder_layout.setSpacing(2)
+
+        self.prev_image_btn = QPushButton('◀')
+        self.prev_image_btn.setFixedSize(25, 25)
+        self.prev_image_btn.clicked.connect(self.__prev_image)
+        self.prev_image_btn.setEnabled(False)
+        folder_layout.addWidget(self.prev_image_btn)
+
+        self.next_image_btn = QPushButton('▶')
+        self.next_image_btn.setFixedSize(25, 25)
+        self.next_image_btn.clicked.connect(self.__next_image)
+        self.next_image_btn.setEnabled(False)
+        folder_layout.addWidget(self.next_image_btn)
+
+        zoom_layout.addLayout(folder_layout)
+
         # # Добавляем разделитель или отступ между группами кнопок
         # spacer = QWidget()
         # spacer.setFixedSize(10, 10)
         # zoom_layout.addWidget(spacer)
 
+        # Таймер отложенной отрисовки: зум меняет scale_factor сразу, а отрисовка происходит не чаще раза за кадр
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(self.FRAME_MS)
+        self.render_timer.timeout.connect(self.__render)
+
+        # Загрузка изображений в фоновом потоке; новая загрузка или Esc отменяют предыдущую
+        self.load_pool = QThreadPool(self)
+        self.load_generation = 0
+        self.preview_shown = False
+        self.cancel_load_action = QAction('Отменить загрузку', self)
+        self.cancel_load_action.setShortcut(Qt.Key_Escape)
+        self.cancel_load_action.triggered.connect(self.__cancel_loading)
+        self.addAction(self.cancel_load_action)
+
+        # Индикатор загрузки в строке состояния
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, 0)
+        self.load_progress.setMaximumWidth(150)
+        self.load_progress.setVisible(False)
+        self.statusBar().addPermanentWidget(self.load_progress)
+
+        # Папка открытого файла: индекс папки строится в фоне и обновляется по её изменениям,
+        # отсюда - список изображений, номер текущего и путь текущего (по нему номер находится после изменений)
+        self.directory_index = DirectoryIndex(self)
+        self.directory_index.ready.connect(self.__on_directory_ready)
+        self.directory_index.changed.connect(self.__on_directory_changed)
+        self.folder_files: list[str] = []
+        self.folder_index = -1
+        self.folder_file: str|None = None
+        # Соседние изображения загружаются заранее в отдельном пуле, чтобы не мешать загрузке текущего;
+        # загруженные (и заранее, и открытые) хранятся в кэше, переход к ним мгновенный
+        self.prefetch_pool = QThreadPool(self)
+        self.prefetch_pool.setMaxThreadCount(1)
+        self.prefetch_jobs: dict[str, Job] = {}
+        # Объём считается с уровнями пирамиды, построенными позже, и не меняется, пока изображение в кэше
+        self.prefetch_cache = LRUCache(self.PREFETCH_CACHE_BYTES, lambda image: image.get_max_memory_bytes())
+        # Изображение, которое уже загружается заранее: оно будет показано, как только загрузится
+        self.pending_path: str|None = None
+
+        # Слежение за папкой: новые файлы берутся из индекса папки, показывается только самый новый кадр;
+        # время изменения ещё не отрисованного кадра - для подсчёта задержки от записи файла до отрисовки
+        self.latest_watcher = LatestImageWatcher(self.directory_index, self.MAX_DECODED_BYTES, self)
+        self.latest_watcher.frame_loaded.connect(self.__on_frame_loaded)
+        self.latest_watcher.frame_failed.connect(self.__on_frame_failed)
+        self.frame_mtime_ns: int|None = None
+
         # Статус
         self.statusBar().showMessage('Готов к работе')
 
+    def __open_thumbnail_store(self) -> ThumbnailStore|None:
+        ''' Функция открытия хранилища миниатюр в папке кэша (None - недоступно, миниатюры хранятся только в памяти) '''
+        directory = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+        if not directory:
+            return None
+        try:
+            return ThumbnailStore(os.path.join(directory, self.THUMBNAIL_STORE_NAME))
+        except (OSError, sqlite3.Error):
+            return None
+
+    def closeEvent(self, event: QCloseEvent):
+        # Время использования прочитанных миниатюр сохраняется, чтобы вытеснялись действительно давние
+        if self.thumbnail_store is not None:
+            self.thumbnail_store.flush()
+        super().closeEvent(event)
+
     def __open_image(self):
         ''' Функция вызова окна открытия изображения '''
         file_path, _ = QFileDialog.getOpenFileName(
@@ -157,35 +359,353 @@ class ImageViewer(QMainWindow):
         )
         
         if file_path:
-            try:
-                self.current_image = MyImage(file_path)
-                self.__display_image()
-                self.scale_factor = 1.0
-                self.nav_up_btn.setEnabled(True)
-                self.nav_down_btn.setEnabled(True)
-                self.nav_left_btn.setEnabled(True)
-                self.nav_right_btn.setEnabled(True)
-                self.save_action.setEnabled(True)
-                self.zoom_in_btn.setEnabled(True)
-                self.zoom_out_btn.setEnabled(True)
-                self.original_size_btn.setEnabled(True)
-                self.statusBar().showMessage(f'Загружено: {os.path.basename(file_path)}')
-                
-            except ImageOpeningError as e:
-                QMessageBox.warning(self, 'Ошибка', 'Не удалось загрузить изображение')
-            except Exception as e:
-                QMessageBox.warning(self, 'Ошибка', f'Ошибка при загрузке изображения: {str(e)}')
+            self.watch_action.setChecked(False)
+            self.thumbnails_action.setChecked(False)
+            self.__open_folder(os.path.dirname(file_path), file_path)
+            self.__load_image(file_path)
+
+    def __open_directory(self):
+        ''' Функция вызова окна выбора папки, её изображения показываются миниатюрами '''
+        directory = QFileDialog.getExistingDirectory(self, 'Открыть папку', '')
+        if directory:
+            self.watch_action.setChecked(False)
+            self.__open_folder(directory)
+            self.thumbnails_action.setChecked(True)
+            self.statusBar().showMessage(f'Папка {os.path.basename(directory)}: чтение списка изображений...')
+
+    def __open_folder(self, directory: str, file_path: str|None = None):
+        ''' Функция открытия папки, file_path - открываемый файл; список изображений появится по готовности индекса '''
+        self.prefetch_cache.clear()
+        self.folder_files = []
+        self.folder_index = -1
+        self.folder_file = file_path
+        self.thumbnail_model.set_files([])
+        self.directory_index.set_directory(directory)
+        self.__update_folder_actions()
+
+    def __toggle_watch(self, enabled: bool):
+        ''' Функция включения слежения за выбранной папкой и его выключения '''
+        if not enabled:
+            self.latest_watcher.stop()
+            self.frame_mtime_ns = None
+            self.statusBar().showMessage('Слежение за папкой выключено')
+            return
+        directory = QFileDialog.getExistingDirectory(self, 'Следить за папкой', '')
+        if not directory:
+            self.watch_action.setChecked(False)
+            return
+        self.thumbnails_action.setChecked(False)
+        self.__open_folder(directory)
+        self.latest_watcher.start()
+        self.statusBar().showMessage(f'Слежение за папкой {os.path.basename(directory)}: ожидание изображений...')
+
+    def __on_frame_loaded(self, file_path: str, image: MyImage, mtime_ns: int):
+        ''' Функция показа нового кадра папки: масштаб сохраняется, пока размер кадров не меняется '''
+        # Новый кадр важнее открываемого вручную изображения
+        self.__start_loading()
+        self.load_progress.setVisible(False)
+        self.folder_file = file_path
+        self.folder_index = self.directory_index.index_of(file_path)
+        self.__update_folder_actions()
+        same_size = (self.current_image is not None and
+                     (image.get_width(), image.get_height()) == (self.current_image.get_width(), self.current_image.get_height()))
+        self.frame_mtime_ns = mtime_ns
+        if same_size:
+            self.current_image = image
+            self.__display_image()
+        else:
+            self.__show_loaded_image(image)
+        self.save_action.setEnabled(True)
+        self.export_action.setEnabled(True)
+
+    def __on_frame_failed(self, file_path: str, error: Exception):
+        ''' Функция сообщения о кадре, который так и не удалось прочитать: слежение продолжается '''
+        self.statusBar().showMessage(f'Не удалось прочитать {os.path.basename(file_path)}: {error}')
+
+    def __on_directory_ready(self):
+        ''' Функция получения построенного индекса папки '''
+        self.folder_files = self.directory_index.get_files()
+        self.folder_index = self.directory_index.index_of(self.folder_file) if self.folder_file else -1
+        self.thumbnail_model.set_files(self.folder_files)
+        self.__update_folder_actions()
+        if self.folder_index >= 0:
+            self.__prefetch_neighbors(1)
+        elif self.thumbnails_action.isChecked():
+            directory = self.directory_index.get_directory()
+            self.statusBar().showMessage(f'Папка {os.path.basename(directory)}: изображений - {len(self.folder_files)}')
+
+    def __on_directory_changed(self, added: list[str], removed: list[str], updated: list[str]):
+        ''' Функция обновления списка изображений по изменениям папки, без перечитывания всей папки '''
+        for file_path in removed + updated:
+            # Удалённые и изменившиеся файлы больше не соответствуют загруженным заранее изображениям
+            self.prefetch_cache.remove(file_path)
+        if self.folder_file in updated and self.current_image is not None and self.current_image.is_mapped():
+            # Показанное изображение читается прямо из файла, а файл перезаписан: страницы за новым концом
+            # файла недоступны, поэтому изображение сразу убирается с экрана и открывается заново
+            self.current_image = None
+            self.canvas.set_image(None, self.scale_factor)
+            self.__load_image(self.folder_file)
+        self.__watch_loaded_files()
+        self.folder_files = self.directory_index.get_files()
+        self.folder_index = self.directory_index.index_of(self.folder_file) if self.folder_file else -1
+        self.thumbnail_model.update_files(self.folder_files, updated)
+        self.__update_folder_actions()
+
+    def __watch_loaded_files(self):
+        ''' Функция наблюдения за файлами загруженных изображений: их перезапись на месте индекс папки иначе не заметит '''
+        files = set(self.prefetch_cache.keys())
+        if self.folder_file is not None:
+            files.add(self.folder_file)
+        self.directory_index.set_watched_files(sorted(files))
+
+    def __update_folder_actions(self):
+        ''' Функция включения перехода по папке: назад - если текущее не первое, вперёд - если не последнее '''
+        # В сетке миниатюр PageUp и PageDown прокручивают саму сетку
+        browsing = self.thumbnails_action.isChecked()
+        has_prev = not browsing and self.folder_index > 0
+        has_next = not browsing and 0 <= self.folder_index < len(self.folder_files) - 1
+        self.prev_image_action.setEnabled(has_prev)
+        self.prev_image_btn.setEnabled(has_prev)
+        self.next_image_action.setEnabled(has_next)
+        self.next_image_btn.setEnabled(has_next)
+
+    def __prev_image(self):
+        ''' Функция перехода к предыдущему изображению папки '''
+        self.__step_image(-1)
+
+    def __next_image(self):
+        ''' Функция перехода к следующему изображению папки '''
+        self.__step_image(1)
+
+    def __step_image(self, step: int):
+        ''' Функция перехода на step изображений по папке '''
+        if self.folder_index >= 0:
+            self.__go_to_image(self.folder_index + step, step)
+
+    def __go_to_image(self, index: int, direction: int):
+        ''' Функция перехода к изображению папки с номером index: из кэша - сразу, иначе - фоновой загрузкой '''
+        if not 0 <= index < len(self.folder_files):
+            return
+        self.folder_index = index
+        file_path = self.folder_file = self.folder_files[index]
+        self.__update_folder_actions()
+
+        image = self.prefetch_cache.get(file_path)
+        job = self.prefetch_jobs.get(file_path)
+        if image is not None:
+            # Уже загружено: показываем без ожидания, текущая загрузка больше не нужна
+            self.__start_loading()
+            self.__on_image_loaded((self.load_generation, file_path), image)
+        elif job is not None and not self.prefetch_pool.tryTake(job):
+            # Уже загружается заранее: повторно не загружаем, а ждём эту загрузку
+            self.__start_loading()
+            self.pending_path = file_path
+            self.load_progress.setVisible(True)
+            self.statusBar().showMessage(f'Загрузка: {os.path.basename(file_path)}... (Esc - отмена)')
+        else:
+            self.prefetch_jobs.pop(file_path, None)
+            self.__load_image(file_path)
+        self.__prefetch_neighbors(direction)
+
+    def __prefetch_neighbors(self, direction: int):
+        ''' Функция загрузки заранее PREFETCH_COUNT изображений папки, следующих в направлении перехода '''
+        if self.folder_index < 0:
+            return
+        wanted = [self.folder_files[i] for i in range(self.folder_index + direction,
+                                                      self.folder_index + direction * (self.PREFETCH_COUNT + 1), direction)
+                  if 0 <= i < len(self.folder_files)]
+
+        # Ещё не начатые загрузки, ставшие ненужными, снимаются из очереди
+        for file_path, job in list(self.prefetch_jobs.items()):
+            if file_path not in wanted and self.prefetch_pool.tryTake(job):
+                del self.prefetch_jobs[file_path]
+
+        for file_path in wanted:
+            if file_path in self.prefetch_cache or file_path in self.prefetch_jobs:
+                continue
+            # Изображение в кэше живёт долго, файл за это время могут перезаписать - он не отображается в память
+            job = Job(self.__open_full_image, file_path, self.MAX_DECODED_BYTES, False, tag=file_path)
+            # Задача остаётся у нас, пока не завершится: так её можно безопасно снять из очереди
+            job.setAutoDelete(False)
+            job.signals.finished.connect(self.__on_image_prefetched)
+            job.signals.failed.connect(self.__on_image_prefetch_failed)
+            self.prefetch_jobs[file_path] = job
+            self.prefetch_pool.start(job)
+
+    def __on_image_prefetched(self, file_path: str, image: MyImage):
+        self.prefetch_jobs.pop(file_path, None)
+        self.prefetch_cache.put(file_path, image)
+        self.__watch_loaded_files()
+        if file_path == self.pending_path:
+            self.pending_path = None
+            self.__on_image_loaded((self.load_generation, file_path), image)
+
+    def __on_image_prefetch_failed(self, file_path: str, error: Exception):
+        self.prefetch_jobs.pop(file_path, None)
+        if file_path == self.pending_path:
+            # Ошибку показывает обычная загрузка
+            self.__load_image(file_path)
+
+    def __toggle_thumbnails(self, enabled: bool):
+        ''' Функция переключения между изображением и сеткой миниатюр папки '''
+        if enabled:
+            self.view_stack.setCurrentWidget(self.thumbnail_view)
+            if self.folder_index >= 0:
+                # Текущее изображение выделено и видно в сетке
+                index = self.thumbnail_model.index(self.folder_index)
+                self.thumbnail_view.setCurrentIndex(index)
+                self.thumbnail_view.scrollTo(index, ThumbnailView.PositionAtCenter)
+            self.thumbnail_view.setFocus()
+        else:
+            self.view_stack.setCurrentWidget(self.canvas)
+        self.__update_folder_actions()
+
+    def __on_thumbnail_activated(self, index: QModelIndex):
+        ''' Функция открытия изображения, выбранного в сетке миниатюр '''
+        row = index.row()
+        self.thumbnails_action.setChecked(False)
+        if row != self.folder_index:
+            self.__go_to_image(row, 1 if row > self.folder_index else -1)
+
+    def __start_loading(self):
+        ''' Функция отмены предыдущей загрузки перед новой '''
+        self.load_pool.clear()
+        self.load_generation += 1
+        self.preview_shown = False
+        self.pending_path = None
+
+    def __load_image(self, file_path: str):
+        ''' Функция запуска загрузки изображения в фоновом потоке, текущее изображение меняется по её окончании '''
+        self.__start_loading()
+
+        # Сначала быстро декодируется уменьшенная под окно копия, параллельно - полное изображение
+        preview_job = Job(MyImage.open_preview, file_path, self.canvas.viewport().size(),
+                          tag=(self.load_generation, file_path))
+        preview_job.signals.finished.connect(self.__on_preview_loaded)
+        self.load_pool.start(preview_job)
+
+        job = Job(self.__open_full_image, file_path, self.MAX_DECODED_BYTES, True, tag=(self.load_generation, file_path))
+        job.signals.finished.connect(self.__on_image_loaded)
+        job.signals.failed.connect(self.__on_image_load_failed)
+        self.load_pool.start(job)
+
+        self.load_progress.setVisible(True)
+        self.statusBar().showMessage(f'Загрузка: {os.path.basename(file_path)}... (Esc - отмена)')
+
+    @staticmethod
+    def __open_full_image(file_path: str, max_decoded_bytes: int, map_file: bool) -> MyImage:
+        ''' Функция открытия изображения с декодированием пикселей (выполняется в фоновом потоке) '''
+        image = MyImage(file_path, max_decoded_bytes=max_decoded_bytes, map_file=map_file)
+        image.load()
+        return image
+
+    def __cancel_loading(self):
+        ''' Функция отмены текущей загрузки: её результат будет отброшен '''
+        if self.load_progress.isHidden():
+            return
+        self.load_pool.clear()
+        self.load_generation += 1
+        self.pending_path = None
+        self.load_progress.setVisible(False)
+        self.statusBar().showMessage('Загрузка отменена')
+
+    def __on_preview_loaded(self, tag: tuple, image: MyImage|None):
+        generation, file_path = tag
+        if generation != self.load_generation or image is None or self.load_progress.isHidden():
+            # Загрузка отменена, предпросмотр не нужен или полное изображение уже готово
+            return
+        self.preview_shown = True
+        self.__show_loaded_image(image)
+        self.save_action.setEnabled(False)
+        self.export_action.setEnabled(False)
+        self.statusBar().showMessage(f'Предпросмотр: {os.path.basename(file_path)}, загрузка полного изображения...')
+
+    def __on_image_loaded(self, tag: tuple, image: MyImage):
+        generation, file_path = tag
+        if generation != self.load_generation:
+            # Загрузка отменена или заменена более новой
+            return
+        self.load_progress.setVisible(False)
+        if (0 <= self.folder_index < len(self.folder_files) and self.folder_files[self.folder_index] == file_path
+                and not image.is_mapped()):
+            # Открытое изображение папки остаётся в кэше: возврат к нему тоже мгновенный
+            # (отображённое в память открывается и так мгновенно, а держать его, пока файл могут обрезать, опасно)
+            self.prefetch_cache.put(file_path, image)
+        self.__watch_loaded_files()
+
+        if self.preview_shown:
+            # Полное изображение заменяет предпросмотр, масштаб, выбранный пользователем за это время, сохраняется
+            self.current_image = image
+            self.__display_image()
+        else:
+            self.__show_loaded_image(image)
+        self.save_action.setEnabled(True)
+        self.export_action.setEnabled(True)
+        if image.is_region_mode():
+            self.statusBar().showMessage(f'Загружено (чтение по областям): {os.path.basename(file_path)}')
+        else:
+            self.statusBar().showMessage(f'Загружено: {os.path.basename(file_path)}')
+
+    def __show_loaded_image(self, image: MyImage):
+        ''' Функция показа только что открытого изображения: большое вписывается в окно '''
+        self.current_image = image
+        self.scale_factor = self.__fit_scale(image)
+        self.__display_image()
+        self.nav_up_btn.setEnabled(True)
+        self.nav_down_btn.setEnabled(True)
+        self.nav_left_btn.setEnabled(True)
+        self.nav_right_btn.setEnabled(True)
+        self.zoom_in_btn.setEnabled(True)
+        self.zoom_out_btn.setEnabled(True)
+        self.original_size_btn.setEnabled(True)
+
+    def __fit_scale(self, image: MyImage) -> float:
+        ''' Функция расчёта масштаба, при котором изображение помещается в область просмотра (не больше 1) '''
+        viewport = self.canvas.viewport().size()
+        scale = min(viewport.width() / image.get_width(), viewport.height() / image.get_height())
+        return max(self.MIN_SCALE, min(1.0, scale))
+
+    def __on_image_load_failed(self, tag: tuple, error: Exception):
+        generation, _ = tag
+        if generation != self.load_generation:
+            return
+        self.load_progress.setVisible(False)
+        self.statusBar().showMessage('Готов к работе')
+
+        if isinstance(error, ImageOpeningError):
+            QMessageBox.warning(self, 'Ошибка', 'Не удалось загрузить изображение')
+        else:
+            QMessageBox.warning(self, 'Ошибка', f'Ошибка при загрузке изображения: {str(error)}')
     
     def __display_image(self):
-        ''' Функция отрисовки изображения '''
+        ''' Функция запроса отрисовки изображения, повторные запросы до отрисовки объединяются '''
+        if self.current_image and not self.render_timer.isActive():
+            self.render_timer.start()
+
+    def __render(self):
+        ''' Функция отрисовки изображения с текущим на момент отрисовки масштабом '''
         if self.current_image:
-            self.image_label.setPixmap(QPixmap(self.current_image.get_scaled(self.scale_factor)))
+            self.canvas.set_image(self.current_image, self.scale_factor)
+            if self.frame_mtime_ns is not None:
+                self.__report_frame_latency()
+
+    def __report_frame_latency(self):
+        ''' Функция вывода задержки показа кадра при слежении за папкой: от записи файла до отрисовки '''
+        # Отрисовка выполняется сразу, чтобы в задержку вошло и её время
+        self.canvas.viewport().repaint()
+        latency = self.latest_watcher.record_display(self.frame_mtime_ns)
+        self.frame_mtime_ns = None
+        self.statusBar().showMessage(
+            f'Кадр: {self.current_image.get_name()}, задержка {latency:.0f} мс '
+            f'(средняя {self.latest_watcher.get_average_latency():.0f}, наибольшая {self.latest_watcher.get_max_latency():.0f}), '
+            f'пропущено кадров: {self.latest_watcher.get_skipped()}')
     
     def __zoom_in(self):
         ''' Функция увеличения масштаба '''
         new_scale = self.scale_factor * 1.25
-        if (new_scale > 10):
-            self.scale_factor = 10
+        max_scale = self.PIXEL_MODE_MAX_SCALE if self.pixel_mode_action.isChecked() else self.MAX_SCALE
+        if (new_scale > max_scale):
+            self.scale_factor = max_scale
         else:
             self.scale_factor = new_scale
         self.__display_image()
@@ -194,8 +714,8 @@ class ImageViewer(QMainWindow):
     def __zoom_out(self):
         ''' Функция уменьшения масштаба '''
         new_scale = self.scale_factor * 0.8
-        if (new_scale < 0.01):
-            self.scale_factor = 0.01
+        if (new_scale < self.MIN_SCALE):
+            self.scale_factor = self.MIN_SCALE
         else:
             self.scale_factor = new_scale
         self.__display_image()
@@ -207,6 +727,21 @@ class ImageViewer(QMainWindow):
         self.__display_image()
         self.statusBar().showMessage('Оригинальный размер')
     
+    def __set_resampling(self, state: InteractionState, resampling: Resampling):
+        ''' Функция выбора способа передискретизации для состояния просмотра '''
+        self.resampling_policy[state] = resampling
+        self.resampling_actions[(state, resampling)].setChecked(True)
+        self.canvas.set_resampling(self.resampling_policy[InteractionState.PANNING],
+                                   self.resampling_policy[InteractionState.IDLE])
+
+    def __toggle_pixel_mode(self, enabled: bool):
+        ''' Функция переключения пиксельного режима '''
+        self.canvas.set_pixel_mode(enabled)
+        if not enabled and self.scale_factor > self.MAX_SCALE:
+            self.scale_factor = self.MAX_SCALE
+            self.__display_image()
+        self.statusBar().showMessage('Пиксельный режим включён' if enabled else 'Пиксельный режим выключен')
+
     def __save_image(self):
         ''' Функция вызова окна сохранения '''
         if not self.current_image:
@@ -226,27 +761,44 @@ class ImageViewer(QMainWindow):
                 QMessageBox.warning(self, 'Ошибка', f'Ошибка при сохранении: {str(e)}')
         
 
+    def __export_image(self):
+        ''' Функция сохранения копии изображения в текущем масштабе '''
+        if not self.current_image:
+            QMessageBox.warning(self, 'Ошибка', 'Нет изображения для экспорта')
+            return
+
+        file_path, _ = QFileDialog.getSaveFileName(self, "Экспортировать изображение как...", QDir.homePath(), "JPEG (*.jpg);;PNG (*.png);;BMP (*.bmp);;TIFF (*.tif)")
+        if file_path:
+            try:
+                resampling = self.resampling_policy[InteractionState.EXPORT]
+                self.current_image.save_scaled(file_path, self.scale_factor, resampling)
+                self.statusBar().showMessage(f'Экспортировано: {os.path.basename(file_path)} ({self.scale_factor:.2f}x)')
+            except (ImageSavingError, ImageScalingError) as e:
+                QMessageBox.warning(self, 'Ошибка', str(e))
+            except Exception as e:
+                QMessageBox.warning(self, 'Ошибка', f'Ошибка при экспорте: {str(e)}')
+
     def __nav_up(self):
         """ Перемещение изображения вверх """
-        v_scroll = self.scroll_area.verticalScrollBar()
+        v_scroll = self.canvas.verticalScrollBar()
         v_scroll.setValue(v_scroll.value() - 50)
         self.statusBar().showMessage('Перемещение вверх')
 
     def __nav_down(self):
         """ Перемещение изображения вниз """
-        v_scroll = self.scroll_area.verticalScrollBar()
+        v_scroll = self.canvas.verticalScrollBar()
         v_scroll.setValue(v_scroll.value() + 50)
         self.statusBar().showMessage('Перемещение вниз')
 
     def __nav_left(self):
         """ Перемещение изображения влево """
-        h_scroll = self.scroll_area.horizontalScrollBar()
+        h_scroll = self.canvas.horizontalScrollBar()
         h_scroll.setValue(h_scroll.value() - 50)
         self.statusBar().showMessage('Перемещение влево')
 
     def __nav_right(self):
         """ Перемещение изображения вправо """
-        h_scroll = self.scroll_area.horizontalScrollBar()
+        h_scroll = self.canvas.horizontalScrollBar()
         h_scroll.setValue(h_scroll.value() + 50)
         self.statusBar().showMessage('Перемещение вправо')
 
@@ -255,7 +807,7 @@ class ImageViewer(QMainWindow):
         if ev.button() == Qt.MiddleButton:
             self.dragging = True
             self.last_mouse_pos = ev.globalPos()
-            self.image_label.setCursor(Qt.ClosedHandCursor)
+            self.canvas.viewport().setCursor(Qt.ClosedHandCursor)
             ev.accept()
         else:
             ev.ignore()
@@ -267,8 +819,8 @@ class ImageViewer(QMainWindow):
             self.last_mouse_pos = current_global_pos
             
             # Перемещаем скроллбары с учетом масштаба
-            h_scroll = self.scroll_area.horizontalScrollBar()
-            v_scroll = self.scroll_area.verticalScrollBar()
+            h_scroll = self.canvas.horizontalScrollBar()
+            v_scroll = self.canvas.verticalScrollBar()
             h_scroll.setValue(h_scroll.value() - delta.x())
             v_scroll.setValue(v_scroll.value() - delta.y())
             ev.accept()
@@ -279,7 +831,7 @@ class ImageViewer(QMainWindow):
         if ev.button() == Qt.MiddleButton:
             self.dragging = False
             self.last_mouse_pos = None
-            self.image_label.setCursor(Qt.ArrowCursor)
+            self.canvas.viewport().setCursor(Qt.ArrowCursor)
             ev.accept()
         else:
             ev.ignore()
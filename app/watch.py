@@ -0,0 +1,205 @@
+import os
+import time
+from collections import deque
+from PyQt5.QtCore import QObject, QThreadPool, QTimer, pyqtSignal
+from .folder import DirectoryIndex, ImageEntry, sort_key
+from .my_image import MyImage, ImageOpeningError
+from .workers import Job
+
+class IncompleteImageError(ImageOpeningError):
+    ''' Файл ещё записывается: конец файла не дописан или файл изменился во время чтения '''
+    pass
+
+# Признак конца файла для форматов, которые декодер Qt читает и обрезанными (недостающая часть - серая)
+PNG_END = b'IEND\xaeB`\x82'
+JPEG_END = b'\xff\xd9'
+
+def is_complete(file_path: str) -> bool:
+    ''' Функция проверки, дописан ли файл: JPEG и PNG - по маркеру конца, BMP - по размеру из заголовка '''
+    with open(file_path, 'rb') as file:
+        header = file.read(8)
+        if header.startswith(b'BM'):
+            return len(header) >= 6 and os.fstat(file.fileno()).st_size >= int.from_bytes(header[2:6], 'little')
+        if not header.startswith((b'\xff\xd8', b'\x89PNG')):
+            # Остальные форматы обрезанными не декодируются - достаточно успешного чтения
+            return True
+        file.seek(max(0, os.fstat(file.fileno()).st_size - 64))
+        # Некоторые программы дополняют файл нулями после последнего маркера
+        tail = file.read().rstrip(b'\0')
+    return tail.endswith(PNG_END if header.startswith(b'\x89PNG') else JPEG_END)
+
+def read_frame(file_path: str, max_decoded_bytes: int) -> tuple[MyImage, int]:
+    ''' Функция чтения нового кадра: (изображение, время изменения файла в нс); недописанный файл - IncompleteImageError '''
+    before = os.stat(file_path)
+    if not is_complete(file_path):
+        raise IncompleteImageError("Файл ещё записывается")
+    # Файлы папки, за которой следим, перезаписываются - пиксели читаются в память, а не отображаются
+    image = MyImage(file_path, max_decoded_bytes=max_decoded_bytes, map_file=False)
+    image.load()
+    after = os.stat(file_path)
+    if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+        raise IncompleteImageError("Файл изменился во время чтения")
+    return image, after.st_mtime_ns
+
+class LatestImageWatcher(QObject):
+    ''' Слежение за папкой: каждое новое изображение из индекса папки читается в фоне и передаётся на показ '''
+
+    # Пауза после изменения папки на время слежения: кадр нужен как можно скорее
+    UPDATE_DELAY_MS = 10
+    # Повторное чтение недописанного файла: интервал и время, после которого файл считается испорченным
+    RETRY_MS = 20
+    RETRY_TIMEOUT_MS = 5000
+    # Число последних показанных кадров, по которым считается средняя задержка
+    LATENCY_HISTORY = 100
+    DEFAULT_MAX_DECODED_BYTES = MyImage.DEFAULT_MAX_DECODED_BYTES
+
+    # Новый кадр прочитан: путь, изображение, время изменения файла (нс) - от него считается задержка показа
+    # (время передаётся как object: в int сигнала Qt наносекунды не помещаются)
+    frame_loaded = pyqtSignal(str, object, object)
+    # Кадр не удалось прочитать за RETRY_TIMEOUT_MS: путь и ошибка
+    frame_failed = pyqtSignal(str, object)
+
+    def __init__(self, index: DirectoryIndex, max_decoded_bytes: int = DEFAULT_MAX_DECODED_BYTES,
+                 parent: QObject|None = None):
+        super().__init__(parent)
+        self.__index = index
+        self.__index.ready.connect(self.__on_index_ready)
+        self.__index.changed.connect(self.__on_index_changed)
+        self.__max_decoded_bytes = max_decoded_bytes
+        self.__active = False
+        self.__saved_delay = index.get_update_delay()
+
+        # Читается один кадр за раз; пока он читается, ждёт только самый новый, более старые пропускаются
+        self.__pool = QThreadPool(self)
+        self.__pool.setMaxThreadCount(1)
+        self.__generation = 0
+        self.__reading: str|None = None
+        self.__waiting: str|None = None
+        # Последний переданный на показ кадр (путь, время изменения): его повторные уведомления не читаются
+        self.__shown: tuple[str, int]|None = None
+        self.__first_attempt = 0.0
+        self.__retry_timer = QTimer(self)
+        self.__retry_timer.setSingleShot(True)
+        self.__retry_timer.timeout.connect(self.__read_waiting)
+
+        self.__latencies: deque[float] = deque(maxlen=self.LATENCY_HISTORY)
+        self.__skipped = 0
+
+    def start(self):
+        ''' Метод начала слежения за папкой индекса: сразу показывается самое новое из уже имеющихся изображений '''
+        self.stop()
+        self.__active = True
+        self.__saved_delay = self.__index.get_update_delay()
+        self.__index.set_update_delay(self.UPDATE_DELAY_MS)
+        self.__latencies.clear()
+        self.__skipped = 0
+        if self.__index.is_ready():
+            self.__on_index_ready()
+
+    def stop(self):
+        ''' Метод окончания слежения: ожидающий кадр отбрасывается, результат читаемого - тоже '''
+        if self.__active:
+            self.__index.set_update_delay(self.__saved_delay)
+        self.__active = False
+        self.__generation += 1
+        self.__reading = None
+        self.__waiting = None
+        self.__shown = None
+        self.__retry_timer.stop()
+
+    def is_active(self) -> bool:
+        ''' Метод проверки, идёт ли слежение '''
+        return self.__active
+
+    def record_display(self, mtime_ns: int) -> float:
+        ''' Метод учёта показанного кадра: возвращает задержку от записи файла до показа (мс) '''
+        latency = max(0.0, (time.time_ns() - mtime_ns) / 1_000_000)
+        self.__latencies.append(latency)
+        return latency
+
+    def get_average_latency(self) -> float|None:
+        ''' Метод получения средней задержки показа последних кадров (мс, None - кадров ещё не было) '''
+        return sum(self.__latencies) / len(self.__latencies) if self.__latencies else None
+
+    def get_max_latency(self) -> float|None:
+        ''' Метод получения наибольшей задержки показа последних кадров (мс) '''
+        return max(self.__latencies) if self.__latencies else None
+
+    def get_skipped(self) -> int:
+        ''' Метод получения числа кадров, пропущенных из-за появления более новых '''
+        return self.__skipped
+
+    def wait_for_done(self, msecs: int = -1) -> bool:
+        ''' Метод ожидания завершения чтения кадра '''
+        return self.__pool.waitForDone(msecs)
+
+    def __on_index_ready(self):
+        if self.__active and len(self.__index):
+            entries = [self.__index.get_entry(file_path) for file_path in self.__index.get_files()]
+            self.__show_latest(entries)
+
+    def __on_index_changed(self, added: list[str], removed: list[str], updated: list[str]):
+        if not self.__active:
+            return
+        if self.__waiting in removed:
+            self.__waiting = None
+            self.__retry_timer.stop()
+        # Уже показанный кадр индекс может сообщить изменившимся, если при первом проходе он был недописан
+        entries = [entry for entry in map(self.__index.get_entry, added + updated)
+                   if entry is not None and (entry.path, entry.mtime_ns) != self.__shown]
+        # Из файлов, появившихся за один проход индекса, показывается только самый новый
+        self.__skipped += max(0, len(set(added) & {entry.path for entry in entries}) - 1)
+        self.__show_latest(entries)
+
+    def __show_latest(self, entries: list[ImageEntry]):
+        ''' Постановка на чтение самого нового из файлов; более старый ожидающий кадр пропускается '''
+        if not entries:
+            return
+        latest = max(entries, key=lambda entry: (entry.mtime_ns, sort_key(entry.path))).path
+        if latest == self.__reading:
+            # Файл изменился во время чтения - это заметит само чтение
+            return
+        if self.__waiting is not None and self.__waiting != latest:
+            self.__skipped += 1
+        self.__waiting = latest
+        self.__first_attempt = time.monotonic()
+        self.__retry_timer.stop()
+        if self.__reading is None:
+            self.__read_waiting()
+
+    def __read_waiting(self):
+        if self.__waiting is None or self.__reading is not None:
+            return
+        self.__reading, self.__waiting = self.__waiting, None
+        job = Job(read_frame, self.__reading, self.__max_decoded_bytes, tag=(self.__generation, self.__reading))
+        job.signals.finished.connect(self.__on_frame_read)
+        job.signals.failed.connect(self.__on_frame_failed)
+        self.__pool.start(job)
+
+    def __on_frame_read(self, tag: tuple, result: tuple):
+        generation, file_path = tag
+        if generation != self.__generation:
+            return
+        self.__reading = None
+        # Если за время чтения появился более новый кадр, он читается сразу, а этот всё равно показывается:
+        # при кадрах чаще чтения иначе не показывался бы ни один
+        self.__read_waiting()
+        image, mtime_ns = result
+        self.__shown = (file_path, mtime_ns)
+        self.frame_loaded.emit(file_path, image, mtime_ns)
+
+    def __on_frame_failed(self, tag: tuple, error: Exception):
+        generation, file_path = tag
+        if generation != self.__generation:
+            return
+        self.__reading = None
+        if self.__waiting is not None:
+            self.__skipped += 1
+            self.__read_waiting()
+        elif (isinstance(error, ImageOpeningError)
+              and (time.monotonic() - self.__first_attempt) * 1000 < self.RETRY_TIMEOUT_MS):
+            # Файл, скорее всего, ещё записывается - читаем снова, пока не прочитается
+            self.__waiting = file_path
+            self.__retry_timer.start(self.RETRY_MS)
+        else:
+            self.frame_failed.emit(file_path, error)
@@ -0,0 +1,26 @@
+from typing import Any, Callable, Hashable
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+class JobSignals(QObject):
+    ''' Сигналы задачи (метка задачи, результат или ошибка), доставляются в поток получателя '''
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, object)
+
+class Job(QRunnable):
+    ''' Задача для пула потоков: выполняет функцию и сообщает о результате сигналами '''
+
+    def __init__(self, function: Callable[..., Any], *args: Any, tag: Hashable = None):
+        super().__init__()
+        self.signals = JobSignals()
+        self.__function = function
+        self.__args = args
+        # Метка возвращается вместе с результатом, по ней получатель узнаёт задачу и отбрасывает устаревшие
+        self.__tag = tag
+
+    def run(self):
+        try:
+            result = self.__function(*self.__args)
+        except Exception as e:
+            self.signals.failed.emit(self.__tag, e)
+            return
+        self.signals.finished.emit(self.__tag, result)
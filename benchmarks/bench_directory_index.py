@@ -0,0 +1,61 @@
+''' Бенчмарк индекса папки из 50 000 изображений: построение и обработка одного нового файла '''
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import Qt
+from app.folder import DirectoryIndex, scan_directory
+
+FILES = 50000
+SOURCES = 8
+NEW_FILES = 10
+
+def wait(index: DirectoryIndex, condition) -> float:
+    ''' Ожидание условия с обработкой событий, время в миллисекундах '''
+    start = time.perf_counter()
+    while not condition():
+        index.wait_for_done()
+        QApplication.processEvents()
+        time.sleep(0.001)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image = QImage(4000, 3000, QImage.Format_RGB32)
+        image.fill(Qt.red)
+        for i in range(SOURCES):
+            image.save(os.path.join(tmp_dir, f'source_{i}.jpg'), quality=90)
+        for i in range(FILES - SOURCES):
+            os.symlink(f'source_{i % SOURCES}.jpg', os.path.join(tmp_dir, f'image_{i:05}.jpg'))
+
+        index = DirectoryIndex()
+        index.set_directory(tmp_dir)
+        build_ms = wait(index, index.is_ready)
+
+        start = time.perf_counter()
+        scan_directory(tmp_dir)
+        rescan_ms = (time.perf_counter() - start) * 1000
+
+        # Новый снимок раз в секунду, как в папке съёмки: время от записи до появления в индексе
+        changes = []
+        index.changed.connect(lambda added, removed, updated: changes.append(added))
+        updates = []
+        for i in range(NEW_FILES):
+            image.save(os.path.join(tmp_dir, f'new_{i}.jpg'), quality=90)
+            updates.append(wait(index, lambda: len(changes) > i))
+        index.set_directory(None)
+
+        print(f'Файлов: {FILES}, построение индекса: {build_ms:.0f} мс, полное перечитывание папки: {rescan_ms:.0f} мс')
+        print(f'Новый файл в индексе через {sum(updates) / len(updates):.0f} мс в среднем '
+              f'(из них {DirectoryIndex.UPDATE_DELAY_MS} мс - ожидание следующих изменений), '
+              f'худший {max(updates):.0f} мс')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+''' Бенчмарк отзывчивости интерфейса во время фонового построения уровней пирамиды: задержка таймера потока интерфейса '''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QElapsedTimer, QTimer
+from app.my_image import MyImage
+from app.tiles import TileRenderer
+
+WIDTH, HEIGHT = 12000, 9000
+LEVEL = 3
+TICK_MS = 1
+
+def measure(app: QApplication, pixels: np.ndarray) -> tuple:
+    ''' Построение уровня LEVEL в фоне: (наибольший промежуток между срабатываниями таймера, время построения), мс '''
+    image = MyImage.from_array(pixels)
+    renderer = TileRenderer()
+    renderer.set_image(image)
+    gaps = []
+    clock = QElapsedTimer()
+    timer = QTimer()
+    timer.setInterval(TICK_MS)
+    def tick():
+        gaps.append(clock.restart())
+    timer.timeout.connect(tick)
+    built = []
+    renderer.level_ready.connect(built.append)
+
+    start = time.perf_counter()
+    clock.start()
+    timer.start()
+    renderer.request_level(LEVEL)
+    while not built:
+        app.processEvents()
+    elapsed = (time.perf_counter() - start) * 1000
+    timer.stop()
+    renderer.wait_for_done()
+    return max(gaps, default=elapsed), elapsed
+
+def main():
+    app = QApplication(sys.argv)
+    pixels = np.random.default_rng(1).integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+    print(f'Изображение {WIDTH}x{HEIGHT}, построение уровня {LEVEL} в фоновом потоке, таймер {TICK_MS} мс')
+    strip_pixels = MyImage.LEVEL_STRIP_PIXELS
+    for name, pixels_per_strip in (('целиком', WIDTH * HEIGHT), ('полосами', strip_pixels)):
+        MyImage.LEVEL_STRIP_PIXELS = pixels_per_strip
+        gap, elapsed = measure(app, pixels)
+        print(f'{name:>9}: наибольшая задержка таймера {gap:6.1f} мс, построение {elapsed:6.1f} мс')
+    MyImage.LEVEL_STRIP_PIXELS = strip_pixels
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+''' Бенчмарк масштабирования изображения целиком полосами в нескольких потоках '''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+from app.my_image import MyImage
+
+# 100 мегапикселей; масштабы не совпадают с размерами уровней пирамиды (0.5, 0.25...),
+# иначе замерялась бы выдача готового уровня, а не масштабирование
+WIDTH, HEIGHT = 12500, 8000
+SCALES = (0.3, 0.15)
+
+def main():
+    app = QApplication(sys.argv)
+    pattern = np.random.default_rng(0).integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    image = MyImage.from_array(pattern)
+    # Пирамида строится один раз заранее, замеряется только само масштабирование
+    for scale in SCALES:
+        image.get_level(image.level_for_scale(scale))
+
+    # Потоков больше, чем ядер, get_scaled не использует
+    cores = os.cpu_count() or 1
+    workers = sorted({count for count in (1, 2, 4, cores) if count <= cores})
+    print(f'Изображение {WIDTH}x{HEIGHT}, ядер: {cores}')
+    if cores == 1:
+        print('Одно ядро: полосами не масштабируется, замеряется только один поток')
+    # В несколько потоков масштабируются только способы на numpy (MyImage.PARALLEL_RESAMPLING)
+    for resampling in MyImage.PARALLEL_RESAMPLING:
+        for scale in SCALES:
+            times = []
+            for count in workers:
+                image.set_scale_workers(count)
+                start = time.perf_counter()
+                image.get_scaled(scale, resampling)
+                times.append((time.perf_counter() - start) * 1000)
+            results = ', '.join(f'{count} - {ms:.0f} мс (x{times[0] / ms:.2f})' for count, ms in zip(workers, times))
+            print(f'{resampling.value} {scale:g}x: {results}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
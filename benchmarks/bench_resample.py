@@ -0,0 +1,77 @@
+''' Бенчмарк сильного уменьшения: Qt SmoothTransformation, пирамида MyImage и усреднение по площади (numpy) '''
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import Qt
+from app.my_image import MyImage, Resampling
+
+WIDTH, HEIGHT = 6000, 4000
+SCALES = (0.05, 0.1, 0.25)
+
+def make_pattern() -> np.ndarray:
+    ''' Зонная пластина: частота растёт к краям, при уменьшении без усреднения появляются муаровые кольца '''
+    y, x = np.mgrid[0:HEIGHT, 0:WIDTH].astype(np.float32)
+    phase = ((x - WIDTH / 2) ** 2 + (y - HEIGHT / 2) ** 2) * (np.pi / WIDTH)
+    gray = (127.5 + 127.5 * np.cos(phase)).astype(np.uint8)
+    return np.repeat(gray[:, :, None], 3, axis=2)
+
+def exact_average(pattern: np.ndarray, factor: int) -> np.ndarray:
+    ''' Эталон: точное среднее по блокам factor x factor '''
+    height, width = pattern.shape[0] // factor, pattern.shape[1] // factor
+    return pattern.reshape(height, factor, width, factor, 3).mean(axis=(1, 3))
+
+def error(image: QImage, expected: np.ndarray) -> float:
+    ''' Средняя абсолютная ошибка относительно эталона (в уровнях яркости 0..255) '''
+    image = image.convertToFormat(QImage.Format_RGB888)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    pixels = rows[:, :image.width() * 3].reshape(image.height(), image.width(), 3)
+    return float(np.abs(pixels.astype(np.float64) - expected).mean())
+
+def measure(function) -> tuple:
+    start = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - start) * 1000
+
+def main():
+    app = QApplication(sys.argv)
+    pattern = make_pattern()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.bmp')
+        MyImage.from_array(pattern).get_scaled(1).save(path)
+
+        print(f'Изображение {WIDTH}x{HEIGHT}, ошибка - средняя разница с точным усреднением по площади')
+        faster = better = True
+        for scale in SCALES:
+            expected = exact_average(pattern, round(1 / scale))
+            size = MyImage(path).get_scaled_size(scale)
+            pixels = MyImage(path).get_level(0)
+
+            qt, qt_ms = measure(lambda: pixels.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation))
+            # Пирамида строится при первом обращении, поэтому замер на новом изображении
+            image = MyImage(path)
+            image.load()
+            pyramid, pyramid_ms = measure(lambda: image.get_scaled(scale, Resampling.BILINEAR))
+            image = MyImage(path)
+            image.load()
+            area, area_ms = measure(lambda: image.get_scaled(scale, Resampling.AREA))
+
+            print(f'{scale:.2f}x: Qt {qt_ms:6.1f} мс, ошибка {error(qt, expected):5.2f} | '
+                  f'пирамида {pyramid_ms:6.1f} мс, ошибка {error(pyramid, expected):5.2f} | '
+                  f'площадь {area_ms:6.1f} мс, ошибка {error(area, expected):5.2f}')
+            faster = faster and area_ms < pyramid_ms
+            better = better and error(area, expected) <= min(error(qt, expected), error(pyramid, expected))
+
+        return 0 if faster and better else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+''' Бенчмарк способов передискретизации: пропускная способность каждого уровня качества '''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QSize
+from app.my_image import MyImage
+from app.resample import Resampling, resample
+
+WIDTH, HEIGHT = 4000, 3000
+SCALES = (0.25, 0.5, 2)
+# Повторы каждого замера, берётся лучший
+REPEATS = 3
+
+def main():
+    app = QApplication(sys.argv)
+    pattern = np.random.default_rng(0).integers(0, 256, (HEIGHT, WIDTH, 4), dtype=np.uint8)
+    source = MyImage.from_array(pattern).get_level(0)
+
+    print(f'Исходное изображение {WIDTH}x{HEIGHT}; мегапикселей исходника в секунду (время на один вызов)')
+    for scale in SCALES:
+        size = QSize(round(WIDTH * scale), round(HEIGHT * scale))
+        results = []
+        for resampling in Resampling:
+            best = min(measure(lambda: resample(source, size, resampling)) for _ in range(REPEATS))
+            results.append(f'{resampling.value} {WIDTH * HEIGHT / 1e6 / best:7.1f} ({best * 1000:.0f} мс)')
+        print(f'{scale:.2f}x: ' + ' | '.join(results))
+    return 0
+
+def measure(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+''' Бенчмарк хранилища миниатюр: первое и повторное открытие папки из 20 000 изображений '''
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import Qt
+from app.folder import scan_directory, sort_key
+from app.thumbnail_store import ThumbnailStore
+from app.thumbnails import ThumbnailModel, ThumbnailView
+
+FILES = 20000
+SOURCES = 8
+
+def show_folder(files: list[str], store_path: str) -> tuple:
+    ''' Открытие папки в новой сетке (как после перезапуска): время до готовности всех видимых миниатюр '''
+    store = ThumbnailStore(store_path)
+    model = ThumbnailModel(store=store)
+    view = ThumbnailView(model)
+    view.resize(1280, 800)
+    start = time.perf_counter()
+    model.set_files(files)
+    view.show()
+    QApplication.processEvents()
+    while model.get_pending_count():
+        model.wait_for_done()
+        QApplication.processEvents()
+    elapsed = (time.perf_counter() - start) * 1000
+    hits = store.get_hits()
+    view.close()
+    store.close()
+    return elapsed, hits
+
+def main():
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        folder = os.path.join(tmp_dir, 'images')
+        os.mkdir(folder)
+        for i in range(SOURCES):
+            image = QImage(4000, 3000, QImage.Format_RGB32)
+            image.fill(Qt.GlobalColor(Qt.red + i))
+            image.save(os.path.join(folder, f'source_{i}.jpg'), quality=90)
+        for i in range(FILES - SOURCES):
+            os.symlink(f'source_{i % SOURCES}.jpg', os.path.join(folder, f'image_{i:05}.jpg'))
+        files = sorted((entry.path for entry in scan_directory(folder)), key=sort_key)
+        store_path = os.path.join(tmp_dir, 'thumbnails.sqlite')
+
+        cold, _ = show_folder(files, store_path)
+        warm, hits = show_folder(files, store_path)
+        print(f'Файлов: {len(files)}, 4000x3000 JPEG')
+        print(f'Первое открытие (чтение файлов): видимые миниатюры через {cold:.0f} мс')
+        print(f'Повторное открытие (из хранилища, найдено {hits}): видимые миниатюры через {warm:.0f} мс')
+        return 0 if warm < 1000 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+''' Бенчмарк сетки миниатюр для папки из 50 000 изображений: раскладка, прокрутка и число прочитанных файлов '''
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from unittest.mock import patch
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import Qt
+from app import thumbnails
+from app.folder import scan_directory, sort_key
+from app.thumbnails import ThumbnailModel, ThumbnailView
+
+FILES = 50000
+SOURCES = 8
+SCROLL_STEPS = 100
+
+def wait_visible(model: ThumbnailModel):
+    ''' Ожидание, пока прочитаются все миниатюры, запрошенные отрисовкой '''
+    while model.get_pending_count():
+        model.wait_for_done()
+        QApplication.processEvents()
+
+def main():
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Несколько настоящих JPEG и множество ссылок на них: файлов в папке много, места на диске мало
+        for i in range(SOURCES):
+            image = QImage(3000, 2000, QImage.Format_RGB32)
+            image.fill(Qt.GlobalColor(Qt.red + i))
+            image.save(os.path.join(tmp_dir, f'source_{i}.jpg'), quality=90)
+        for i in range(FILES - SOURCES):
+            os.symlink(f'source_{i % SOURCES}.jpg', os.path.join(tmp_dir, f'image_{i:05}.jpg'))
+
+        start = time.perf_counter()
+        files = sorted((entry.path for entry in scan_directory(tmp_dir)), key=sort_key)
+        list_ms = (time.perf_counter() - start) * 1000
+
+        model = ThumbnailModel()
+        view = ThumbnailView(model)
+        view.resize(1280, 800)
+        view.show()
+        reads = []
+        read = thumbnails.read_thumbnail
+        with patch.object(thumbnails, 'read_thumbnail', lambda *args: reads.append(args[0]) or read(*args)):
+            start = time.perf_counter()
+            model.set_files(files)
+            QApplication.processEvents()
+            layout_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            wait_visible(model)
+            first_ms = (time.perf_counter() - start) * 1000
+            visible = len(reads)
+
+            # Быстрая прокрутка: каждый шаг - страница вниз и одна отрисовка, миниатюры не дожидаемся
+            bar = view.verticalScrollBar()
+            frames = []
+            for _ in range(SCROLL_STEPS):
+                start = time.perf_counter()
+                bar.setValue(bar.value() + bar.pageStep())
+                view.viewport().repaint()
+                frames.append((time.perf_counter() - start) * 1000)
+            wait_visible(model)
+
+        print(f'Файлов: {len(files)}, список папки: {list_ms:.0f} мс')
+        print(f'Раскладка и первая отрисовка: {layout_ms:.0f} мс, '
+              f'видимые миниатюры ({visible}) готовы через {first_ms:.0f} мс')
+        print(f'Прокрутка на {SCROLL_STEPS} страниц: кадр в среднем {sum(frames) / len(frames):.1f} мс, '
+              f'худший {max(frames):.1f} мс; прочитано файлов: {len(reads)} из {len(files)}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+''' Бенчмарк слежения за папкой: задержка от записи кадра до его готовности к показу и число пропущенных кадров '''
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice
+from app.folder import DirectoryIndex
+from app.watch import LatestImageWatcher
+
+FRAMES = 40
+FRAME_SIZE = (3000, 2000)
+# Файл записывается несколькими частями с паузами, как при передаче с камеры
+CHUNKS = 4
+CHUNK_PAUSE_S = 0.005
+
+def encode_frame() -> bytes:
+    # Шум: такой кадр декодируется дольше однотонного, как настоящий снимок
+    width, height = FRAME_SIZE
+    pixels = os.urandom(width * height * 4)
+    image = QImage(pixels, width, height, QImage.Format_RGB32)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, 'JPEG', 90)
+    return bytes(data)
+
+def write_frames(directory: str, data: bytes, interval: float):
+    ''' Запись кадров в папку с заданным интервалом (в отдельном потоке, как программа съёмки) '''
+    step = len(data) // CHUNKS + 1
+    for i in range(FRAMES):
+        start = time.monotonic()
+        with open(os.path.join(directory, f'frame_{i:04}.jpg'), 'wb') as file:
+            for offset in range(0, len(data), step):
+                file.write(data[offset:offset + step])
+                file.flush()
+                time.sleep(CHUNK_PAUSE_S)
+        time.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+def run(fps: int, data: bytes) -> tuple:
+    with tempfile.TemporaryDirectory() as directory:
+        index = DirectoryIndex()
+        watcher = LatestImageWatcher(index)
+        shown = []
+        watcher.frame_loaded.connect(lambda path, image, mtime_ns: shown.append(watcher.record_display(mtime_ns)))
+        index.set_directory(directory)
+        watcher.start()
+        writer = threading.Thread(target=write_frames, args=(directory, data, 1 / fps))
+        writer.start()
+        while writer.is_alive():
+            QApplication.processEvents()
+            time.sleep(0.001)
+        # Последний кадр тоже должен быть показан
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            QApplication.processEvents()
+            time.sleep(0.001)
+        watcher.stop()
+        index.set_directory(None)
+        watcher.wait_for_done()
+        index.wait_for_done()
+        return len(shown), watcher.get_skipped(), watcher.get_average_latency(), watcher.get_max_latency()
+
+def main():
+    app = QApplication(sys.argv)
+    data = encode_frame()
+    print(f'Кадры {FRAME_SIZE[0]}x{FRAME_SIZE[1]} JPEG ({len(data) // 1024} КБ), записываются частями: {CHUNKS}')
+    for fps in (2, 10, 30):
+        shown, skipped, average, worst = run(fps, data)
+        print(f'{fps} кадров/с: показано {shown} из {FRAMES}, пропущено {skipped}, '
+              f'задержка в среднем {average:.0f} мс, худшая {worst:.0f} мс')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
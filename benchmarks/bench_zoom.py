@@ -0,0 +1,97 @@
+''' Бенчмарк объединения частых запросов масштабирования: работа отрисовки на серию быстрых нажатий с объединением и без '''
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QImage, QColor, QPainter
+from PyQt5.QtCore import QTimer
+from app.ui import ImageViewer
+from app.my_image import MyImage
+
+WIDTH, HEIGHT = 8000, 6000
+CLICKS = 10
+# Промежуток между нажатиями: меньше кадра, как у колеса мыши или автоповтора клавиши
+CLICK_INTERVAL_MS = 5
+# Начальный масштаб: серия увеличивает изображение, вписанное в окно, до почти исходного размера
+START_SCALE = 0.1
+# После серии ждём, пока отрисуется последний кадр
+SETTLE_MS = 300
+
+def make_image(path: str):
+    ''' Изображение с полосами, чтобы сглаживание при отрисовке выполняло настоящую работу '''
+    image = QImage(WIDTH, HEIGHT, QImage.Format_RGB32)
+    image.fill(QColor(80, 120, 160))
+    painter = QPainter(image)
+    for x in range(0, WIDTH, 64):
+        painter.fillRect(x, 0, 32, HEIGHT, QColor(200, 60, 60))
+    painter.end()
+    image.save(path)
+
+def measure(app: QApplication, path: str, coalesce: bool) -> dict:
+    ''' Серия нажатий в цикле событий: число отрисовок, кадров и суммарное время кадров (мс) '''
+    viewer = ImageViewer()
+    viewer.resize(1200, 900)
+    viewer.show()
+    if not coalesce:
+        # Таймер с нулевой паузой срабатывает на следующем проходе цикла: каждое нажатие - своя отрисовка
+        viewer.render_timer.setInterval(0)
+    image = MyImage(path)
+    image.load()
+    viewer.current_image = image
+    viewer.scale_factor = START_SCALE
+    viewer.zoom_in_btn.setEnabled(True)
+    viewer.canvas.set_image(image, viewer.scale_factor)
+    app.processEvents()
+
+    stats = {'clicks': 0, 'renders': 0, 'paints': 0, 'paint_ms': 0.0}
+    set_image = viewer.canvas.set_image
+    def counting_set_image(*args):
+        stats['renders'] += 1
+        set_image(*args)
+    viewer.canvas.set_image = counting_set_image
+    paint_event = viewer.canvas.paintEvent
+    def timed_paint_event(event):
+        start = time.perf_counter()
+        paint_event(event)
+        stats['paints'] += 1
+        stats['paint_ms'] += (time.perf_counter() - start) * 1000
+    viewer.canvas.paintEvent = timed_paint_event
+
+    clicks = QTimer()
+    clicks.setInterval(CLICK_INTERVAL_MS)
+    def click():
+        viewer.zoom_in_btn.click()
+        stats['clicks'] += 1
+        if stats['clicks'] == CLICKS:
+            clicks.stop()
+            QTimer.singleShot(SETTLE_MS, app.quit)
+    clicks.timeout.connect(click)
+
+    clicks.start()
+    app.exec_()
+    stats['scale'] = viewer.scale_factor
+    viewer.canvas.get_renderer().wait_for_done()
+    viewer.close()
+    return stats
+
+def main():
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.bmp')
+        make_image(path)
+        print(f'Изображение {WIDTH}x{HEIGHT}, нажатий: {CLICKS} через {CLICK_INTERVAL_MS} мс')
+        results = {}
+        for name, coalesce in (('без объединения', False), ('с объединением', True)):
+            stats = results[coalesce] = measure(app, path, coalesce)
+            print(f'{name:>16}: отрисовок {stats["renders"]:2}, кадров {stats["paints"]:2}, '
+                  f'время кадров {stats["paint_ms"]:6.1f} мс, масштаб {stats["scale"]:.2f}x')
+    # Объединение должно давать заметно меньше отрисовок при том же итоговом масштабе
+    ok = results[True]['renders'] < results[False]['renders'] and results[True]['scale'] == results[False]['scale']
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,10 @@
 import pytest
 import tempfile
+import time
 import os
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt, QStandardPaths
+from PyQt5.QtGui import QImage, QPixmap
 import sys
 import os
 
@@ -15,6 +16,8 @@ def qapp():
     app = QApplication.instance()
     if app is None:
         app = QApplication([])
+    # Кэш приложения (хранилище миниатюр) - в тестовой папке, а не в настоящей папке пользователя
+    QStandardPaths.setTestModeEnabled(True)
     yield app
 
 @pytest.fixture
@@ -30,9 +33,36 @@ def temp_image_file():
     if os.path.exists(tmp.name):
         os.unlink(tmp.name)
 
+@pytest.fixture
+def make_image(qapp):
+    """Возвращает функцию, сохраняющую изображение в файл с временем изменения age секунд назад"""
+    def make(path, width=30, height=20, age=0):
+        image = QImage(width, height, QImage.Format_RGB32)
+        image.fill(Qt.red)
+        image.save(str(path))
+        mtime = time.time_ns() - age * 1_000_000_000
+        os.utime(path, ns=(mtime, mtime))
+        return str(path)
+    return make
+
+@pytest.fixture
+def wait_until(qapp):
+    """Возвращает функцию ожидания условия: обрабатывает события и дожидается фоновых задач workers"""
+    def wait(condition, *workers, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            for worker in workers:
+                worker.wait_for_done()
+            QApplication.processEvents()
+            time.sleep(0.01)
+        assert condition()
+    return wait
+
 @pytest.fixture
 def image_viewer(qapp):
     from app.ui import ImageViewer
     viewer = ImageViewer()
     yield viewer
-    viewer.close()
\ No newline at end of file
+    viewer.close()
+    # Отложенная отрисовка закрытого окна (часто с изображением-моком) не должна сработать в следующих тестах
+    viewer.render_timer.stop()
\ No newline at end of file
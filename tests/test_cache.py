@@ -0,0 +1,38 @@
+from app.cache import LRUCache
+
+def test_cache_get_put():
+    cache = LRUCache(100, len)
+    cache.put("a", "xxx")
+    assert cache.get("a") == "xxx"
+    assert cache.get("b") is None
+    assert cache.get_bytes() == 3
+
+def test_cache_evicts_least_recently_used():
+    cache = LRUCache(10, len)
+    cache.put("a", "x" * 4)
+    cache.put("b", "x" * 4)
+    cache.get("a")
+    cache.put("c", "x" * 4)
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.get_bytes() == 8
+    assert cache.keys() == ["a", "c"]
+
+def test_cache_stats():
+    cache = LRUCache(100, len)
+    cache.put("a", "xx")
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    assert cache.get_hits() == 2
+    assert cache.get_misses() == 1
+    cache.reset_stats()
+    assert cache.get_hits() == 0
+
+def test_cache_remove():
+    cache = LRUCache(100, len)
+    cache.put("a", "xxx")
+    cache.remove("a")
+    cache.remove("b")
+    assert "a" not in cache
+    assert cache.get_bytes() == 0
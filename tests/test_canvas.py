@@ -0,0 +1,213 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from PyQt5.QtCore import QPoint, QPointF
+from PyQt5.QtGui import QImage, QRegion
+from app.canvas import ImageCanvas
+from app.my_image import MyImage, Resampling
+
+@pytest.fixture
+def canvas(qapp):
+    canvas = ImageCanvas()
+    canvas.resize(200, 150)
+    yield canvas
+    canvas.close()
+
+def test_canvas_scroll_range_follows_scale(canvas):
+    image = MyImage("./tests/test_data/image.png")
+    canvas.set_image(image, 3)
+    viewport = canvas.viewport().size()
+    assert canvas.horizontalScrollBar().maximum() == image.get_scaled_size(3).width() - viewport.width()
+    assert canvas.verticalScrollBar().maximum() == image.get_scaled_size(3).height() - viewport.height()
+
+def test_canvas_maps_viewport_to_image(canvas):
+    image = MyImage("./tests/test_data/image.png")
+    canvas.set_image(image, 4)
+    canvas.horizontalScrollBar().setValue(400)
+    point = canvas.map_to_image(QPointF(0, 0))
+    assert point.x() == pytest.approx(100)
+    assert canvas.map_from_image(point) == QPointF(0, 0)
+
+def test_canvas_zoom_keeps_center(canvas):
+    image = MyImage("./tests/test_data/image.png")
+    canvas.set_image(image, 2)
+    canvas.horizontalScrollBar().setValue(500)
+    center = QPointF(canvas.viewport().rect().center())
+    before = canvas.map_to_image(center)
+    canvas.set_image(image, 4)
+    after = canvas.map_to_image(center)
+    assert after.x() == pytest.approx(before.x(), abs=1)
+    assert after.y() == pytest.approx(before.y(), abs=1)
+
+def test_canvas_renders_only_visible_tiles(canvas):
+    image = MyImage("./tests/test_data/image.png")
+    canvas.set_image(image, 10)
+    renderer = canvas.get_renderer()
+    with patch.object(image, 'get_scaled_region', wraps=image.get_scaled_region) as mock_region:
+        target = QImage(50, 50, QImage.Format_ARGB32)
+        canvas.viewport().render(target, QPoint(), QRegion(0, 0, 50, 50))
+        renderer.wait_for_done()
+        # Сглаженно отрисовывается одна плитка в углу, а не всё изображение целиком
+        smooth_calls = [call for call in mock_region.call_args_list if call[0][2] is Resampling.BILINEAR]
+        assert len(smooth_calls) == 1
+        assert smooth_calls[0][0][0] == renderer.tile_rect(10, 0, 0)
+
+def test_canvas_renders_tiles_in_background(canvas, qapp):
+    image = MyImage("./tests/test_data/image.png")
+    canvas.set_image(image, 2)
+    renderer = canvas.get_renderer()
+    target = QImage(50, 50, QImage.Format_ARGB32)
+    canvas.viewport().render(target, QPoint(), QRegion(0, 0, 50, 50))
+    # Плитка запрошена, но отрисовывается не в потоке интерфейса
+    assert renderer.cached_tile(2, 0, 0) is None
+    renderer.wait_for_done()
+    qapp.processEvents()
+    assert renderer.cached_tile(2, 0, 0) is not None
+
+def test_canvas_zoom_draws_fast_preview_then_refines(canvas, temp_image_file, qapp):
+    image = MyImage(temp_image_file)
+    canvas.set_image(image, 1)
+    canvas.set_image(image, 2)
+    renderer = canvas.get_renderer()
+    assert not canvas.is_refining()
+
+    with patch.object(renderer, 'request_tile') as mock_request:
+        target = QImage(canvas.viewport().size(), QImage.Format_ARGB32)
+        target.fill(0)
+        canvas.viewport().render(target)
+        # Сразу после зума плитки не запрашиваются, но картинка уже нарисована без сглаживания
+        mock_request.assert_not_called()
+        assert target.pixel(canvas.image_rect().topLeft() + QPoint(1, 1)) == 0xffff0000
+
+        canvas._ImageCanvas__idle_timer.timeout.emit()
+        assert canvas.is_refining()
+        canvas.viewport().render(target)
+        mock_request.assert_called()
+
+def test_canvas_pixel_mode_draws_exact_pixels(canvas, qapp):
+    image = MyImage("./tests/test_data/image.png")
+    source = image.get_scaled(1)
+    canvas.set_image(image, 20)
+    canvas.set_pixel_mode(True, grid=False)
+    canvas.horizontalScrollBar().setValue(20 * 400)
+    canvas.verticalScrollBar().setValue(20 * 400)
+    renderer = canvas.get_renderer()
+
+    with patch.object(renderer, 'request_tile') as mock_request:
+        target = QImage(canvas.viewport().size(), QImage.Format_ARGB32_Premultiplied)
+        canvas.viewport().render(target)
+        # Плитки не нужны: каждый пиксель экрана - ближайший пиксель исходника
+        mock_request.assert_not_called()
+        for x, y in ((0, 0), (19, 19), (45, 30)):
+            point = canvas.map_to_image(QPointF(x + 0.5, y + 0.5))
+            assert target.pixel(x, y) == source.pixel(int(point.x()), int(point.y()))
+
+def test_canvas_pixel_grid(canvas, temp_image_file):
+    image = MyImage(temp_image_file)
+    canvas.set_image(image, 20)
+    canvas.set_pixel_mode(True)
+    target = QImage(canvas.viewport().size(), QImage.Format_ARGB32)
+    canvas.viewport().render(target)
+    origin = canvas.image_rect().topLeft()
+    # Линия сетки на границе пикселей и чистый цвет внутри пикселя
+    assert target.pixel(origin.x() + 20, origin.y() + 10) != 0xffff0000
+    assert target.pixel(origin.x() + 10, origin.y() + 10) == 0xffff0000
+
+def test_canvas_pixel_mode_region_image_uses_nearest_tiles(canvas, tmp_path, qapp):
+    file_path = str(tmp_path / "image.jpg")
+    MyImage("./tests/test_data/image.png").get_scaled(1).save(file_path)
+    image = MyImage(file_path, max_decoded_bytes=1)
+    assert image.is_region_mode()
+    canvas.set_image(image, 20)
+    canvas.set_pixel_mode(True, grid=False)
+    renderer = canvas.get_renderer()
+
+    # Изображение, читаемое по областям, рисуется плитками без сглаживания
+    with patch.object(renderer, 'request_tile') as mock_request:
+        canvas.viewport().render(QImage(canvas.viewport().size(), QImage.Format_ARGB32_Premultiplied))
+        mock_request.assert_called()
+        assert all(call.args[3] is Resampling.NEAREST for call in mock_request.call_args_list)
+
+def test_canvas_resampling_policy(canvas, temp_image_file):
+    image = MyImage(temp_image_file)
+    canvas.set_image(image, 3)
+    canvas.set_resampling(Resampling.BILINEAR, Resampling.LANCZOS)
+    renderer = canvas.get_renderer()
+
+    # Плитки в покое запрашиваются выбранным способом
+    with patch.object(renderer, 'request_tile') as mock_request:
+        canvas.viewport().render(QImage(canvas.viewport().size(), QImage.Format_ARGB32_Premultiplied))
+        mock_request.assert_called()
+        assert all(call.args[3] is Resampling.LANCZOS for call in mock_request.call_args_list)
+
+def test_canvas_drops_quality_over_frame_budget(canvas, temp_image_file):
+    image = MyImage(temp_image_file)
+    canvas.set_image(image, 0.5)
+    # Любой кадр дольше бюджета: при каждом зуме качество снижается на ступень, но не ниже предела
+    canvas.set_frame_budget(1e-6)
+    target = QImage(canvas.viewport().size(), QImage.Format_ARGB32_Premultiplied)
+    for i in range(10):
+        canvas.set_image(image, 0.4 + i * 0.01)
+        canvas.viewport().render(target)
+    assert canvas.get_quality_drop() == ImageCanvas.MAX_QUALITY_DROP
+    # Более мелкий уровень для упрощённых кадров строится в фоне, а не во время кадра
+    canvas.get_renderer().wait_for_done()
+    coarse = image.level_for_scale(0.49 / 2 ** ImageCanvas.MAX_QUALITY_DROP)
+    assert coarse > image.level_for_scale(0.49)
+    assert image.get_built_level(coarse)[0] == coarse
+
+    # После паузы возвращается полное качество
+    canvas._ImageCanvas__idle_timer.timeout.emit()
+    assert canvas.get_quality_drop() == 0
+
+def test_canvas_counts_stalls_between_frames(canvas, temp_image_file, qapp):
+    image = MyImage(temp_image_file)
+    canvas.set_image(image, 0.5)
+    canvas.set_frame_budget(16)
+    target = QImage(canvas.viewport().size(), QImage.Format_ARGB32_Premultiplied)
+    for i in range(ImageCanvas.FRAME_HISTORY):
+        canvas.set_image(image, 0.4 + i * 0.01)
+        # Отрисовка быстрая, но поток интерфейса занят между кадрами дольше бюджета
+        time.sleep(0.05)
+        qapp.processEvents()
+        canvas.viewport().render(target)
+    assert canvas.get_quality_drop() == 1
+
+def test_canvas_keeps_quality_within_frame_budget(canvas, temp_image_file):
+    image = MyImage(temp_image_file)
+    canvas.set_image(image, 0.5)
+    canvas.set_frame_budget(10000)
+    target = QImage(canvas.viewport().size(), QImage.Format_ARGB32_Premultiplied)
+    for i in range(10):
+        canvas.set_image(image, 0.4 + i * 0.01)
+        canvas.viewport().render(target)
+    assert canvas.get_quality_drop() == 0
+
+    # Без бюджета качество не снижается даже при медленных кадрах
+    canvas.set_frame_budget(None)
+    for i in range(10):
+        canvas.set_image(image, 0.6 + i * 0.01)
+        canvas.viewport().render(target)
+    assert canvas.get_quality_drop() == 0
+
+def test_canvas_zoom_paint_does_not_build_levels(canvas, qapp):
+    image = MyImage("./tests/test_data/image.png")
+    canvas.set_image(image, 1.0)
+    target = QImage(canvas.viewport().size(), QImage.Format_ARGB32_Premultiplied)
+    canvas.viewport().render(target)
+
+    get_level = MyImage.get_level
+    gui_calls = []
+    def recording_get_level(self, level):
+        if threading.current_thread() is threading.main_thread():
+            gui_calls.append(level)
+        return get_level(self, level)
+    with patch.object(MyImage, 'get_level', recording_get_level):
+        # Уменьшения ещё нет: кадр зума рисуется из исходных пикселей, уровень строится в фоне
+        canvas.set_image(image, 0.25)
+        canvas.viewport().render(target)
+        assert gui_calls == []
+        canvas.get_renderer().wait_for_done()
+    qapp.processEvents()
+    assert image.get_built_level(2)[0] == 2
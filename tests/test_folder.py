@@ -0,0 +1,123 @@
+import os
+import pytest
+from unittest.mock import patch
+from app import folder
+from app.folder import DirectoryIndex, is_image_file, read_entry, scan_directory, sort_key
+
+def test_is_image_file():
+    assert is_image_file("photo.JPG")
+    assert is_image_file("scan.tiff")
+    assert not is_image_file("notes.txt")
+    assert not is_image_file("png")
+
+def test_scan_directory_skips_other_files(tmp_path):
+    for name in ("b.png", "A.jpg", "c.txt", "d.bmp"):
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "e.png").mkdir()
+    paths = sorted((entry.path for entry in scan_directory(str(tmp_path))), key=sort_key)
+    assert [os.path.basename(path) for path in paths] == ["A.jpg", "b.png", "d.bmp"]
+
+def test_scan_directory_missing_directory(tmp_path):
+    assert scan_directory(str(tmp_path / "missing")) == []
+
+def test_read_entry(qapp, tmp_path, make_image):
+    path = make_image(tmp_path / "a.png", 30, 20, age=60)
+    entry = read_entry(path)
+    assert (entry.width, entry.height) == (30, 20)
+    assert entry.size == os.path.getsize(path)
+    assert read_entry(str(tmp_path)) is None
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"")
+    assert (read_entry(str(broken)).width, read_entry(str(broken)).height) == (-1, -1)
+
+@pytest.fixture
+def index(qapp):
+    index = DirectoryIndex()
+    yield index
+    index.set_directory(None)
+    index.wait_for_done()
+
+def test_index_builds_in_background(index, tmp_path, make_image, wait_until):
+    paths = [make_image(tmp_path / name, age=60) for name in ("b.png", "a.png", "c.jpg")]
+    (tmp_path / "notes.txt").write_text("не изображение")
+    ready = []
+    index.ready.connect(lambda: ready.append(True))
+    index.set_directory(str(tmp_path))
+    assert not index.is_ready()
+    wait_until(index.is_ready, index)
+
+    assert ready == [True]
+    assert index.get_files() == sorted(paths)
+    assert index.index_of(paths[0]) == 1
+    assert index.index_of(str(tmp_path / "missing.png")) == -1
+    assert index.get_entry(paths[2]).width == 30
+
+def test_index_updates_incrementally(index, tmp_path, make_image, wait_until):
+    paths = [make_image(tmp_path / f"{i}.png", age=60) for i in range(3)]
+    index.set_directory(str(tmp_path))
+    wait_until(index.is_ready, index)
+    changes = []
+    index.changed.connect(lambda added, removed, updated: changes.append((added, removed, updated)))
+
+    with patch('app.folder.scan_directory') as mock_scan, \
+            patch('app.folder.read_entry', wraps=folder.read_entry) as mock_read:
+        new_path = make_image(tmp_path / "1a.png", age=60)
+        wait_until(lambda: changes, index)
+        # Папка не перечитывается целиком: читаются сведения только о новом файле
+        mock_scan.assert_not_called()
+        assert [call.args[0] for call in mock_read.call_args_list] == [new_path]
+    assert changes[0] == ([new_path], [], [])
+    assert index.get_files() == [paths[0], paths[1], new_path, paths[2]]
+
+    os.remove(paths[0])
+    wait_until(lambda: len(changes) == 2, index)
+    assert changes[1] == ([], [paths[0]], [])
+    assert index.get_files() == [paths[1], new_path, paths[2]]
+
+def test_index_notices_file_replaced_in_place(index, tmp_path, make_image, wait_until):
+    path = make_image(tmp_path / "a.png", 40, 30, age=60)
+    index.set_directory(str(tmp_path))
+    wait_until(index.is_ready, index)
+    changes = []
+    index.changed.connect(lambda added, removed, updated: changes.append((added, removed, updated)))
+
+    # Запись во временный файл и замена им файла под тем же именем: список имён папки не меняется
+    (tmp_path / "tmp").mkdir()
+    temporary = make_image(tmp_path / "tmp" / "a.png", 400, 300, age=10)
+    os.replace(temporary, path)
+    wait_until(lambda: changes, index)
+    assert changes[-1] == ([], [], [path])
+    assert index.get_entry(path).width == 400
+
+def test_index_notices_watched_file_rewritten_in_place(index, tmp_path, make_image, wait_until):
+    path = make_image(tmp_path / "a.png", 40, 30, age=60)
+    index.set_directory(str(tmp_path))
+    wait_until(index.is_ready, index)
+    changes = []
+    index.changed.connect(lambda added, removed, updated: changes.append((added, removed, updated)))
+
+    # Запись в файл на месте папку не меняет - её видно только при наблюдении за самим файлом
+    index.set_watched_files([path])
+    with open(path, 'r+b') as file:
+        file.truncate(10)
+    wait_until(lambda: changes, index)
+    assert changes[-1] == ([], [], [path])
+    assert index.get_entry(path).width == -1
+
+def test_index_rereads_files_being_written(index, tmp_path, monkeypatch, make_image, wait_until):
+    monkeypatch.setattr(DirectoryIndex, 'SETTLE_MS', 100)
+    index.set_directory(str(tmp_path))
+    wait_until(index.is_ready, index)
+    changes = []
+    index.changed.connect(lambda added, removed, updated: changes.append((added, removed, updated)))
+
+    # Файл появился раньше, чем записан заголовок
+    path = tmp_path / "capture.png"
+    path.write_bytes(b"")
+    wait_until(lambda: changes, index)
+    assert index.get_entry(str(path)).width == -1
+
+    # Дописанный файл перечитывается и без новых событий папки
+    make_image(path, 40, 10, age=0)
+    wait_until(lambda: index.get_entry(str(path)).width == 40, index)
+    assert changes[-1] == ([], [], [str(path)])
@@ -1,5 +1,10 @@
+import gc
+import os
 import pytest
-from app.my_image import ImageOpeningError, ImageSavingError, MyImage
+from unittest.mock import patch
+from PyQt5.QtCore import Qt, QPointF, QRect, QSize
+from PyQt5.QtGui import QImage
+from app.my_image import ImageArrayError, ImageOpeningError, ImageSavingError, ImageScalingError, MyImage, Resampling
 
 def test_opening_invalid():
     with pytest.raises(ImageOpeningError):
@@ -26,3 +31,328 @@ def test_scale():
     scaled_image = image.get_scaled(2)
     assert scaled_image.width() == width * 2
     assert scaled_image.height() == height * 2
+
+def test_scaled_region():
+    image = MyImage("./tests/test_data/image.png")
+    full = image.get_scaled(2)
+    region = image.get_scaled_region(QRect(10, 20, 30, 40), 2)
+    assert region.width() == 30
+    assert region.height() == 40
+    assert image.get_scaled_size(2) == full.size()
+
+def test_scaled_region_outside_image():
+    image = MyImage("./tests/test_data/image.png")
+    region = image.get_scaled_region(QRect(image.get_width() * 3, 0, 10, 10), 2)
+    assert region.width() == 10
+    assert region.pixel(5, 5) == 0
+
+def test_pyramid_levels():
+    image = MyImage("./tests/test_data/image.png")
+    assert image.level_for_scale(1.5) == 0
+    assert image.level_for_scale(0.5) == 1
+    assert image.level_for_scale(0.1) == 3
+    level = image.get_level(3)
+    assert level.width() == image.get_width() // 8
+    scaled_image = image.get_scaled(0.1)
+    assert scaled_image.size() == image.get_scaled_size(0.1)
+
+def test_built_level_does_not_build():
+    image = MyImage("./tests/test_data/image.png")
+    # Уровней ещё нет - отдаются исходные пиксели, ничего не строится
+    assert image.get_built_level(2) == (0, image.get_level(0))
+    assert image.get_pyramid_bytes() == 0
+    image.get_level(1)
+    index, level = image.get_built_level(3)
+    assert index == 1 and level.width() == image.get_width() // 2
+    assert image.get_image_transform(level).map(QPointF(1, 1)) == image.get_level_transform(1).map(QPointF(1, 1))
+
+def test_level_built_in_strips(monkeypatch):
+    np = pytest.importorskip("numpy")
+    pixels = np.random.default_rng(0).integers(0, 256, (48, 64, 3), dtype=np.uint8)
+    # Полосы по три строки результата: построение идёт по частям, результат - как у масштабирования целиком
+    monkeypatch.setattr(MyImage, 'LEVEL_STRIP_PIXELS', 32 * 3)
+    image = MyImage.from_array(pixels)
+    expected = image.get_level(0).scaled(32, 24, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+    assert image.get_level(1) == expected
+    # Нечётная высота: последняя строка исходника входит в последнюю полосу
+    odd = MyImage.from_array(np.ascontiguousarray(pixels[:47, :63]))
+    assert odd.get_level(1).size() == QSize(31, 23)
+
+def test_pyramid_budget():
+    image = MyImage("./tests/test_data/image.png", pyramid_budget=1)
+    image.get_level(2)
+    image.get_level(4)
+    # Бюджет превышен - в памяти остаётся только последний использованный уровень
+    assert image.get_pyramid_bytes() == image.get_level(4).sizeInBytes()
+
+def test_max_memory_bytes_covers_pyramid():
+    image = MyImage("./tests/test_data/image.png")
+    limit = image.get_max_memory_bytes()
+    for level in range(1, image.level_for_scale(0.001) + 1):
+        image.get_level(level)
+    assert image.get_level(0).sizeInBytes() + image.get_pyramid_bytes() <= limit
+    # С меньшим бюджетом пирамиды изображение может удерживать меньше памяти
+    assert MyImage("./tests/test_data/image.png", pyramid_budget=1).get_max_memory_bytes() < limit
+
+def test_scaled_nearest():
+    image = MyImage("./tests/test_data/image.png")
+    scaled_image = image.get_scaled(3, Resampling.NEAREST)
+    assert scaled_image.size() == image.get_scaled_size(3)
+    assert scaled_image.pixel(3 * 100 + 1, 3 * 100 + 1) == image.get_scaled(1).pixel(100, 100)
+
+def test_scaled_memory_guard():
+    image = MyImage("./tests/test_data/image.png", max_scaled_bytes=4 * 1024 * 1024)
+    assert image.can_scale(1)
+    assert not image.can_scale(10)
+    with pytest.raises(ImageScalingError):
+        image.get_scaled(10)
+    # Видимая область в том же масштабе по-прежнему доступна
+    region = image.get_scaled_region(QRect(5000, 5000, 256, 256), 10)
+    assert region.width() == 256
+
+def test_open_preview():
+    image = MyImage.open_preview("./tests/test_data/image.png", QSize(200, 200))
+    assert image.is_preview()
+    # Размеры - полного изображения, а пиксели декодированы в уменьшенном виде
+    assert image.get_width() == MyImage("./tests/test_data/image.png").get_width()
+    assert image.get_level(0).width() <= 200
+    assert image.get_scaled(0.1).size() == image.get_scaled_size(0.1)
+    with pytest.raises(ImageSavingError):
+        image.save("./preview.png")
+
+def test_open_preview_not_needed():
+    assert MyImage.open_preview("./tests/test_data/image.png", QSize(2000, 2000)) is None
+    with pytest.raises(ImageOpeningError):
+        MyImage.open_preview("wrong_file_path", QSize(200, 200))
+
+def test_lazy_decoding():
+    image = MyImage("./tests/test_data/image.png")
+    # Размеры и формат читаются из заголовка, пиксели ещё не декодированы
+    assert not image.is_loaded()
+    assert image.get_width() > 0 and image.get_height() > 0
+    assert image.get_format() == "png"
+    assert isinstance(image.get_metadata(), dict)
+    assert not image.is_loaded()
+
+    scaled = image.get_scaled(0.5)
+    assert image.is_loaded()
+    assert scaled.size() == image.get_scaled_size(0.5)
+
+def test_lazy_decoding_broken_file(tmp_path):
+    # Заголовок корректен, а данные обрезаны - ошибка возникает при декодировании
+    with open("./tests/test_data/image.png", "rb") as file:
+        data = file.read()
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(data[:len(data) // 4])
+    image = MyImage(str(broken))
+    with pytest.raises(ImageOpeningError):
+        image.load()
+
+@pytest.fixture
+def jpeg_file(tmp_path):
+    file_path = str(tmp_path / "image.jpg")
+    assert MyImage("./tests/test_data/image.png").get_scaled(1).save(file_path, quality=100)
+    return file_path
+
+def test_region_mode(jpeg_file, monkeypatch):
+    monkeypatch.setattr(MyImage, "OVERVIEW_SIZE", QSize(64, 64))
+    image = MyImage(jpeg_file, max_decoded_bytes=1)
+    full = MyImage(jpeg_file)
+    assert image.is_region_mode()
+    assert not full.is_region_mode()
+    # PNG не поддерживает частичное декодирование - декодируется целиком
+    assert not MyImage("./tests/test_data/image.png", max_decoded_bytes=1).is_region_mode()
+
+    # Вместо полного изображения в памяти только обзорная копия
+    assert image.get_level(0).width() <= 64
+    assert image.get_width() == full.get_width()
+
+    rect = QRect(10, 20, 60, 40)
+    region = image.get_scaled_region(rect, 1, Resampling.NEAREST)
+    expected = full.get_scaled_region(rect, 1, Resampling.NEAREST)
+    assert region.size() == rect.size()
+    assert region.pixelColor(30, 20) == expected.pixelColor(30, 20)
+
+    with pytest.raises(ImageSavingError):
+        image.save("./region.png")
+
+def test_read_region(jpeg_file):
+    image = MyImage(jpeg_file)
+    assert image.read_region(QRect(10, 10, 40, 30)).size() == QSize(40, 30)
+    assert image.read_region(QRect(10, 10, 40, 30), QSize(20, 15)).size() == QSize(20, 15)
+    # Частичное чтение не требует декодирования всего изображения
+    assert not image.is_loaded()
+
+    # Без поддержки частичного декодирования область берётся из декодированных пикселей
+    png = MyImage("./tests/test_data/image.png")
+    assert png.read_region(QRect(10, 10, 40, 30), QSize(20, 15)).size() == QSize(20, 15)
+
+def test_mapped_bmp(tmp_path):
+    file_path = str(tmp_path / "image.bmp")
+    png = MyImage("./tests/test_data/image.png")
+    assert png.get_scaled(1).convertToFormat(QImage.Format_RGB888).save(file_path)
+    image = MyImage(file_path)
+    image.load()
+    # Несжатый BMP (строки снизу вверх) не декодируется, а отображается в память
+    assert image.is_mapped()
+    assert not png.is_mapped()
+
+    expected = png.get_scaled(1).convertToFormat(QImage.Format_RGB888)
+    assert image.get_scaled(1).pixel(10, 5) == expected.pixel(10, 5)
+    rect = QRect(10, 20, 60, 40)
+    region = image.get_scaled_region(rect, 1, Resampling.NEAREST)
+    assert region.pixel(5, 3) == expected.pixel(15, 23)
+    # Уровни пирамиды хранятся в ориентации файла, преобразование возвращает их на место
+    level = image.get_level(1)
+    point = image.get_level_transform(1).map(QPointF(2.5, 2.5))
+    assert point.y() == pytest.approx(image.get_height() - 5, abs=1)
+    assert level.size() == MyImage("./tests/test_data/image.png").get_level(1).size()
+
+def test_unmapped_bmp_survives_truncation(tmp_path):
+    file_path = tmp_path / "image.bmp"
+    expected = MyImage("./tests/test_data/image.png").get_scaled(1).convertToFormat(QImage.Format_RGB888)
+    assert expected.save(str(file_path))
+    image = MyImage(str(file_path), map_file=False)
+    image.load()
+    # Пиксели прочитаны в память: обрезанный после загрузки файл не делает их недоступными
+    assert not image.is_mapped()
+    file_path.write_bytes(file_path.read_bytes()[:100])
+    assert image.get_scaled(1).pixel(10, 5) == expected.pixel(10, 5)
+
+def test_to_array_is_read_only_view():
+    np = pytest.importorskip("numpy")
+    image = MyImage("./tests/test_data/image.png")
+    array = image.to_array()
+    channels = image.get_array_channels()
+    assert array.shape == (image.get_height(), image.get_width(), len(channels))
+    assert not array.flags.writeable
+
+    # Значения совпадают с пикселями изображения с учётом порядка каналов
+    color = image.get_scaled(1).pixelColor(10, 5)
+    expected = {'R': color.red(), 'G': color.green(), 'B': color.blue(), 'A': color.alpha()}
+    for index, channel in enumerate(channels):
+        if channel in expected:
+            assert array[5, 10, index] == expected[channel]
+
+def test_to_array_writable():
+    np = pytest.importorskip("numpy")
+    image = MyImage("./tests/test_data/image.png")
+    before = image.get_id()
+    image.to_array(writable=True)[:10, :10] = 0
+    image.mark_modified()
+    assert image.get_id() != before
+    assert image.get_scaled(1).pixel(5, 5) == 0
+    assert image.to_array()[5, 5].sum() == 0
+
+def test_from_array_wraps_without_copy():
+    np = pytest.importorskip("numpy")
+    array = np.zeros((30, 40, 3), dtype=np.uint8)
+    array[10, 20] = (255, 0, 0)
+    image = MyImage.from_array(array, name="analysis")
+    assert image.get_name() == "analysis"
+    assert (image.get_width(), image.get_height()) == (40, 30)
+    assert image.get_array_channels() == "RGB"
+    assert image.get_scaled(1).pixel(20, 10) == 0xffff0000
+
+    # Изменения массива видны в изображении: память общая
+    array[0, 0] = (0, 0, 255)
+    assert image.get_scaled(1).pixel(0, 0) == 0xff0000ff
+    assert image.to_array().__array_interface__['data'][0] == array.ctypes.data
+
+def test_scaled_from_array_outlives_array():
+    np = pytest.importorskip("numpy")
+    array = np.full((500, 500, 3), 200, dtype=np.uint8)
+    image = MyImage.from_array(array)
+    scaled = image.get_scaled(1)
+    # Копия того же размера не ссылается на память массива
+    array[10, 10] = 0
+    assert scaled.pixelColor(10, 10).red() == 200
+
+    # Массив и изображение удалены - результат остаётся действительным
+    del image, array
+    gc.collect()
+    assert scaled.pixelColor(10, 10).red() == 200
+
+def test_from_array_invalid():
+    np = pytest.importorskip("numpy")
+    with pytest.raises(ImageArrayError):
+        MyImage.from_array(np.zeros((10, 10), dtype=np.float32))
+    with pytest.raises(ImageArrayError):
+        MyImage.from_array(np.zeros((10, 10, 3), dtype=np.uint8)[:, ::2])
+    read_only = np.zeros((10, 10), dtype=np.uint8)
+    read_only.flags.writeable = False
+    with pytest.raises(ImageArrayError):
+        MyImage.from_array(read_only).to_array(writable=True)
+
+def test_to_array_mapped_bottom_up_bmp(tmp_path):
+    np = pytest.importorskip("numpy")
+    file_path = str(tmp_path / "image.bmp")
+    assert MyImage("./tests/test_data/image.png").get_scaled(1).convertToFormat(QImage.Format_RGB888).save(file_path)
+    image = MyImage(file_path)
+    array = image.to_array()
+    assert image.is_mapped()
+    assert image.get_array_channels() == "BGR"
+    color = image.get_scaled(1).pixelColor(7, 3)
+    assert tuple(array[3, 7]) == (color.blue(), color.green(), color.red())
+
+def test_scale_area():
+    pytest.importorskip("numpy")
+    image = MyImage("./tests/test_data/image.png")
+    scaled = image.get_scaled(0.1, Resampling.AREA)
+    assert scaled.size() == image.get_scaled_size(0.1)
+    rect = QRect(0, 0, 40, 30)
+    assert image.get_scaled_region(rect, 0.1, Resampling.AREA).size() == rect.size()
+
+@pytest.mark.parametrize("scale, resampling", [(0.3, Resampling.AREA), (0.3, Resampling.LANCZOS),
+                                               (2, Resampling.LANCZOS)])
+def test_scale_parallel_strips(monkeypatch, scale, resampling):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(MyImage, "PARALLEL_MIN_PIXELS", 1)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    image = MyImage("./tests/test_data/image.png")
+    expected = image.get_scaled(scale, resampling)
+    image.set_scale_workers(4)
+    assert image.get_scale_workers() == 4
+    scaled = image.get_scaled(scale, resampling)
+    assert scaled.size() == image.get_scaled_size(scale)
+    # Результат - в том же формате, что и при масштабировании в одном потоке
+    assert scaled.format() == expected.format()
+
+    # Полосы сшиваются без швов: строки на границах полос совпадают с масштабированием целиком
+    # (при усреднении блоки у границы полосы могут начинаться иначе - допуск больше)
+    tolerance = 8 if resampling is Resampling.AREA else 4
+    strip = scaled.height() // 4
+    for y in (strip - 1, strip, 2 * strip, scaled.height() - 1):
+        for x in range(0, scaled.width(), 13):
+            a, b = scaled.pixelColor(x, y), expected.pixelColor(x, y)
+            assert abs(a.red() - b.red()) <= tolerance and abs(a.alpha() - b.alpha()) <= tolerance
+
+def test_scale_parallel_only_numpy_resampling(monkeypatch):
+    monkeypatch.setattr(MyImage, "PARALLEL_MIN_PIXELS", 1)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    image = MyImage("./tests/test_data/image.png")
+    image.set_scale_workers(4)
+    # Масштабирование средствами Qt держит GIL - в несколько потоков оно только медленнее
+    with patch.object(MyImage, "_MyImage__get_scaled_parallel") as mock_parallel:
+        image.get_scaled(0.3, Resampling.BILINEAR)
+        image.get_scaled(2, Resampling.NEAREST)
+    mock_parallel.assert_not_called()
+
+def test_scale_parallel_needs_several_cores(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(MyImage, "PARALLEL_MIN_PIXELS", 1)
+    monkeypatch.setattr(os, "cpu_count", lambda: 1)
+    image = MyImage("./tests/test_data/image.png")
+    image.set_scale_workers(4)
+    # На одном ядре полосы не ускоряют масштабирование - оно идёт в текущем потоке
+    with patch.object(MyImage, "_MyImage__get_scaled_parallel") as mock_parallel:
+        image.get_scaled(0.3, Resampling.AREA)
+    mock_parallel.assert_not_called()
+
+def test_save_scaled(tmp_path):
+    image = MyImage("./tests/test_data/image.png")
+    file_path = str(tmp_path / "scaled.png")
+    image.save_scaled(file_path, 0.5, Resampling.LANCZOS)
+    assert MyImage(file_path).get_width() == image.get_scaled_size(0.5).width()
+    with pytest.raises(ImageSavingError):
+        image.save_scaled(str(tmp_path / "missing" / "scaled.png"), 0.5)
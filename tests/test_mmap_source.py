@@ -0,0 +1,43 @@
+import pytest
+from PyQt5.QtGui import QImage
+from app.mmap_source import map_image
+
+@pytest.fixture
+def source(qapp):
+    image = QImage("./tests/test_data/image.png")
+    # Нечётная ширина проверяет выравнивание строк BMP
+    return image.copy(0, 0, image.width() - 1, image.height())
+
+@pytest.mark.parametrize("suffix, image_format", [
+    ("bmp", QImage.Format_RGB888),
+    ("bmp", QImage.Format_ARGB32),
+    ("tif", QImage.Format_RGB888),
+    ("tif", QImage.Format_ARGB32),
+    ("tif", QImage.Format_Grayscale8),
+])
+def test_map_image_matches_decoded(source, tmp_path, suffix, image_format):
+    file_path = str(tmp_path / f"image.{suffix}")
+    assert source.convertToFormat(image_format).save(file_path)
+    mapped = map_image(file_path)
+    assert mapped is not None
+
+    image = mapped.get_image()
+    if mapped.is_flipped():
+        image = image.mirrored(False, True)
+    expected = QImage(file_path)
+    assert image.size() == expected.size()
+    for x, y in ((0, 0), (image.width() - 1, 0), (image.width() // 2, image.height() // 3),
+                 (0, image.height() - 1)):
+        assert image.pixel(x, y) == expected.pixel(x, y)
+
+def test_map_image_rejects_unsupported(source, tmp_path):
+    # Сжатые форматы и несуществующие файлы читаются обычным декодером
+    png = str(tmp_path / "image.png")
+    source.save(png)
+    assert map_image(png) is None
+    assert map_image(str(tmp_path / "missing.bmp")) is None
+
+    truncated = tmp_path / "truncated.bmp"
+    source.save(str(truncated))
+    truncated.write_bytes(truncated.read_bytes()[:100])
+    assert map_image(str(truncated)) is None
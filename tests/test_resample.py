@@ -0,0 +1,90 @@
+import pytest
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QColor, QImage
+from app.resample import Resampling, area_downsample, block_average, lanczos_resample, resample, resampled_format
+
+np = pytest.importorskip("numpy")
+
+def make_image(array: 'np.ndarray') -> QImage:
+    height, width = array.shape[:2]
+    return QImage(array.tobytes(), width, height, width * 3, QImage.Format_RGB888).copy()
+
+def test_block_average_exact(qapp):
+    array = np.random.default_rng(1).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+    result = block_average(make_image(array), 4)
+    assert result.size() == QSize(15, 10)
+    expected = array.reshape(10, 4, 15, 4, 3).mean(axis=(1, 3))
+    color = result.pixelColor(7, 3)
+    assert (color.red(), color.green(), color.blue()) == tuple(np.round(expected[3, 7]).astype(int))
+
+def test_block_average_partial_blocks(qapp):
+    array = np.random.default_rng(2).integers(0, 256, (10, 11, 3), dtype=np.uint8)
+    result = block_average(make_image(array), 4)
+    # Неполные блоки у правого и нижнего края усредняются по своей площади
+    assert result.size() == QSize(3, 3)
+    expected = array[8:, 8:].reshape(-1, 3).mean(axis=0)
+    color = result.pixelColor(2, 2)
+    assert (color.red(), color.green(), color.blue()) == tuple(np.round(expected).astype(int))
+
+def test_block_average_premultiplies_alpha(qapp):
+    image = QImage(2, 1, QImage.Format_ARGB32)
+    image.setPixelColor(0, 0, QColor(255, 0, 0, 255))
+    image.setPixelColor(1, 0, QColor(0, 0, 255, 0))
+    color = block_average(image, 2).convertToFormat(QImage.Format_ARGB32).pixelColor(0, 0)
+    # Прозрачный пиксель не подмешивает свой цвет
+    assert color.alpha() == 128
+    assert color.blue() == 0 and color.red() == 255
+
+def test_area_downsample_removes_aliasing(qapp):
+    # Шахматная доска в 1 пиксель при любом уменьшении должна стать ровным серым
+    array = np.repeat(((np.indices((200, 300)).sum(axis=0) % 2) * 255).astype(np.uint8)[:, :, None], 3, axis=2)
+    result = area_downsample(make_image(array), QSize(21, 14))
+    assert result.size() == QSize(21, 14)
+    values = [result.pixelColor(x, y).red() for x in range(21) for y in range(14)]
+    assert max(values) - min(values) <= 2
+
+@pytest.mark.parametrize("size", [QSize(20, 15), QSize(130, 70), QSize(45, 150)])
+def test_lanczos_resample_keeps_flat_color(qapp, size):
+    image = QImage(60, 40, QImage.Format_RGB32)
+    image.fill(QColor(10, 120, 250))
+    result = lanczos_resample(image, size)
+    assert result.size() == size
+    # Веса нормированы: ровный цвет не меняется ни при уменьшении, ни при увеличении
+    for x, y in ((0, 0), (size.width() - 1, size.height() - 1), (size.width() // 2, size.height() // 3)):
+        assert result.pixelColor(x, y) == QColor(10, 120, 250)
+
+def test_lanczos_resample_averages_fine_detail(qapp):
+    # При уменьшении фильтр растягивается: полосы шириной в пиксель сливаются в ровный серый
+    array = np.zeros((64, 64, 3), dtype=np.uint8)
+    array[:, ::2] = 255
+    result = lanczos_resample(make_image(array), QSize(16, 16))
+    for x in range(2, 14):
+        assert abs(result.pixelColor(x, 8).red() - 128) <= 2
+
+def test_lanczos_premultiplied_alpha_stays_valid(qapp):
+    image = QImage(8, 8, QImage.Format_ARGB32_Premultiplied)
+    image.fill(QColor(0, 0, 0, 0))
+    for y in range(8):
+        for x in range(4):
+            image.setPixelColor(x, y, QColor(255, 255, 255, 255))
+    result = lanczos_resample(image, QSize(32, 32))
+    array = np.frombuffer(result.constBits().asstring(result.sizeInBytes()), dtype=np.uint8).reshape(32, 32, 4)
+    assert (array[:, :, :3] <= array[:, :, 3:]).all()
+
+def test_resample_dispatch(qapp):
+    image = QImage(40, 40, QImage.Format_RGB32)
+    image.fill(QColor(200, 100, 0))
+    for resampling in Resampling:
+        assert resample(image, QSize(10, 30), resampling).size() == QSize(10, 30)
+    # Увеличение усреднением по площади выполняется сглаживанием Qt
+    assert resample(image, QSize(80, 80), Resampling.AREA).size() == QSize(80, 80)
+
+@pytest.mark.parametrize("image_format", [QImage.Format_RGB32, QImage.Format_RGB888, QImage.Format_Grayscale8,
+                                          QImage.Format_ARGB32])
+def test_resampled_format_matches_resample(qapp, image_format):
+    image = QImage(120, 90, image_format)
+    image.fill(QColor(200, 100, 0))
+    # Уменьшение нацело и с остатком, увеличение и тот же размер
+    for size in (QSize(40, 30), QSize(36, 27), QSize(12, 9), QSize(200, 150), QSize(120, 90)):
+        for resampling in Resampling:
+            assert resampled_format(image, size, resampling) == resample(image, size, resampling).format()
@@ -0,0 +1,99 @@
+import os
+import pytest
+from unittest.mock import patch
+from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtGui import QColor, QImage
+from app.thumbnail_store import ThumbnailStore
+from app.thumbnails import load_thumbnail
+
+BOX = QSize(64, 64)
+
+@pytest.fixture
+def store(tmp_path):
+    store = ThumbnailStore(str(tmp_path / "cache" / "thumbnails.sqlite"))
+    yield store
+    store.close()
+
+def make_file(tmp_path, name, color=Qt.red, size=(200, 100)):
+    image = QImage(*size, QImage.Format_RGB32)
+    image.fill(color)
+    path = str(tmp_path / name)
+    image.save(path)
+    return path
+
+def make_thumbnail(color=Qt.red):
+    image = QImage(64, 32, QImage.Format_RGB32)
+    image.fill(color)
+    return image
+
+def test_store_get_put(qapp, tmp_path, store):
+    path = make_file(tmp_path, "a.png")
+    assert store.get(path, BOX) is None
+    store.put(path, BOX, make_thumbnail())
+    thumbnail = store.get(path, BOX)
+    assert thumbnail.size() == QSize(64, 32)
+    assert abs(thumbnail.pixelColor(10, 10).red() - 255) <= 2
+    assert store.get_hits() == 1
+    assert store.get_misses() == 1
+    # Миниатюра другого размера - промах
+    assert store.get(path, QSize(128, 128)) is None
+
+def test_store_invalidated_by_file_change(qapp, tmp_path, store):
+    path = make_file(tmp_path, "a.png")
+    store.put(path, BOX, make_thumbnail())
+    make_file(tmp_path, "a.png", Qt.blue, (300, 100))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert store.get(path, BOX) is None
+
+def test_store_missing_file(qapp, tmp_path, store):
+    path = str(tmp_path / "missing.png")
+    store.put(path, BOX, make_thumbnail())
+    assert store.get(path, BOX) is None
+    assert len(store) == 0
+
+def test_store_keeps_alpha(qapp, tmp_path, store):
+    path = make_file(tmp_path, "a.png")
+    image = QImage(16, 16, QImage.Format_ARGB32)
+    image.fill(QColor(255, 0, 0, 0))
+    store.put(path, BOX, image)
+    assert store.get(path, BOX).pixelColor(0, 0).alpha() == 0
+
+def test_store_persists(qapp, tmp_path):
+    db_path = str(tmp_path / "thumbnails.sqlite")
+    path = make_file(tmp_path, "a.png")
+    store = ThumbnailStore(db_path)
+    store.put(path, BOX, make_thumbnail())
+    stored_bytes = store.get_bytes()
+    store.close()
+
+    store = ThumbnailStore(db_path)
+    assert store.get_bytes() == stored_bytes > 0
+    assert store.get(path, BOX) is not None
+    store.close()
+
+def test_store_evicts_least_recently_used(qapp, tmp_path):
+    paths = [make_file(tmp_path, f"{i}.png") for i in range(4)]
+    probe = ThumbnailStore(str(tmp_path / "probe.sqlite"))
+    probe.put(paths[0], BOX, make_thumbnail())
+    one = probe.get_bytes()
+    probe.close()
+
+    store = ThumbnailStore(str(tmp_path / "thumbnails.sqlite"), max_bytes=one * 3)
+    for path in paths[:3]:
+        store.put(path, BOX, make_thumbnail())
+    store.get(paths[0], BOX)
+    store.put(paths[3], BOX, make_thumbnail())
+    # Вытеснена самая давно использованная миниатюра, а не самая старая
+    assert store.get(paths[1], BOX) is None
+    assert store.get(paths[0], BOX) is not None
+    assert store.get(paths[3], BOX) is not None
+    assert store.get_bytes() <= store.get_max_bytes()
+    store.close()
+
+def test_load_thumbnail_uses_store(qapp, tmp_path, store):
+    path = make_file(tmp_path, "a.png")
+    assert load_thumbnail(path, BOX, store).size() == QSize(64, 32)
+    with patch('app.thumbnails.read_thumbnail') as mock_read:
+        assert load_thumbnail(path, BOX, store).size() == QSize(64, 32)
+        mock_read.assert_not_called()
@@ -0,0 +1,127 @@
+import pytest
+import time
+from unittest.mock import patch
+from PyQt5.QtCore import Qt, QPersistentModelIndex, QSize, QThread
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QApplication
+from app.my_image import ImageOpeningError
+from app.thumbnails import ThumbnailModel, ThumbnailView, read_thumbnail
+
+@pytest.fixture
+def image_files(qapp, tmp_path):
+    paths = []
+    for i in range(3):
+        image = QImage(400, 200 + i, QImage.Format_RGB32)
+        image.fill(Qt.blue)
+        path = str(tmp_path / f"image_{i}.jpg")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+def wait_for_thumbnails(model):
+    model.wait_for_done()
+    QApplication.processEvents()
+
+def test_read_thumbnail_fits_size(image_files):
+    thumbnail = read_thumbnail(image_files[0], QSize(100, 100))
+    assert thumbnail.size() == QSize(100, 50)
+    # Маленькое изображение не увеличивается
+    assert read_thumbnail(image_files[0], QSize(1000, 1000)).size() == QSize(400, 200)
+
+def test_read_thumbnail_invalid_file(tmp_path):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"not an image")
+    with pytest.raises(ImageOpeningError):
+        read_thumbnail(str(path), QSize(64, 64))
+
+def test_model_placeholder_then_thumbnail(image_files):
+    model = ThumbnailModel(QSize(64, 64))
+    model.set_files(image_files)
+    assert model.rowCount() == 3
+    index = model.index(1)
+    assert model.data(index, Qt.DisplayRole) == "image_1.jpg"
+    assert model.data(index, Qt.ToolTipRole) == image_files[1]
+
+    changed = []
+    model.dataChanged.connect(lambda first, last, roles: changed.append(first.row()))
+    placeholder = model.data(index, Qt.DecorationRole)
+    assert placeholder.size() == QSize(64, 64)
+    wait_for_thumbnails(model)
+
+    assert changed == [1]
+    thumbnail = model.data(index, Qt.DecorationRole)
+    assert isinstance(thumbnail, QPixmap)
+    assert thumbnail.size() == QSize(64, 32)
+    assert model.get_pending_count() == 0
+
+def test_model_does_not_retry_broken_files(tmp_path, qapp):
+    path = tmp_path / "broken.png"
+    path.write_bytes(b"not an image")
+    model = ThumbnailModel(QSize(64, 64))
+    model.set_files([str(path)])
+    model.data(model.index(0), Qt.DecorationRole)
+    wait_for_thumbnails(model)
+    with patch('app.thumbnails.Job') as mock_job:
+        assert model.data(model.index(0), Qt.DecorationRole).size() == QSize(64, 64)
+        mock_job.assert_not_called()
+
+def slow_thumbnail(file_path, size):
+    time.sleep(0.01)
+    return QImage(size, QImage.Format_RGB32)
+
+def test_model_cancel_queued(qapp):
+    model = ThumbnailModel(QSize(64, 64))
+    model.set_files([f"/missing/{i}.png" for i in range(100)])
+    with patch('app.thumbnails.read_thumbnail', slow_thumbnail):
+        for row in range(model.rowCount()):
+            model.data(model.index(row), Qt.DecorationRole)
+        model.cancel_queued()
+    # Остаются только уже начатые чтения
+    assert model.get_pending_count() <= QThread.idealThreadCount()
+    wait_for_thumbnails(model)
+
+def test_model_keeps_thumbnails_across_file_lists(image_files):
+    model = ThumbnailModel(QSize(64, 64))
+    model.set_files(image_files)
+    model.data(model.index(0), Qt.DecorationRole)
+    wait_for_thumbnails(model)
+    model.set_files(image_files[:1])
+    assert image_files[0] in model.get_cache()
+
+def test_view_requests_only_visible_cells(qapp, image_files):
+    model = ThumbnailModel(QSize(64, 64))
+    model.set_files([f"/missing/{i}.png" for i in range(50000)])
+    view = ThumbnailView(model)
+    view.resize(400, 300)
+    with patch.object(model, 'request_thumbnail') as mock_request:
+        view.show()
+        QApplication.processEvents()
+        requested = {call.args[0] for call in mock_request.call_args_list}
+    # Сетка 400x300 с ячейками 80x96 - несколько рядов по пять миниатюр
+    assert 0 < len(requested) <= 30
+    assert "/missing/0.png" in requested
+    view.close()
+
+def test_model_update_files_keeps_rows(qapp):
+    model = ThumbnailModel(QSize(64, 64))
+    model.set_files(["/a.png", "/b.png", "/c.png", "/d.png"])
+    current = QPersistentModelIndex(model.index(2))
+    changes = []
+    model.rowsRemoved.connect(lambda parent, first, last: changes.append(('-', first, last)))
+    model.rowsInserted.connect(lambda parent, first, last: changes.append(('+', first, last)))
+    model.modelReset.connect(lambda: changes.append('reset'))
+
+    model.update_files(["/a.png", "/a2.png", "/a3.png", "/c.png", "/e.png"])
+    assert model.get_files() == ["/a.png", "/a2.png", "/a3.png", "/c.png", "/e.png"]
+    # Без сброса модели: выделенная строка переехала вместе со своим файлом
+    assert changes == [('-', 3, 3), ('-', 1, 1), ('+', 1, 2), ('+', 4, 4)]
+    assert current.row() == 3
+
+def test_model_update_files_rereads_updated(image_files):
+    model = ThumbnailModel(QSize(64, 64))
+    model.set_files(image_files)
+    model.data(model.index(0), Qt.DecorationRole)
+    wait_for_thumbnails(model)
+    assert image_files[0] in model.get_cache()
+    model.update_files(image_files, [image_files[0]])
+    assert image_files[0] not in model.get_cache()
@@ -0,0 +1,62 @@
+from unittest.mock import patch
+from PyQt5.QtCore import QRect
+from app.my_image import MyImage, Resampling
+from app.tiles import TileRenderer
+
+def test_visible_tiles():
+    renderer = TileRenderer(tile_size=100)
+    renderer.set_image(MyImage("./tests/test_data/image.png"))
+    assert renderer.visible_tiles(QRect(50, 50, 100, 10), 1) == [(0, 0), (1, 0)]
+    # Плитки за пределами изображения не возвращаются
+    assert renderer.visible_tiles(QRect(-500, 0, 100, 100), 1) == []
+
+def test_edge_tile_is_clipped():
+    image = MyImage("./tests/test_data/image.png")
+    renderer = TileRenderer(tile_size=256)
+    renderer.set_image(image)
+    tile = renderer.get_tile(1, 3, 0)
+    assert tile.width() == image.get_width() - 3 * 256
+    assert tile.height() == 256
+
+def test_tiles_are_cached():
+    image = MyImage("./tests/test_data/image.png")
+    renderer = TileRenderer(tile_size=64)
+    renderer.set_image(image)
+    with patch.object(image, 'get_scaled_region', wraps=image.get_scaled_region) as mock_region:
+        renderer.get_tile(2, 1, 1)
+        renderer.get_tile(2, 1, 1)
+        mock_region.assert_called_once()
+    assert renderer.get_cache().get_bytes() == 64 * 64 * 4
+
+def test_tile_cache_budget():
+    image = MyImage("./tests/test_data/image.png")
+    renderer = TileRenderer(tile_size=64, cache_bytes=64 * 64 * 4 * 2)
+    renderer.set_image(image)
+    for col in range(4):
+        renderer.get_tile(1, col, 0)
+    assert len(renderer.get_cache()) == 2
+
+def test_returning_to_scale_hits_cache():
+    image = MyImage("./tests/test_data/image.png")
+    renderer = TileRenderer(tile_size=64)
+    renderer.set_image(image)
+    renderer.get_tile(1.0, 0, 0)
+    renderer.get_tile(1.25, 0, 0)
+    cache = renderer.get_cache()
+    cache.reset_stats()
+    # Масштаб после зума туда и обратно совпадает с исходным лишь приблизительно
+    assert renderer.cached_tile(1.25 * 1.25 * 0.8 * 0.8, 0, 0) is not None
+    assert cache.get_hits() == 1
+
+def test_tile_key_includes_image_and_quality():
+    first = MyImage("./tests/test_data/image.png")
+    second = MyImage("./tests/test_data/image.png")
+    renderer = TileRenderer(tile_size=64)
+    renderer.set_image(first)
+    renderer.get_tile(1, 0, 0)
+    assert renderer.cached_tile(1, 0, 0, Resampling.NEAREST) is None
+    renderer.set_image(second)
+    assert renderer.cached_tile(1, 0, 0) is None
+    # Плитки предыдущего изображения не удаляются при переключении
+    renderer.set_image(first)
+    assert renderer.cached_tile(1, 0, 0) is not None
@@ -1,10 +1,20 @@
 import pytest
 import os
-from PyQt5.QtCore import Qt, QPoint
-from PyQt5.QtGui import QMouseEvent, QPixmap
-from PyQt5.QtWidgets import QFileDialog, QMessageBox, QScrollBar
+from PyQt5.QtCore import Qt, QPoint, QSize, QThread
+from PyQt5.QtGui import QColor, QMouseEvent, QPixmap
+from PyQt5.QtWidgets import QApplication, QFileDialog, QMessageBox, QScrollBar
 from unittest.mock import Mock, patch, MagicMock
 import sys
+from app.my_image import MyImage
+from app.resample import InteractionState, Resampling
+
+def wait_for_loading(viewer):
+    ''' Ожидание завершения фоновой загрузки и доставки её результата '''
+    viewer.load_pool.waitForDone()
+    viewer.directory_index.wait_for_done()
+    QApplication.processEvents()
+    viewer.prefetch_pool.waitForDone()
+    QApplication.processEvents()
 
 class TestImageViewer:
     
@@ -37,15 +47,25 @@ class TestImageViewer:
         
         # Создаем реальный mock для MyImage с нужными методами
         mock_image_instance = Mock()
-        mock_image_instance.get_scaled = Mock(return_value=Mock(spec=QPixmap))
+        mock_image_instance.get_width.return_value = 100
+        mock_image_instance.get_height.return_value = 100
+        mock_image_instance.get_scaled_size = Mock(return_value=QSize(100, 100))
         mock_my_image.return_value = mock_image_instance
+        # Изображение меньше окна - предпросмотр не нужен
+        mock_my_image.open_preview.return_value = None
         
         # Вызов тестируемого метода
         image_viewer._ImageViewer__open_image()
         
+        # Пока изображение загружается в фоне, текущее изображение не меняется
+        assert not image_viewer.load_progress.isHidden()
+        wait_for_loading(image_viewer)
+        
         # Проверки
+        assert image_viewer.load_progress.isHidden()
         mock_get_open_file_name.assert_called_once()
-        mock_my_image.assert_called_once_with(test_file_path)
+        mock_my_image.assert_called_once_with(test_file_path, max_decoded_bytes=image_viewer.MAX_DECODED_BYTES,
+                                              map_file=True)
         assert image_viewer.current_image == mock_image_instance
         assert image_viewer.save_action.isEnabled()
         assert image_viewer.zoom_in_btn.isEnabled()
@@ -66,14 +86,72 @@ class TestImageViewer:
         test_file_path = "/fake/path/image.png"
         mock_get_open_file_name.return_value = (test_file_path, '')
         mock_my_image.side_effect = Exception("Test error")
+        mock_my_image.open_preview.return_value = None
         
         # Вызов тестируемого метода
         image_viewer._ImageViewer__open_image()
+        wait_for_loading(image_viewer)
         
         # Проверки
         mock_warning.assert_called_once()
         assert image_viewer.current_image is None
 
+    @patch('app.ui.MyImage')
+    def test_open_image_superseded(self, mock_my_image, image_viewer):
+        """Тест замены незавершённой загрузки более новой"""
+        first, second = Mock(), Mock()
+        for image in (first, second):
+            image.get_width.return_value = image.get_height.return_value = 100
+        mock_my_image.side_effect = lambda path, **kwargs: first if path == "/fake/first.png" else second
+        mock_my_image.open_preview.return_value = None
+        
+        with patch.object(image_viewer, '_ImageViewer__display_image'):
+            image_viewer._ImageViewer__load_image("/fake/first.png")
+            image_viewer._ImageViewer__load_image("/fake/second.png")
+            wait_for_loading(image_viewer)
+        
+        # Результат первой загрузки отброшен, даже если она успела завершиться
+        assert image_viewer.current_image is second
+
+    def test_preview_replaced_by_full_image(self, image_viewer, tmp_path):
+        """Тест показа уменьшенного предпросмотра до окончания полной загрузки"""
+        file_path = str(tmp_path / "large.png")
+        large = QPixmap(3000, 2000)
+        large.fill(Qt.blue)
+        large.save(file_path)
+        preview = MyImage.open_preview(file_path, QSize(300, 200))
+        full = MyImage(file_path)
+        
+        # Фоновые задачи не запускаем, а доставляем их результаты вручную в нужном порядке
+        with patch.object(image_viewer.load_pool, 'start'):
+            image_viewer._ImageViewer__load_image(file_path)
+        tag = (image_viewer.load_generation, file_path)
+        
+        image_viewer._ImageViewer__on_preview_loaded(tag, preview)
+        assert image_viewer.current_image is preview
+        assert image_viewer.scale_factor < 1
+        assert image_viewer.zoom_in_btn.isEnabled()
+        assert not image_viewer.save_action.isEnabled()
+        
+        # Масштаб, выбранный во время загрузки, сохраняется после замены предпросмотра
+        image_viewer.scale_factor = 0.5
+        image_viewer._ImageViewer__on_image_loaded(tag, full)
+        assert image_viewer.current_image is full
+        assert image_viewer.scale_factor == 0.5
+        assert image_viewer.save_action.isEnabled()
+
+    @patch('app.ui.MyImage')
+    def test_open_image_cancel(self, mock_my_image, image_viewer):
+        """Тест отмены загрузки клавишей Esc"""
+        mock_my_image.open_preview.return_value = None
+        image_viewer._ImageViewer__load_image("/fake/path/image.png")
+        image_viewer.cancel_load_action.trigger()
+        wait_for_loading(image_viewer)
+        
+        assert image_viewer.current_image is None
+        assert image_viewer.load_progress.isHidden()
+        assert image_viewer.statusBar().currentMessage() == 'Загрузка отменена'
+
     def test_zoom_in(self, image_viewer):
         """Тест увеличения масштаба"""
         # Создаем mock для изображения с правильным возвращаемым типом
@@ -102,6 +180,25 @@ class TestImageViewer:
             assert image_viewer.scale_factor == 10.0
             mock_display.assert_called_once()
 
+    def test_zoom_in_pixel_mode_limit(self, image_viewer):
+        """Тест повышенного предела масштаба в пиксельном режиме"""
+        image_viewer.current_image = Mock()
+        image_viewer.scale_factor = 10.0
+        image_viewer.pixel_mode_action.setChecked(True)
+        assert image_viewer.canvas.is_pixel_mode()
+        
+        with patch.object(image_viewer, '_ImageViewer__display_image'):
+            image_viewer._ImageViewer__zoom_in()
+            assert image_viewer.scale_factor == 12.5
+            
+            image_viewer.scale_factor = 60.0
+            image_viewer._ImageViewer__zoom_in()
+            assert image_viewer.scale_factor == 64
+            
+            # При выключении режима масштаб возвращается в обычные пределы
+            image_viewer.pixel_mode_action.setChecked(False)
+            assert image_viewer.scale_factor == 10
+
     def test_zoom_out(self, image_viewer):
         """Тест уменьшения масштаба"""
         image_viewer.current_image = Mock()
@@ -147,8 +244,8 @@ class TestImageViewer:
         mock_v_scroll.value.return_value = 100
         
         # Мокаем методы scroll_area чтобы возвращали наши mock объекты
-        image_viewer.scroll_area.horizontalScrollBar = Mock(return_value=mock_h_scroll)
-        image_viewer.scroll_area.verticalScrollBar = Mock(return_value=mock_v_scroll)
+        image_viewer.canvas.horizontalScrollBar = Mock(return_value=mock_h_scroll)
+        image_viewer.canvas.verticalScrollBar = Mock(return_value=mock_v_scroll)
         
         # Тестируем навигацию
         image_viewer._ImageViewer__nav_up()
@@ -185,8 +282,8 @@ class TestImageViewer:
         mock_h_scroll.value.return_value = 100
         mock_v_scroll.value.return_value = 100
         
-        image_viewer.scroll_area.horizontalScrollBar = Mock(return_value=mock_h_scroll)
-        image_viewer.scroll_area.verticalScrollBar = Mock(return_value=mock_v_scroll)
+        image_viewer.canvas.horizontalScrollBar = Mock(return_value=mock_h_scroll)
+        image_viewer.canvas.verticalScrollBar = Mock(return_value=mock_v_scroll)
         
         # Тест перемещения мыши
         image_viewer._ImageViewer__mouse_move_event(mock_move_event)
@@ -216,29 +313,45 @@ class TestImageViewer:
 
     def test_display_image_with_current_image(self, image_viewer):
         """Тест отображения изображения когда current_image установлен"""
-        # Создаем mock для изображения
         image_viewer.current_image = Mock()
-        mock_qpixmap = Mock(spec=QPixmap)
-        image_viewer.current_image.get_scaled.return_value = mock_qpixmap
+        image_viewer.scale_factor = 2.0
         
-        # Мокаем setPixmap для проверки вызова
-        with patch.object(image_viewer.image_label, 'setPixmap') as mock_set_pixmap:
+        # Мокаем set_image холста для проверки вызова
+        with patch.object(image_viewer.canvas, 'set_image') as mock_set_image:
             image_viewer._ImageViewer__display_image()
             
-            # Проверяем, что методы были вызваны с правильными аргументами
-            image_viewer.current_image.get_scaled.assert_called_once_with(image_viewer.scale_factor)
-            mock_set_pixmap.assert_called_once_with(mock_qpixmap)
+            # Отрисовка происходит по таймеру кадра, а не сразу
+            mock_set_image.assert_not_called()
+            image_viewer.render_timer.timeout.emit()
+
+            # Холст получает исходное изображение и масштаб, а не готовую отмасштабированную копию
+            mock_set_image.assert_called_once_with(image_viewer.current_image, 2.0)
+            image_viewer.current_image.get_scaled.assert_not_called()
+
+    def test_rapid_zoom_is_coalesced(self, image_viewer):
+        """Тест объединения частых запросов масштабирования в одну отрисовку"""
+        image_viewer.current_image = Mock()
+        
+        with patch.object(image_viewer.canvas, 'set_image') as mock_set_image:
+            for _ in range(5):
+                image_viewer._ImageViewer__zoom_in()
+            image_viewer.render_timer.timeout.emit()
+            
+            # Масштаб меняется сразу при каждом нажатии, а отрисовка выполняется один раз с итоговым масштабом
+            assert image_viewer.scale_factor == pytest.approx(1.25 ** 5)
+            mock_set_image.assert_called_once_with(image_viewer.current_image, image_viewer.scale_factor)
 
     def test_display_image_without_current_image(self, image_viewer):
         """Тест отображения изображения когда current_image не установлен"""
         image_viewer.current_image = None
         
-        # Мокаем setPixmap для проверки что он не вызывается
-        with patch.object(image_viewer.image_label, 'setPixmap') as mock_set_pixmap:
+        # Мокаем set_image для проверки что он не вызывается
+        with patch.object(image_viewer.canvas, 'set_image') as mock_set_image:
             image_viewer._ImageViewer__display_image()
             
-            # Проверяем, что setPixmap не был вызван
-            mock_set_pixmap.assert_not_called()
+            # Проверяем, что отрисовка не запланирована и set_image не был вызван
+            assert not image_viewer.render_timer.isActive()
+            mock_set_image.assert_not_called()
 
     @patch('app.ui.QFileDialog.getSaveFileName')
     def test_save_image_no_current_image(self, mock_save_file_name, image_viewer):
@@ -277,4 +390,198 @@ class TestImageViewer:
             
             # Проверяем, что методы были вызваны правильно
             image_viewer.current_image.save.assert_called_once_with(test_save_path)
-            mock_info.assert_called_once()
\ No newline at end of file
+            mock_info.assert_called_once()
+
+    @patch('app.ui.QFileDialog.getSaveFileName')
+    def test_export_image_uses_export_resampling(self, mock_save_file_name, image_viewer):
+        """Тест экспорта в текущем масштабе способом, выбранным для экспорта"""
+        test_save_path = "/fake/path/exported.png"
+        mock_save_file_name.return_value = (test_save_path, '')
+        image_viewer.current_image = Mock()
+        image_viewer.scale_factor = 0.5
+
+        image_viewer._ImageViewer__export_image()
+
+        image_viewer.current_image.save_scaled.assert_called_once_with(
+            test_save_path, 0.5, image_viewer.resampling_policy[InteractionState.EXPORT])
+
+    def test_quality_menu_updates_policy(self, image_viewer):
+        """Тест выбора способа передискретизации в меню качества"""
+        with patch.object(image_viewer.canvas, 'set_resampling') as mock_set_resampling:
+            image_viewer.resampling_actions[(InteractionState.IDLE, Resampling.LANCZOS)].trigger()
+
+            assert image_viewer.resampling_policy[InteractionState.IDLE] is Resampling.LANCZOS
+            assert not image_viewer.resampling_actions[(InteractionState.IDLE, Resampling.BILINEAR)].isChecked()
+            mock_set_resampling.assert_called_once_with(Resampling.NEAREST, Resampling.LANCZOS)
+
+    @pytest.fixture
+    def image_folder(self, tmp_path):
+        """Папка с несколькими изображениями разного цвета"""
+        paths = []
+        for i, color in enumerate((Qt.red, Qt.green, Qt.blue, Qt.yellow, Qt.cyan)):
+            pixmap = QPixmap(40 + i, 30)
+            pixmap.fill(color)
+            path = str(tmp_path / f"image_{i}.png")
+            pixmap.save(path, "PNG")
+            paths.append(path)
+        (tmp_path / "notes.txt").write_text("не изображение")
+        return paths
+
+    @patch('app.ui.QFileDialog.getOpenFileName')
+    def test_folder_navigation_uses_prefetched_images(self, mock_get_open_file_name, image_viewer, image_folder):
+        """Тест перехода по папке: соседние изображения загружаются заранее и показываются без ожидания"""
+        mock_get_open_file_name.return_value = (image_folder[1], '')
+        image_viewer._ImageViewer__open_image()
+        wait_for_loading(image_viewer)
+
+        assert len(image_viewer.folder_files) == len(image_folder)
+        assert image_viewer.prev_image_action.isEnabled()
+        assert image_viewer.next_image_btn.isEnabled()
+        # Заранее загружены следующие изображения в направлении перехода
+        assert image_folder[2] in image_viewer.prefetch_cache
+        assert image_folder[3] in image_viewer.prefetch_cache
+        assert image_folder[0] not in image_viewer.prefetch_cache
+
+        prefetched = image_viewer.prefetch_cache.get(image_folder[2])
+        image_viewer.next_image_action.trigger()
+        # Изображение взято из кэша: показано сразу, без фоновой загрузки
+        assert image_viewer.current_image is prefetched
+        assert image_viewer.load_progress.isHidden()
+        wait_for_loading(image_viewer)
+        assert image_viewer.current_image is prefetched
+        assert image_folder[4] in image_viewer.prefetch_cache
+
+    @patch('app.ui.QFileDialog.getOpenFileName')
+    def test_folder_navigation_bounds(self, mock_get_open_file_name, image_viewer, image_folder):
+        """Тест перехода по папке назад и остановки на первом изображении"""
+        mock_get_open_file_name.return_value = (image_folder[1], '')
+        image_viewer._ImageViewer__open_image()
+        wait_for_loading(image_viewer)
+
+        image_viewer.prev_image_action.trigger()
+        wait_for_loading(image_viewer)
+        assert image_viewer.current_image.get_width() == 40
+        assert not image_viewer.prev_image_action.isEnabled()
+        assert not image_viewer.prev_image_btn.isEnabled()
+        assert image_viewer.next_image_action.isEnabled()
+
+        # Дальше первого изображения перейти нельзя
+        image_viewer._ImageViewer__prev_image()
+        assert image_viewer.folder_index == 0
+
+    @patch('app.ui.QFileDialog.getOpenFileName')
+    def test_folder_images_survive_rewritten_files(self, mock_get_open_file_name, image_viewer, tmp_path):
+        """Тест несжатых файлов папки: в кэше нет отображённых в память, показанное открывается заново после перезаписи"""
+        paths = []
+        for i in range(3):
+            pixmap = QPixmap(40 + i, 30)
+            pixmap.fill(Qt.red)
+            path = str(tmp_path / f"image_{i}.bmp")
+            pixmap.save(path, "BMP")
+            paths.append(path)
+        mock_get_open_file_name.return_value = (paths[0], '')
+        image_viewer._ImageViewer__open_image()
+        wait_for_loading(image_viewer)
+
+        def wait_until(condition):
+            for _ in range(500):
+                wait_for_loading(image_viewer)
+                if condition():
+                    break
+                QThread.msleep(10)
+            assert condition()
+
+        shown = image_viewer.current_image
+        assert shown.is_mapped()
+        assert paths[0] not in image_viewer.prefetch_cache
+        prefetched = image_viewer.prefetch_cache.get(paths[1])
+        assert prefetched is not None and not prefetched.is_mapped()
+
+        # Обрезанный файл не мешает уже загруженному изображению, а из кэша оно убирается
+        with open(paths[1], 'r+b') as file:
+            file.truncate(100)
+        assert prefetched.get_scaled(1).pixelColor(5, 5) == QColor(Qt.red)
+        wait_until(lambda: paths[1] not in image_viewer.prefetch_cache)
+
+        # Показанный файл перезаписан на месте - изображение открывается заново
+        pixmap = QPixmap(80, 30)
+        pixmap.fill(Qt.green)
+        pixmap.save(paths[0], "BMP")
+        wait_until(lambda: image_viewer.current_image is not None and image_viewer.current_image.get_width() == 80)
+        assert image_viewer.current_image is not shown
+
+    @patch('app.ui.QFileDialog.getOpenFileName')
+    def test_thumbnails_open_selected_image(self, mock_get_open_file_name, image_viewer, image_folder):
+        """Тест сетки миниатюр: текущее изображение выделено, выбор ячейки открывает изображение"""
+        mock_get_open_file_name.return_value = (image_folder[1], '')
+        image_viewer._ImageViewer__open_image()
+        wait_for_loading(image_viewer)
+
+        image_viewer.thumbnails_action.trigger()
+        assert image_viewer.view_stack.currentWidget() is image_viewer.thumbnail_view
+        assert image_viewer.thumbnail_model.rowCount() == len(image_folder)
+        assert image_viewer.thumbnail_view.currentIndex().row() == 1
+        # PageUp и PageDown в сетке прокручивают её, а не переключают изображения
+        assert not image_viewer.next_image_action.isEnabled()
+
+        image_viewer.thumbnail_view.activated.emit(image_viewer.thumbnail_model.index(3))
+        assert image_viewer.view_stack.currentWidget() is image_viewer.canvas
+        assert not image_viewer.thumbnails_action.isChecked()
+        assert image_viewer.folder_index == 3
+        wait_for_loading(image_viewer)
+        assert image_viewer.current_image.get_width() == 43
+        assert image_viewer.next_image_action.isEnabled()
+        image_viewer.thumbnail_model.wait_for_done()
+
+    @patch('app.ui.QFileDialog.getExistingDirectory')
+    def test_open_directory_shows_thumbnails(self, mock_get_existing_directory, image_viewer, image_folder):
+        """Тест открытия папки: показывается сетка миниатюр её изображений"""
+        mock_get_existing_directory.return_value = os.path.dirname(image_folder[0])
+        image_viewer._ImageViewer__open_directory()
+        wait_for_loading(image_viewer)
+
+        assert image_viewer.thumbnails_action.isChecked()
+        assert image_viewer.view_stack.currentWidget() is image_viewer.thumbnail_view
+        assert image_viewer.thumbnail_model.get_files() == image_folder
+        assert image_viewer.folder_index == -1
+        assert image_viewer.current_image is None
+
+    @patch('app.ui.QFileDialog.getExistingDirectory')
+    def test_watch_folder_shows_new_images(self, mock_get_existing_directory, image_viewer, image_folder):
+        """Тест слежения за папкой: показывается самое новое изображение, затем каждое новое, с задержкой показа"""
+        directory = os.path.dirname(image_folder[0])
+        mock_get_existing_directory.return_value = directory
+        for i, path in enumerate(image_folder):
+            os.utime(path, (100 + i, 100 + i))
+        image_viewer.watch_action.trigger()
+        assert image_viewer.latest_watcher.is_active()
+
+        def wait_for_frame(width):
+            for _ in range(500):
+                wait_for_loading(image_viewer)
+                image_viewer.latest_watcher.wait_for_done()
+                QApplication.processEvents()
+                if image_viewer.current_image is not None and image_viewer.current_image.get_width() == width:
+                    break
+                QThread.msleep(10)
+            # Отложенная отрисовка нового кадра
+            QThread.msleep(image_viewer.FRAME_MS * 2)
+            QApplication.processEvents()
+
+        wait_for_frame(44)
+        assert image_viewer.folder_index == 4
+
+        pixmap = QPixmap(60, 30)
+        pixmap.fill(Qt.magenta)
+        pixmap.save(os.path.join(directory, "image_5.png"), "PNG")
+        wait_for_frame(60)
+        assert image_viewer.current_image.get_width() == 60
+        assert image_viewer.folder_index == 5
+        assert 'задержка' in image_viewer.statusBar().currentMessage()
+
+        # Открытие изображения вручную выключает слежение
+        with patch('app.ui.QFileDialog.getOpenFileName', return_value=(image_folder[0], '')):
+            image_viewer._ImageViewer__open_image()
+        assert not image_viewer.watch_action.isChecked()
+        assert not image_viewer.latest_watcher.is_active()
+        wait_for_loading(image_viewer)
@@ -0,0 +1,145 @@
+import os
+import time
+import pytest
+from unittest.mock import patch
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QApplication
+from app import watch
+from app.folder import DirectoryIndex
+from app.watch import IncompleteImageError, LatestImageWatcher, is_complete, read_frame
+
+MAX_DECODED_BYTES = 512 * 1024 * 1024
+
+def truncate(path, size):
+    data = open(path, 'rb').read()
+    open(path, 'wb').write(data[:size])
+
+@pytest.mark.parametrize('name', ['a.jpg', 'a.png', 'a.bmp'])
+def test_is_complete_detects_truncated_files(qapp, tmp_path, name, make_image):
+    path = make_image(tmp_path / name, 200, 100)
+    assert is_complete(path)
+    truncate(path, os.path.getsize(path) - 10)
+    assert not is_complete(path)
+
+def test_read_frame(qapp, tmp_path, make_image):
+    path = make_image(tmp_path / "frame.jpg", 200, 100)
+    image, mtime_ns = read_frame(path, MAX_DECODED_BYTES)
+    assert image.is_loaded() and image.get_width() == 200
+    assert mtime_ns == os.stat(path).st_mtime_ns
+    # Обрезанный JPEG декодер Qt читает без ошибки - его отсекает проверка конца файла
+    truncate(path, os.path.getsize(path) // 2)
+    with pytest.raises(IncompleteImageError):
+        read_frame(path, MAX_DECODED_BYTES)
+
+def test_read_frame_does_not_map_file(qapp, tmp_path, make_image):
+    path = make_image(tmp_path / "frame.bmp", 200, 100)
+    image, _ = read_frame(path, MAX_DECODED_BYTES)
+    # Кадры перезаписываются на месте: отображённый в память файл после обрезки завершил бы процесс
+    assert not image.is_mapped()
+    truncate(path, 100)
+    assert image.get_scaled(1).pixelColor(10, 10) == QColor(Qt.red)
+
+@pytest.fixture
+def watcher(qapp):
+    index = DirectoryIndex()
+    watcher = LatestImageWatcher(index)
+    watcher.frames = []
+    watcher.frame_loaded.connect(lambda path, image, mtime_ns: watcher.frames.append((path, image)))
+    watcher.index = index
+    yield watcher
+    watcher.stop()
+    index.set_directory(None)
+    watcher.wait_for_done()
+    index.wait_for_done()
+
+def test_watcher_shows_newest_existing_and_new_images(watcher, tmp_path, make_image, wait_until):
+    newest = make_image(tmp_path / "a.png", age=10)
+    make_image(tmp_path / "b.png", age=20)
+    watcher.index.set_directory(str(tmp_path))
+    watcher.start()
+    assert watcher.index.get_update_delay() == LatestImageWatcher.UPDATE_DELAY_MS
+    wait_until(lambda: watcher.frames, watcher.index, watcher)
+    assert watcher.frames[0][0] == newest
+
+    new_path = make_image(tmp_path / "c.png", 50, 40)
+    wait_until(lambda: len(watcher.frames) == 2, watcher.index, watcher)
+    assert watcher.frames[1][0] == new_path
+    assert watcher.frames[1][1].get_width() == 50
+
+    watcher.stop()
+    assert watcher.index.get_update_delay() == DirectoryIndex.UPDATE_DELAY_MS
+
+def test_watcher_retries_partially_written_file(watcher, tmp_path, monkeypatch, make_image, wait_until):
+    monkeypatch.setattr(LatestImageWatcher, 'RETRY_MS', 10)
+    watcher.index.set_directory(str(tmp_path))
+    watcher.start()
+    wait_until(watcher.index.is_ready, watcher.index, watcher)
+
+    path = tmp_path / "capture.jpg"
+    make_image(path, 200, 100)
+    data = open(path, 'rb').read()
+    attempts = []
+    def read_partial(file_path, max_decoded_bytes):
+        # Пока не было нескольких попыток, файл дописан только наполовину
+        attempts.append(file_path)
+        if len(attempts) == 3:
+            open(file_path, 'wb').write(data)
+        return read_frame(file_path, max_decoded_bytes)
+    open(path, 'wb').write(data[:len(data) // 2])
+    with patch.object(watch, 'read_frame', read_partial):
+        wait_until(lambda: watcher.frames, watcher.index, watcher)
+    assert len(attempts) == 3
+    assert watcher.frames[0][1].get_width() == 200
+
+def test_watcher_gives_up_on_broken_file(watcher, tmp_path, monkeypatch, wait_until):
+    monkeypatch.setattr(LatestImageWatcher, 'RETRY_MS', 10)
+    monkeypatch.setattr(LatestImageWatcher, 'RETRY_TIMEOUT_MS', 100)
+    failures = []
+    watcher.frame_failed.connect(lambda path, error: failures.append(path))
+    watcher.index.set_directory(str(tmp_path))
+    watcher.start()
+    wait_until(watcher.index.is_ready, watcher.index, watcher)
+
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+    wait_until(lambda: failures, watcher.index, watcher)
+    assert failures == [str(broken)]
+    assert watcher.frames == []
+
+def test_watcher_skips_intermediate_frames(watcher, tmp_path, make_image, wait_until):
+    watcher.index.set_directory(str(tmp_path))
+    watcher.start()
+    wait_until(watcher.index.is_ready, watcher.index, watcher)
+
+    reads = []
+    def slow_read(file_path, max_decoded_bytes):
+        reads.append(file_path)
+        time.sleep(0.2)
+        return read_frame(file_path, max_decoded_bytes)
+    with patch.object(watch, 'read_frame', slow_read):
+        first = make_image(tmp_path / "0.png", age=3)
+        deadline = time.monotonic() + 5
+        while not reads and time.monotonic() < deadline:
+            QApplication.processEvents()
+            time.sleep(0.005)
+        # Пока читается первый кадр, приходят ещё три - читается только последний из них
+        for i, age in ((1, 2), (2, 1), (3, 0)):
+            make_image(tmp_path / f"{i}.png", age=age)
+            time.sleep(0.05)
+            QApplication.processEvents()
+        last = str(tmp_path / "3.png")
+        wait_until(lambda: watcher.frames and watcher.frames[-1][0] == last, watcher.index, watcher)
+
+    assert reads[0] == first and reads[-1] == last
+    assert len(reads) < 4
+    assert watcher.get_skipped() >= 2
+
+def test_watcher_latency_statistics(qapp):
+    watcher = LatestImageWatcher(DirectoryIndex())
+    assert watcher.get_average_latency() is None
+    now = time.time_ns()
+    assert watcher.record_display(now - 30_000_000) >= 30
+    watcher.record_display(now - 10_000_000)
+    assert watcher.get_max_latency() >= 30
+    assert 20 <= watcher.get_average_latency() < watcher.get_max_latency()